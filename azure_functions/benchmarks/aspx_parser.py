@@ -0,0 +1,208 @@
+"""Benchmark the ASPX parser on a folder of exported .aspx pages.
+
+Compares the baseline extraction, which parsed every page up to three
+times and searched the tree for the heading of every section anchor,
+with the single parse extraction for each parser backend, and checks
+that every backend returns the same chunks and metadata as the baseline.
+The baseline returned the sections in set order, the chunks are compared
+in document order.
+
+    python -m benchmarks.aspx_parser --corpus ./exports --parsers html.parser lxml
+"""
+
+import argparse
+import base64
+import logging
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup
+from langchain.text_splitter import MarkdownTextSplitter
+
+from superagent.parsers import aspx
+from superagent.parsers.aspx import ASPXParser
+
+
+def _load_corpus(corpus: str):
+    _pages = []
+    for _root, _, _files in os.walk(corpus):
+        for _file in sorted(_files):
+            if _file.lower().endswith(".aspx"):
+                with open(os.path.join(_root, _file), "rb") as _fd:
+                    _pages.append((_file, _fd.read()))
+    return _pages
+
+
+class _BaselineASPXParser:
+    """The extraction of ASPXParser before the single parse, unchanged"""
+
+    def extract_metadata(self, content: bytes, blob_path: str, container: str):
+        soup = BeautifulSoup(content, "html.parser")
+        _page_title = (
+            soup.find("SharePointWebControls:FieldValue", {"FieldName": "Title"}) or
+            soup.title or
+            " ".join(h1.get_text(strip=True) for h1 in soup.find_all("h1")) or
+            "No Title Found"
+        )
+        _page_title = " ".join(str(_page_title).split()[:100])
+        _page_description = " ".join(p.get_text(strip=True) for p in soup.find_all("p"))
+        _page_description = " ".join(_page_description.split()[:150])
+        if not _page_description.strip():
+            _page_description = "No Description Found"
+        breadcrumbs = soup.find("SharePointWebControls:ListSiteMapPath")
+        parent_text = breadcrumbs.text.strip() if breadcrumbs else "No Parent Found"
+        if breadcrumbs is None:
+            parent_text = " | ".join(f"{a.get_text(strip=True)}: {a['href']}" for a in soup.find_all("a", href=True))
+        if not parent_text.strip():
+            parent_text = "No Parent Found"
+        parent_text = " ".join(parent_text.split()[:100])
+        _page_text = re.sub(r"[\n\r\t]", "", soup.get_text()).strip()
+        _title = base64.b64encode(_page_title.encode("utf-8")).decode("utf-8")
+        _description = base64.b64encode(_page_description.encode("utf-8")).decode("utf-8")
+        _parent_id = base64.b64encode(parent_text.encode("utf-8")).decode("utf-8")
+        fullpath = os.environ.get("SharePointURL") + container
+        source_address = base64.b64encode(fullpath.encode("utf-8")).decode("utf-8")
+        blob_path = base64.b64encode(blob_path.encode("utf-8")).decode("utf-8")
+        _chunks = None
+        if len(content) > 0:
+            _chunks = self.custom_section_anchor_chunking(content)
+        if _chunks:
+            return [
+                {
+                    "content": chunk.encode("utf-8"),
+                    "metadata": {
+                        "title": _title,
+                        "description": _description,
+                        "generatedquestion": _description,
+                        "parent_id": _parent_id,
+                        "blob_path": blob_path,
+                        "source_address": source_address,
+                    },
+                }
+                for chunk in _chunks
+            ]
+        return None
+
+    def custom_markdown_chunking(self, content):
+        soup = BeautifulSoup(content, "html.parser")
+        plain_text = soup.get_text(separator="\n", strip=True)
+        splitter = MarkdownTextSplitter()
+        return splitter.split_text(plain_text)
+
+    def custom_section_anchor_chunking(self, content):
+        soup = BeautifulSoup(content, "html.parser")
+        chunks = []
+        anchors = set()
+        for a_tag in soup.find_all("a", href=True):
+            href = a_tag["href"]
+            if href.startswith("#") and len(href) > 1:
+                anchors.add(href[1:])
+        for anchor in anchors:
+            h3_tag = soup.find(lambda tag: tag.name == "h3" and tag.find("a", attrs={"name": anchor}))
+            if not h3_tag:
+                continue
+            section_lines = [f"#{anchor}", h3_tag.get_text(strip=True)]
+            for sibling in h3_tag.find_all_next():
+                if sibling.name == "h3" and sibling.find("a") and sibling.find("a").get("name") in anchors:
+                    break
+                if sibling.name == "tr":
+                    section_lines.append(sibling.get_text(separator="\n", strip=True))
+            chunk = "\n".join(section_lines).strip()
+            if chunk:
+                chunks.append(chunk)
+        if not chunks:
+            plain_text = soup.get_text(separator="\n", strip=True)
+            return self.custom_markdown_chunking(plain_text)
+        return chunks
+
+
+def _sorted_chunks(contents):
+    """Chunks and metadata of a page, sorted since the baseline returned
+    the sections in set order"""
+    return sorted(
+        (_chunk["content"], sorted(_chunk["metadata"].items()))
+        for _chunk in contents or []
+    )
+
+
+def _run(pages, func, repeat: int):
+    _results = []
+    _start = time.perf_counter()
+    for _ in range(repeat):
+        _results = [func(_content) for _, _content in pages]
+    _elapsed = time.perf_counter() - _start
+    return _elapsed, _results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASPX parser benchmark")
+    parser.add_argument(
+        "--corpus",
+        type=str,
+        help="Folder with exported .aspx pages",
+        required=True,
+    )
+    parser.add_argument(
+        "--parsers",
+        type=str,
+        nargs="+",
+        help="Parser backends to compare",
+        required=False,
+        default=["html.parser", "lxml"],
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        help="Number of passes over the corpus",
+        required=False,
+        default=3,
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("SharePointURL", "https://sharepoint/")
+    _pages = _load_corpus(args.corpus)
+    _megabytes = sum(len(_content) for _, _content in _pages) / (1024 * 1024)
+    print(f"{len(_pages)} pages, {_megabytes:.1f} MB, {args.repeat} passes")
+
+    _parser = ASPXParser(
+        configuration=None,
+        summary=None,
+        logger=logging.getLogger(__name__),
+    )
+
+    def _extract(content):
+        _contents = _parser.extract_metadata(content, "benchmark.aspx", "benchmark")
+        return _sorted_chunks(_contents)
+
+    _baseline = _BaselineASPXParser()
+    _baseline_seconds, _expected = _run(
+        _pages,
+        lambda content: _sorted_chunks(
+            _baseline.extract_metadata(content, "benchmark.aspx", "benchmark")
+        ),
+        args.repeat,
+    )
+    print(f"{'baseline html.parser':<24} {_baseline_seconds:8.2f}s")
+
+    for _backend in args.parsers:
+        aspx.HTML_PARSER = _backend
+        _seconds, _results = _run(_pages, _extract, args.repeat)
+        _different = [
+            _name
+            for (_name, _), _result, _expected_result in zip(
+                _pages, _results, _expected
+            )
+            if _result != _expected_result
+        ]
+        print(
+            f"{_backend:<24} {_seconds:8.2f}s "
+            f"speedup {_baseline_seconds / _seconds:5.2f}x "
+            f"different pages {len(_different)}"
+        )
+        for _name in _different:
+            print(f"    {_name}")
+
+
+if __name__ == "__main__":
+    main()
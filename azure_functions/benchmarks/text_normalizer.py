@@ -0,0 +1,148 @@
+"""Benchmark the shared text normalizer against the per parser regexes.
+
+Cleans the text of a folder of pages, or of generated pages when no
+folder is given, with the regex passes the parsers used to run one after
+the other and with the precompiled normalizer, reports the throughput of
+both and checks that they return the same text.
+
+    python -m benchmarks.text_normalizer --corpus ./exports --repeat 5
+    python -m benchmarks.text_normalizer --pages 200 --page-size 256
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+from common.textnormalizer import TextNormalizer
+
+
+def _load_corpus(corpus: str):
+    _pages = []
+    for _root, _, _files in os.walk(corpus):
+        for _file in sorted(_files):
+            with open(os.path.join(_root, _file), "rb") as _fd:
+                _pages.append(_fd.read().decode("utf-8", errors="ignore"))
+    return _pages
+
+
+def _generate_pages(count: int, page_size: int):
+    _random = random.Random(0)
+    _pieces = [
+        "<p class=\"body\">Lorem ipsum dolor sit amet</p>",
+        "\n\t",
+        " updated 2023-09-29 at 12:34 PM ",
+        "<td>consectetur adipiscing elit, 09:15:30</td>",
+        "\r\n",
+        "sed do eiusmod tempor incididunt ut labore",
+        "<a href=\"#section\">next</a>",
+        # a date or a time next to a line break or a tab, which the
+        # normalizer sees once the line break or the tab is removed
+        "Version\t2023-01-01 ok",
+        "2023-09-\n29 x",
+        "a\n12:34 x",
+        " 12:34 2023-09-29 ",
+    ]
+    _pages = []
+    for _ in range(count):
+        _page = []
+        _length = 0
+        while _length < page_size * 1024:
+            _piece = _random.choice(_pieces)
+            _page.append(_piece)
+            _length += len(_piece)
+        _pages.append("".join(_page))
+    return _pages
+
+
+def _legacy_page_text(text: str):
+    """HtmlParser._clean_text before the shared normalizer, with its
+    dates pass applied to the result of the controls pass"""
+    _text = re.sub(r"[\n\r\t]", "", text).strip()
+    _text = re.sub(r"\b\d{4}[-/]\d{2}[-/]\d{2}\b", "", _text)
+    _text = re.sub(r"\b\d{1,2}:\d{2}(?::\d{2})?\s?(AM|PM|am|pm)?\b", "", _text)
+    return _text.strip()
+
+
+def _legacy_chunk_text(text: str):
+    """ChunkWriter._clean before the shared normalizer"""
+    return re.sub(r"<.*?>", "", text).strip()
+
+
+def _run(pages, func, repeat: int):
+    _results = []
+    _start = time.perf_counter()
+    for _ in range(repeat):
+        _results = [func(_page) for _page in pages]
+    _elapsed = time.perf_counter() - _start
+    return _elapsed, _results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text normalizer benchmark")
+    parser.add_argument(
+        "--corpus",
+        type=str,
+        help="Folder with pages, generated pages are used without it",
+        required=False,
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        help="Number of generated pages",
+        required=False,
+        default=100,
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        help="Size of a generated page in KB",
+        required=False,
+        default=128,
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        help="Number of passes over the pages",
+        required=False,
+        default=3,
+    )
+    args = parser.parse_args()
+
+    if args.corpus:
+        _pages = _load_corpus(args.corpus)
+    else:
+        _pages = _generate_pages(args.pages, args.page_size)
+    _megabytes = sum(len(_page) for _page in _pages) / (1024 * 1024) * args.repeat
+    print(f"{len(_pages)} pages, {_megabytes:.1f} MB, {args.repeat} passes")
+
+    _cases = [
+        (
+            "page text",
+            _legacy_page_text,
+            TextNormalizer.get("controls", "dates", "times").normalize,
+        ),
+        (
+            "chunk text",
+            _legacy_chunk_text,
+            TextNormalizer.get("tags").normalize,
+        ),
+    ]
+    for _name, _legacy, _normalize in _cases:
+        _legacy_seconds, _expected = _run(_pages, _legacy, args.repeat)
+        _seconds, _results = _run(_pages, _normalize, args.repeat)
+        _different = sum(
+            1 for _result, _expected_result in zip(_results, _expected)
+            if _result != _expected_result
+        )
+        print(
+            f"{_name:<12} legacy {_megabytes / _legacy_seconds:8.1f} MB/s "
+            f"normalizer {_megabytes / _seconds:8.1f} MB/s "
+            f"speedup {_legacy_seconds / _seconds:5.2f}x "
+            f"different pages {_different}"
+        )
+
+
+if __name__ == "__main__":
+    main()
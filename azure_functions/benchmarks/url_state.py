@@ -0,0 +1,138 @@
+"""Benchmark the crawl URL state against the lists it replaced.
+
+Simulates the link checks of a crawl: every page yields a number of
+links, most of them already visited, and each link is checked and marked
+as visited. Reports the cost of a link check as the number of visited
+URLs grows, for the previous lists, the ordered URL state and the Bloom
+filter mode. The lists are only measured up to --list-limit URLs, their
+cost grows with every URL visited.
+
+    python -m benchmarks.url_state --urls 1000000 --links 50
+"""
+
+import argparse
+import random
+import time
+
+from webcrawler.urlstate import BloomFilter, UrlState
+
+
+class _ListState:
+    """The visited URLs before the URL state"""
+
+    def __init__(self) -> None:
+        self._urls = []
+
+    def add(self, url: str):
+        if url not in self._urls:
+            self._urls.append(url)
+            return True
+        return False
+
+    def __len__(self):
+        return len(self._urls)
+
+
+def _crawl(state, links: int, checkpoints: list):
+    """Check links until the given numbers of URLs were handed out
+
+    Returns:
+        list: URLs and nanoseconds per link check at each checkpoint
+    """
+    _random = random.Random(0)
+    _results = []
+    _checkpoints = list(checkpoints)
+    # URLs handed out so far, a false positive of the Bloom filter leaves
+    # one of them out of the visited URLs
+    _handed_out = 0
+    _checks = 0
+    _start = time.perf_counter()
+    while _checkpoints:
+        for _ in range(links):
+            # a fifth of the links of a page are new, the others were seen
+            if _handed_out and _random.random() < 0.8:
+                _url = f"https://example.com/page/{_random.randrange(_handed_out)}"
+            else:
+                _url = f"https://example.com/page/{_handed_out}"
+                _handed_out += 1
+            state.add(_url)
+            _checks += 1
+        if _handed_out >= _checkpoints[0]:
+            _elapsed = time.perf_counter() - _start
+            _results.append((_checkpoints.pop(0), _elapsed / _checks * 1e9))
+            _checks = 0
+            _start = time.perf_counter()
+    return _results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl URL state benchmark")
+    parser.add_argument(
+        "--urls",
+        type=int,
+        help="Number of visited URLs to reach",
+        required=False,
+        default=1_000_000,
+    )
+    parser.add_argument(
+        "--links",
+        type=int,
+        help="Number of links on a page",
+        required=False,
+        default=50,
+    )
+    parser.add_argument(
+        "--list-limit",
+        type=int,
+        help="Number of visited URLs the lists are measured up to",
+        required=False,
+        default=20_000,
+    )
+    parser.add_argument(
+        "--false-positive-rate",
+        type=float,
+        help="False positive rate of the Bloom filter mode",
+        required=False,
+        default=0.001,
+    )
+    args = parser.parse_args()
+
+    _checkpoints = []
+    _checkpoint = 1000
+    while _checkpoint < args.urls:
+        _checkpoints.append(_checkpoint)
+        _checkpoint *= 10
+    _checkpoints.append(args.urls)
+
+    _bloom_filter = BloomFilter(
+        capacity=args.urls,
+        error_rate=args.false_positive_rate,
+    )
+    _cases = [
+        (
+            "list",
+            _ListState(),
+            [_point for _point in _checkpoints if _point <= args.list_limit],
+        ),
+        ("url state", UrlState(), _checkpoints),
+        ("bloom filter", UrlState(bloom_filter=_bloom_filter), _checkpoints),
+    ]
+    print(f"{'visited urls':>14} " + " ".join(f"{_name:>14}" for _name, _, _ in _cases))
+    _results = {
+        _name: dict(_crawl(_state, args.links, _points))
+        for _name, _state, _points in _cases
+    }
+    for _point in _checkpoints:
+        _row = [
+            f"{_results[_name][_point]:11.0f} ns" if _point in _results[_name] else " " * 14
+            for _name, _, _ in _cases
+        ]
+        print(f"{_point:>14} " + " ".join(_row))
+    print(
+        f"bloom filter {len(_bloom_filter._bits) / (1024 * 1024):.1f} MB, "
+        f"{_bloom_filter.hash_count} hashes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Process wide cache of the configurations stored in blob storage.
+
+A configuration blob is downloaded once per process and kept with its
+ETag, and parsed and validated once by each function that reads it, so
+checking that a configuration exists and loading it share the download.
+Within CONFIG_CACHE_TTL seconds of the last check the cached object is
+returned without any request, after that the blob is revalidated with a
+conditional GET that only downloads it again when its ETag changed. The
+cached objects are shared, treat them as read only.
+
+    Returns:
+        _type_: return the validated configurations and the cache metrics
+"""
+
+import os
+import threading
+import time
+from typing import Callable
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotModifiedError
+from azure.storage.blob import BlobServiceClient
+
+from common.credential import CredentialProvider
+
+# seconds a configuration is used without checking its ETag
+CONFIG_CACHE_TTL = 60
+
+
+class ConfigCache:
+    """Configuration blobs keyed by storage account, container and blob,
+    with the objects parsed from them by each function"""
+
+    _entries: dict[tuple, dict] = {}
+    # clients by storage account and credential, None for the shared one
+    _clients: dict[tuple, BlobServiceClient] = {}
+    _containers: set = set()
+    _lock = threading.Lock()
+    _metrics = {
+        "config_hits": 0,
+        "config_not_modified": 0,
+        "config_downloads": 0,
+    }
+
+    @classmethod
+    def _get_client(
+        cls,
+        storage_account_url: str,
+        credential=None,
+    ) -> BlobServiceClient:
+        _key = (storage_account_url, credential)
+        with cls._lock:
+            _client = cls._clients.get(_key)
+            if _client is None:
+                _client = BlobServiceClient(
+                    account_url=storage_account_url,
+                    credential=credential or CredentialProvider.get_credential(),
+                )
+                cls._clients[_key] = _client
+            return _client
+
+    @classmethod
+    def _count(
+        cls,
+        name: str,
+    ):
+        with cls._lock:
+            cls._metrics[name] += 1
+
+    @classmethod
+    def ensure_container_exists(
+        cls,
+        storage_account_url: str,
+        container_name: str,
+        credential=None,
+    ):
+        """Create the configuration container once per process
+
+        Args:
+            storage_account_url (str): storage account url
+            container_name (str): container name
+        """
+        _key = (storage_account_url, container_name)
+        if _key in cls._containers:
+            return
+        _container_client = cls._get_client(
+            storage_account_url, credential
+        ).get_container_client(container=container_name)
+        if not _container_client.exists():
+            _container_client.create_container()
+        with cls._lock:
+            cls._containers.add(_key)
+
+    @classmethod
+    def get(
+        cls,
+        storage_account_url: str,
+        container_name: str,
+        blob_path: str,
+        parse: Callable[[bytes], object],
+        credential=None,
+    ):
+        """Get a configuration, parsed again only when the blob changed
+
+        Args:
+            storage_account_url (str): storage account url
+            container_name (str): container name
+            blob_path (str): blob path of the configuration
+            parse (Callable): turns the blob content into the configuration
+
+        Raises:
+            ResourceNotFoundError: the configuration does not exist
+
+        Returns:
+            object: parsed configuration
+        """
+        _key = (storage_account_url, container_name, blob_path)
+        _ttl = float(os.getenv("CONFIG_CACHE_TTL", CONFIG_CACHE_TTL))
+        with cls._lock:
+            _entry = cls._entries.get(_key)
+        if _entry and time.monotonic() - _entry["checked"] < _ttl:
+            cls._count("config_hits")
+            return cls._parse(_entry, parse)
+
+        _blob_client = cls._get_client(
+            storage_account_url, credential
+        ).get_blob_client(container=container_name, blob=blob_path)
+        try:
+            if _entry:
+                _downloader = _blob_client.download_blob(
+                    etag=_entry["etag"],
+                    match_condition=MatchConditions.IfModified,
+                )
+            else:
+                _downloader = _blob_client.download_blob()
+        except ResourceNotModifiedError:
+            cls._count("config_not_modified")
+            with cls._lock:
+                _entry["checked"] = time.monotonic()
+            return cls._parse(_entry, parse)
+
+        _entry = {
+            "etag": _downloader.properties.etag,
+            "content": _downloader.readall(),
+            "values": {},
+            "checked": time.monotonic(),
+        }
+        cls._count("config_downloads")
+        _value = cls._parse(_entry, parse)
+        with cls._lock:
+            cls._entries[_key] = _entry
+        return _value
+
+    @classmethod
+    def _parse(
+        cls,
+        entry: dict,
+        parse: Callable[[bytes], object],
+    ):
+        """Object parsed from the content of an entry, once per function"""
+        with cls._lock:
+            if parse in entry["values"]:
+                return entry["values"][parse]
+        # parsed outside the lock, two threads may parse the same content
+        _value = parse(entry["content"])
+        with cls._lock:
+            return entry["values"].setdefault(parse, _value)
+
+    @classmethod
+    def invalidate(
+        cls,
+        storage_account_url: str,
+        container_name: str,
+        blob_path: str,
+    ):
+        """Drop a configuration after it was changed or deleted
+
+        Args:
+            storage_account_url (str): storage account url
+            container_name (str): container name
+            blob_path (str): blob path of the configuration
+        """
+        with cls._lock:
+            cls._entries.pop((storage_account_url, container_name, blob_path), None)
+
+    @classmethod
+    def get_metrics(
+        cls,
+    ):
+        """Cache metrics of the process
+
+        Returns:
+            dict: requests saved, revalidations and downloads
+        """
+        with cls._lock:
+            return dict(cls._metrics)
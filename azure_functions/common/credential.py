@@ -0,0 +1,169 @@
+"""Process wide Azure credential shared by storage, Key Vault, SQL and OpenAI calls.
+
+Building a DefaultAzureCredential walks the whole credential chain
+(environment, managed identity, CLI) and every new instance fetches a
+fresh token. This module keeps a single credential per process and caches
+the access tokens per scope until shortly before they expire.
+
+    Returns:
+        _type_: return the shared credential and the token cache metrics
+"""
+
+import threading
+import time
+
+from azure.core.credentials import AccessToken
+from azure.identity import DefaultAzureCredential
+
+# refresh the token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+
+
+class CachedTokenCredential:
+    """Token credential wrapper with a per scope token cache.
+
+    It can be passed to any Azure SDK client in place of
+    DefaultAzureCredential.
+    """
+
+    def __init__(
+        self,
+        credential,
+        refresh_margin: int = TOKEN_REFRESH_MARGIN,
+    ) -> None:
+        self._credential = credential
+        self._refresh_margin = refresh_margin
+        self._tokens: dict[tuple, AccessToken] = {}
+        # held while the token of a key is fetched
+        self._key_locks: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.fetched = 0
+        self.cached = 0
+
+    def get_token(
+        self,
+        *scopes: str,
+        **kwargs,
+    ) -> AccessToken:
+        """Get a token for the scopes, from the cache when still valid
+
+        Args:
+            scopes (str): token scopes
+
+        Returns:
+            AccessToken: access token
+        """
+        # a claims challenge must always go to the identity provider
+        if kwargs.get("claims"):
+            with self._lock:
+                self.fetched += 1
+            return self._credential.get_token(*scopes, **kwargs)
+
+        _key = (scopes, kwargs.get("tenant_id"))
+        _token = self._get_cached(_key)
+        if _token:
+            return _token
+        # one refresh per key at a time, the other keys are not held up
+        with self._lock:
+            _key_lock = self._key_locks.setdefault(_key, threading.Lock())
+        with _key_lock:
+            # another thread may have refreshed it while this one waited
+            _token = self._get_cached(_key)
+            if _token:
+                return _token
+            _token = self._credential.get_token(*scopes, **kwargs)
+            with self._lock:
+                self._tokens[_key] = _token
+                self.fetched += 1
+            return _token
+
+    def _get_cached(
+        self,
+        key: tuple,
+    ):
+        with self._lock:
+            _token = self._tokens.get(key)
+            if _token and _token.expires_on - self._refresh_margin > time.time():
+                self.cached += 1
+                return _token
+        return None
+
+    def get_metrics(
+        self,
+    ):
+        """Token cache metrics
+
+        Returns:
+            dict: number of tokens fetched and served from the cache
+        """
+        with self._lock:
+            return {
+                "tokens_fetched": self.fetched,
+                "tokens_cached": self.cached,
+            }
+
+    def close(self):
+        "close the underlying credential"
+        self._credential.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        # the credential is shared by the process, keep it open
+        pass
+
+
+class CredentialProvider:
+    """Holds the credential shared by the whole process"""
+
+    _credential: CachedTokenCredential = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_credential(
+        cls,
+    ) -> CachedTokenCredential:
+        """Get the shared credential, created on first use
+
+        Returns:
+            CachedTokenCredential: shared credential
+        """
+        if cls._credential is None:
+            with cls._lock:
+                if cls._credential is None:
+                    cls._credential = CachedTokenCredential(
+                        DefaultAzureCredential(),
+                    )
+        return cls._credential
+
+    @classmethod
+    def get_token(
+        cls,
+        scope: str,
+    ) -> AccessToken:
+        """Get a token for the scope from the shared credential
+
+        Args:
+            scope (str): token scope
+
+        Returns:
+            AccessToken: access token
+        """
+        return cls.get_credential().get_token(scope)
+
+    @classmethod
+    def get_metrics(
+        cls,
+    ):
+        """Token cache metrics of the shared credential
+
+        Returns:
+            dict: number of tokens fetched and served from the cache
+        """
+        if cls._credential is None:
+            return {
+                "tokens_fetched": 0,
+                "tokens_cached": 0,
+            }
+        return cls._credential.get_metrics()
@@ -0,0 +1,349 @@
+"""Embedding cache shared by the embedding services of the process.
+
+An embedding is keyed by the model, deployment and dimensions it was
+created with and the hash of its text. Lookups go to an in memory LRU of
+EMBEDDING_CACHE_SIZE vectors first and then to a SQLite file holding the
+vectors packed as float32, so unchanged text is never embedded twice on
+the same instance. With a blob configured the SQLite file is merged from
+and written back to blob storage, so the function instances share it.
+Every stored vector records when it was last used; when the cache is
+saved the vectors unused for EMBEDDING_CACHE_MAX_AGE_DAYS are evicted,
+then the least recently used ones beyond EMBEDDING_CACHE_MAX_ROWS, and
+the file is only uploaded when vectors were stored or evicted.
+
+    Returns:
+        _type_: return the cached embeddings and the hit and miss metrics
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient
+
+from common.credential import CredentialProvider
+
+# vectors kept in memory
+EMBEDDING_CACHE_SIZE = 10000
+# vectors kept in the SQLite file, and days an unused vector is kept
+EMBEDDING_CACHE_MAX_ROWS = 100000
+EMBEDDING_CACHE_MAX_AGE_DAYS = 30
+# keys looked up by a single SQLite query
+_QUERY_SIZE = 500
+
+
+class EmbeddingCache:
+    """Two tier embedding cache, safe to share between threads"""
+
+    _caches: dict[str, "EmbeddingCache"] = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
+        self.path = kwargs.get("path") or os.path.join(
+            tempfile.gettempdir(), "embeddings.sqlite"
+        )
+        self.max_items = int(
+            kwargs.get("max_items")
+            or os.getenv("EMBEDDING_CACHE_SIZE", EMBEDDING_CACHE_SIZE)
+        )
+        self.max_rows = int(
+            kwargs.get("max_rows")
+            or os.getenv("EMBEDDING_CACHE_MAX_ROWS", EMBEDDING_CACHE_MAX_ROWS)
+        )
+        self.max_age = 86400 * float(
+            kwargs.get("max_age_days")
+            or os.getenv("EMBEDDING_CACHE_MAX_AGE_DAYS", EMBEDDING_CACHE_MAX_AGE_DAYS)
+        )
+        # optional blob the SQLite file is shared through
+        self.storage_account_url = kwargs.get("storage_account_url")
+        self.container_name = kwargs.get("container_name")
+        self.blob_path = kwargs.get("blob_path")
+        self.credential = kwargs.get("credential")
+
+        self._memory: OrderedDict[str, list] = OrderedDict()
+        # keys looked up since the last save, their use is recorded then
+        self._used: set[str] = set()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB, used REAL)"
+        )
+        if not self._has_used_column("main"):
+            # file of a version that did not record the use of the vectors
+            self._connection.execute("ALTER TABLE embeddings ADD COLUMN used REAL")
+            self._connection.execute("UPDATE embeddings SET used = ?", (time.time(),))
+        self._connection.commit()
+        self._loaded = False
+        self._changed = False
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def _has_used_column(
+        self,
+        schema: str,
+    ):
+        _columns = self._connection.execute(
+            f"PRAGMA {schema}.table_info(embeddings)"
+        ).fetchall()
+        return any(_column[1] == "used" for _column in _columns)
+
+    @classmethod
+    def get(
+        cls,
+        path: str = None,
+        **kwargs,
+    ) -> "EmbeddingCache":
+        """Get the cache of a SQLite file shared by the process, created on
+        first use
+
+        Args:
+            path (str): SQLite file, EMBEDDING_CACHE_PATH by default
+
+        Returns:
+            EmbeddingCache: shared cache
+        """
+        path = path or os.getenv("EMBEDDING_CACHE_PATH")
+        with cls._caches_lock:
+            _cache = cls._caches.get(path)
+            if _cache is None:
+                _cache = EmbeddingCache(path=path, **kwargs)
+                cls._caches[path] = _cache
+            return _cache
+
+    @staticmethod
+    def key(
+        text: str,
+        model: str,
+        deployment: str = None,
+        dimensions: int = None,
+    ):
+        """Cache key of a text embedded with a model
+
+        Args:
+            text (str): embedded text
+            model (str): model name
+            deployment (str): deployment of the model
+            dimensions (int): dimensions of the vectors
+
+        Returns:
+            str: cache key
+        """
+        _text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}|{deployment or ''}|{dimensions or ''}|{_text_hash}"
+
+    def _get_container_client(
+        self,
+    ):
+        return BlobServiceClient(
+            account_url=self.storage_account_url,
+            credential=self.credential or CredentialProvider.get_credential(),
+        ).get_container_client(container=self.container_name)
+
+    def load(
+        self,
+    ):
+        """Merge the embeddings of the other instances from the blob, once"""
+        with self._lock:
+            if self._loaded or not self.blob_path:
+                self._loaded = True
+                return
+            self._loaded = True
+        _download_path = f"{self.path}.download"
+        try:
+            with self._get_container_client() as _container_client:
+                _content = _container_client.download_blob(self.blob_path).readall()
+        except ResourceNotFoundError:
+            return
+        with open(_download_path, "wb") as _file:
+            _file.write(_content)
+        with self._lock:
+            self._connection.execute("ATTACH DATABASE ? AS shared", (_download_path,))
+            try:
+                if self._has_used_column("shared"):
+                    _cursor = self._connection.execute(
+                        "INSERT OR IGNORE INTO embeddings (key, vector, used) "
+                        "SELECT key, vector, used FROM shared.embeddings"
+                    )
+                else:
+                    # a file written before the vectors recorded their use
+                    _cursor = self._connection.execute(
+                        "INSERT OR IGNORE INTO embeddings (key, vector, used) "
+                        "SELECT key, vector, ? FROM shared.embeddings",
+                        (time.time(),),
+                    )
+                _merged = _cursor.rowcount
+                self._connection.commit()
+            finally:
+                self._connection.execute("DETACH DATABASE shared")
+        os.remove(_download_path)
+        self._logger.info(
+            "Embedding cache %s merged %d embeddings", self.blob_path, _merged
+        )
+
+    def get_many(
+        self,
+        keys: list,
+    ):
+        """Look up embeddings, in memory first and then on disk
+
+        Args:
+            keys (list): cache keys
+
+        Returns:
+            dict: embedding by key for the keys found
+        """
+        _found = {}
+        _missing = []
+        with self._lock:
+            for _key in dict.fromkeys(keys):
+                _vector = self._memory.get(_key)
+                if _vector is None:
+                    _missing.append(_key)
+                    continue
+                self._memory.move_to_end(_key)
+                _found[_key] = _vector
+                self._used.add(_key)
+                self.memory_hits += 1
+
+            for _index in range(0, len(_missing), _QUERY_SIZE):
+                _batch = _missing[_index:_index + _QUERY_SIZE]
+                # the keys are passed as one JSON array so that the
+                # statement stays the same whatever the size of the batch
+                _rows = self._connection.execute(
+                    "SELECT key, vector FROM embeddings "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (json.dumps(_batch),),
+                ).fetchall()
+                for _key, _blob in _rows:
+                    _vector = array("f", _blob).tolist()
+                    _found[_key] = _vector
+                    self._used.add(_key)
+                    self._remember(_key, _vector)
+                self.disk_hits += len(_rows)
+                self.misses += len(_batch) - len(_rows)
+        return _found
+
+    def put_many(
+        self,
+        embeddings: dict,
+    ):
+        """Store new embeddings in both tiers
+
+        Args:
+            embeddings (dict): embedding by cache key
+        """
+        if not embeddings:
+            return
+        with self._lock:
+            for _key, _vector in embeddings.items():
+                self._remember(_key, _vector)
+            _now = time.time()
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, used) VALUES (?, ?, ?)",
+                [
+                    (_key, array("f", _vector).tobytes(), _now)
+                    for _key, _vector in embeddings.items()
+                ],
+            )
+            self._connection.commit()
+            self.stored += len(embeddings)
+            self._changed = True
+
+    def _remember(
+        self,
+        key: str,
+        vector: list,
+    ):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _evict(
+        self,
+    ):
+        """Record the use of the looked up vectors, then delete the vectors
+        unused for too long and the least recently used beyond max_rows
+
+        Returns:
+            int: vectors deleted
+        """
+        _now = time.time()
+        self._connection.executemany(
+            "UPDATE embeddings SET used = ? WHERE key = ?",
+            [(_now, _key) for _key in self._used],
+        )
+        self._used = set()
+        _evicted = self._connection.execute(
+            "DELETE FROM embeddings WHERE used < ?", (_now - self.max_age,)
+        ).rowcount
+        _rows = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if _rows > self.max_rows:
+            _evicted += self._connection.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY used LIMIT ?)",
+                (_rows - self.max_rows,),
+            ).rowcount
+        self._connection.commit()
+        if _evicted:
+            # give the space of the deleted vectors back
+            self._connection.execute("VACUUM")
+        return _evicted
+
+    def save(
+        self,
+    ):
+        """Evict the old vectors and write the SQLite file back to the blob
+        when embeddings were stored or evicted"""
+        with self._lock:
+            _evicted = self._evict()
+            self.evicted += _evicted
+            if _evicted:
+                self._changed = True
+            if not self.blob_path or not self._changed:
+                return
+            self._changed = False
+            with open(self.path, "rb") as _file:
+                _content = _file.read()
+        with self._get_container_client() as _container_client:
+            _container_client.upload_blob(
+                name=self.blob_path,
+                data=_content,
+                overwrite=True,
+            )
+
+    def get_metrics(
+        self,
+    ):
+        """Cache metrics
+
+        Returns:
+            dict: hits of each tier, misses and stored embeddings
+        """
+        with self._lock:
+            _lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "embedding_memory_hits": self.memory_hits,
+                "embedding_disk_hits": self.disk_hits,
+                "embedding_misses": self.misses,
+                "embedding_stored": self.stored,
+                "embedding_evicted": self.evicted,
+                "embedding_hit_ratio": (
+                    round((self.memory_hits + self.disk_hits) / _lookups, 3)
+                    if _lookups
+                    else 0
+                ),
+            }
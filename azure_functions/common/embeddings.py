@@ -1,5 +1,6 @@
 "Class for emeddings"
 import logging
+import os
 from abc import ABC
 from typing import List
 import tiktoken
@@ -14,6 +15,7 @@ from tenacity import (
     wait_random_exponential,
 )
 
+from common.embeddingcache import EmbeddingCache
 from common.embeddingsbatch import EmbeddingBatch
 
 
@@ -29,11 +31,20 @@ class OpenAIEmbeddings(ABC):
         batch_aoai_model: str,
         disable_batch: bool = False,
         verbose: bool = False,
+        cache: EmbeddingCache = None,
+        dimensions: int = None,
     ):
         self.open_ai_model_name = open_ai_model_name
         self.disable_batch = disable_batch
         self.verbose = verbose
         self.batch_aoai_model = batch_aoai_model
+        self.open_ai_deployment = None
+        self.dimensions = dimensions
+        # embeddings of the texts already seen, shared by the process
+        # when EMBEDDING_CACHE_PATH is set
+        if cache is None and os.getenv("EMBEDDING_CACHE_PATH"):
+            cache = EmbeddingCache.get()
+        self.cache = cache
 
     def create_client(self) -> OpenAI:
         "Client for Open AI"
@@ -48,7 +59,11 @@ class OpenAIEmbeddings(ABC):
 
     def calculate_token_length(self, text: str):
         "Calculate Token Length"
-        encoding = tiktoken.encoding_for_model(self.open_ai_model_name)
+        try:
+            encoding = tiktoken.encoding_for_model(self.open_ai_model_name)
+        except KeyError:
+            # an Azure deployment name is not a model name tiktoken knows
+            encoding = tiktoken.get_encoding("cl100k_base")
         return len(encoding.encode(text))
 
     def split_text_to_batches(self, texts: List[str]) -> List[EmbeddingBatch]:
@@ -81,10 +96,51 @@ class OpenAIEmbeddings(ABC):
 
         return batches
 
+    def _get_options(self) -> dict:
+        if self.dimensions:
+            return {"dimensions": self.dimensions}
+        return {}
+
+    def _get_cached(self, texts: List[str], embed) -> List[List[float]]:
+        """Embed only the texts missing from the cache
+
+        Args:
+            texts (List[str]): texts to embed
+            embed (Callable): embeds a list of texts
+
+        Returns:
+            List[List[float]]: embeddings in the same order as the texts
+        """
+        if self.cache is None:
+            return embed(texts)
+        self.cache.load()
+        _keys = [
+            EmbeddingCache.key(
+                text,
+                self.open_ai_model_name,
+                self.open_ai_deployment,
+                self.dimensions,
+            )
+            for text in texts
+        ]
+        _found = self.cache.get_many(_keys)
+        _missing = {}
+        for _key, text in zip(_keys, texts):
+            if _key not in _found:
+                _missing[_key] = text
+        if _missing:
+            _embeddings = dict(zip(_missing, embed(list(_missing.values()))))
+            self.cache.put_many(_embeddings)
+            _found.update(_embeddings)
+        return [_found[_key] for _key in _keys]
+
     # Creating Emedding batch with max limit of configurable value
     # (1000 default one)
     def create_embedding_batch(self, texts: List[str]) -> List[List[float]]:
         "Creating Emedding batch with max limit of configurable value"
+        return self._get_cached(texts, self._embed_batch)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
         batches = self.split_text_to_batches(texts)
         embeddings = []
         client = self.create_client()
@@ -97,7 +153,9 @@ class OpenAIEmbeddings(ABC):
             ):
                 with attempt:
                     emb_response = client.embeddings.create(
-                        model=self.open_ai_model_name, input=batch.texts
+                        model=self.open_ai_model_name,
+                        input=batch.texts,
+                        **self._get_options(),
                     )
                     embeddings.extend([data.embedding for data in emb_response.data])
                     # return generated emeddings with Azure Open AI vectors
@@ -106,6 +164,11 @@ class OpenAIEmbeddings(ABC):
     # Create a single emeddings out of the batch
     def create_embedding_single(self, text: str) -> List[float]:
         "Create a single emeddings out of the batch"
+        return self._get_cached(
+            [text], lambda texts: [self._embed_single(texts[0])]
+        )[0]
+
+    def _embed_single(self, text: str) -> List[float]:
         client = self.create_client()
         for attempt in Retrying(
             retry=retry_if_exception_type(RateLimitError),
@@ -115,7 +178,9 @@ class OpenAIEmbeddings(ABC):
         ):
             with attempt:
                 emb_response = client.embeddings.create(
-                    model=self.open_ai_model_name, input=text
+                    model=self.open_ai_model_name,
+                    input=text,
+                    **self._get_options(),
                 )
         # return single emedding
         return emb_response.data[0].embedding
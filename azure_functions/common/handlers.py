@@ -1,10 +1,10 @@
 "Key Vault Handler"
 import os
 
-from azure.identity import DefaultAzureCredential
-
 from azure.keyvault.secrets import SecretClient
 
+from common.credential import CredentialProvider
+
 
 class KeyVaultHandler:
     "To return secrets from the key vault"
@@ -20,7 +20,7 @@ class KeyVaultHandler:
     ):
         _key_vault_url = self.key_vault_url
         _secret_name = kwargs.get("secret_name")
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
         _secret_client = SecretClient(
             _key_vault_url,
             _credential,
@@ -0,0 +1,147 @@
+"""Parse executor for the CPU bound HTML, ASPX and JSON parsing.
+
+A parse job is the dotted name of a module level parse function, the raw
+bytes of the document, or the path of a file holding them, and a few
+small keyword arguments; the result is whatever the parse function
+returns, the list of chunks with their metadata for HTML and ASPX and a
+dict with the chunks, the size and the peak memory of the parse for JSON.
+With PARSE_PROCESSES set the jobs
+run on a process pool that is created once and kept warm for the life of
+the process, otherwise they run in the calling thread.
+
+    Returns:
+        _type_: return the chunks and metadata produced by the parser
+"""
+
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Union
+
+# parse functions already imported in this process
+_FUNCTIONS = {}
+
+
+def _get_function(func_path: str):
+    _function = _FUNCTIONS.get(func_path)
+    if _function is None:
+        _module_name, _function_name = func_path.rsplit(".", 1)
+        _module = importlib.import_module(_module_name)
+        _function = getattr(_module, _function_name)
+        _FUNCTIONS[func_path] = _function
+    return _function
+
+
+def _run_job(func_path: str, content: Union[bytes, str], kwargs: dict):
+    """Entry point of a parse job in the worker process"""
+    return _get_function(func_path)(content, **kwargs)
+
+
+def _new_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Process pool whose workers do not fork the calling process, which
+    runs asyncio and thread pools whose locks a fork would inherit"""
+    _method = (
+        "forkserver"
+        if "forkserver" in multiprocessing.get_all_start_methods()
+        else "spawn"
+    )
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(_method),
+    )
+
+
+class ParseExecutor:
+    """Runs parse jobs in a process pool or in the calling thread"""
+
+    _executor: "ParseExecutor" = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_workers: int = 0,
+    ) -> None:
+        self.max_workers = max_workers
+        self._pool = None
+        if max_workers > 0:
+            self._pool = _new_pool(max_workers)
+
+    @classmethod
+    def get(
+        cls,
+    ) -> "ParseExecutor":
+        """Get the executor shared by the process, created on first use
+
+        Returns:
+            ParseExecutor: shared executor
+        """
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ParseExecutor(
+                        max_workers=int(os.getenv("PARSE_PROCESSES", "0")),
+                    )
+                    atexit.register(cls._executor.shutdown)
+        return cls._executor
+
+    def submit(
+        self,
+        func_path: str,
+        content: Union[bytes, str],
+        **kwargs,
+    ) -> Future:
+        """Submit a parse job
+
+        Args:
+            func_path (str): dotted name of the module level parse function
+            content (Union[bytes, str]): raw document, or the path of a file holding it
+
+        Returns:
+            Future: future of the chunks and metadata
+        """
+        if self._pool is not None:
+            return self._pool.submit(_run_job, func_path, content, kwargs)
+        _future = Future()
+        try:
+            _future.set_result(_run_job(func_path, content, kwargs))
+        except Exception as e:
+            _future.set_exception(e)
+        return _future
+
+    def parse(
+        self,
+        func_path: str,
+        content: Union[bytes, str],
+        **kwargs,
+    ):
+        """Run a parse job and wait for its result
+
+        Args:
+            func_path (str): dotted name of the module level parse function
+            content (Union[bytes, str]): raw document, or the path of a file holding it
+
+        Returns:
+            list: chunks and metadata
+        """
+        _pool = self._pool
+        try:
+            return self.submit(func_path, content, **kwargs).result()
+        except BrokenProcessPool:
+            # a worker died, start a new pool and run the job once more
+            with self._lock:
+                if self._pool is _pool:
+                    _pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = _new_pool(self.max_workers)
+            return self.submit(func_path, content, **kwargs).result()
+
+    def shutdown(
+        self,
+    ):
+        "stop the worker processes"
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
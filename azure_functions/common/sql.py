@@ -3,10 +3,11 @@ import struct
 import urllib
 import pyodbc
 
-from azure.identity import DefaultAzureCredential
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from common.credential import CredentialProvider
+
 
 class SqlConnector:
     "SQL Connector class for SQL operations"
@@ -26,8 +27,7 @@ class SqlConnector:
 
     def _get_access_token(self):
         _scope = "https://database.windows.net/.default"
-        _credential = DefaultAzureCredential()
-        _access_token = _credential.get_token(_scope)
+        _access_token = CredentialProvider.get_token(_scope)
         return _access_token
 
     def _get_token_struct(self):
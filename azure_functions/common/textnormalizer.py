@@ -0,0 +1,202 @@
+"""Text normalization shared by the parsers.
+
+The enabled rules of a normalizer are compiled once into alternations
+guarded by the characters the rules start with, so a text is cleaned in
+at most three scans whatever the number of rules, for str and for UTF-8
+bytes alike. Removing a match joins the text around it, "a\n12:34"
+becomes "a12:34" where the time no longer starts on a word boundary, so
+the rules run in passes on the result of the previous ones, the tags and
+controls, then the dates and times, then the whitespace, and return the
+text of each rule run on its own in order.
+
+    Rules:
+        tags        remove markup tags
+        controls    remove newlines, carriage returns and tabs
+        dates       remove dates such as 2023-09-29 or 2023/09/29
+        times       remove times such as 12:34, 12:34:56 or 12:34 PM
+        whitespace  collapse runs of whitespace to a single space
+
+remove_classes drops the boilerplate classes of a page from its tags
+before its text is taken.
+"""
+
+import re
+import threading
+import unicodedata
+from typing import Iterable, Union
+
+# rules in the order they run with the characters their matches start
+# with
+_RULES = {
+    "tags": ("<", r"<.*?>"),
+    "controls": (r"\n\r\t", r"[\n\r\t]+"),
+    # a digit not following a word character is \b\d, written so that the
+    # regex engine can skip to the next digit
+    "dates": (r"\d", r"\d(?<!\w\d)\d{3}[-/]\d{2}[-/]\d{2}\b"),
+    "times": (r"\d", r"\d(?<!\w\d)\d?:\d{2}(?::\d{2})?\s?(?:AM|PM|am|pm)?\b"),
+    "whitespace": (r"\s", r"\s+"),
+}
+# replacement of the rules that do not remove their match
+_REPLACEMENTS = {"whitespace": " "}
+# rules of each pass, the rules of a pass cannot make or break a match of
+# one another
+_PASSES = (("tags", "controls"), ("dates",), ("times",), ("whitespace",))
+
+
+def _replacement(match):
+    return _REPLACEMENTS.get(match.lastgroup, "")
+
+
+def _bytes_replacement(match):
+    return _REPLACEMENTS.get(match.lastgroup, "").encode()
+
+
+class TextNormalizer:
+    """Precompiled text cleaner"""
+
+    _normalizers: dict[tuple, "TextNormalizer"] = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        rules: Iterable[str],
+        strip: bool = True,
+        unicode_form: str = None,
+    ) -> None:
+        rules = set(rules)
+        self.rules = tuple(_rule for _rule in _RULES if _rule in rules)
+        _unknown = rules - set(_RULES)
+        if _unknown:
+            raise ValueError(f"Unknown normalization rules {sorted(_unknown)}")
+        self.strip = strip
+        self.unicode_form = unicode_form
+
+        # each pass is a pattern, its bytes pattern and their replacements
+        self._passes = [
+            self._compile(_rules)
+            for _rules in (
+                [_rule for _rule in self.rules if _rule in _pass_rules]
+                for _pass_rules in _PASSES
+            )
+            if _rules
+        ]
+
+    @staticmethod
+    def _compile(
+        rules: list,
+    ) -> tuple:
+        """Compile rules into a single alternation
+
+        Args:
+            rules (list): names of the rules in the order they are tried
+
+        Returns:
+            tuple: pattern, bytes pattern, replacement and bytes replacement
+        """
+        if len(rules) == 1:
+            # a single rule keeps the prefix search of the regex engine
+            _pattern = _RULES[rules[0]][1]
+        else:
+            # the lookahead on the first characters skips the positions where
+            # no rule can match without trying every alternative there
+            _first = "".join(dict.fromkeys(_RULES[_rule][0] for _rule in rules))
+            _pattern = "|".join(f"(?P<{_rule}>{_RULES[_rule][1]})" for _rule in rules)
+            _pattern = f"(?=[{_first}])(?:{_pattern})"
+        # the replacement only needs the match when a rule keeps something
+        if len(rules) == 1:
+            _replace = _REPLACEMENTS.get(rules[0], "")
+            _bytes_replace = _replace.encode()
+        elif any(_rule in _REPLACEMENTS for _rule in rules):
+            _replace = _replacement
+            _bytes_replace = _bytes_replacement
+        else:
+            _replace = ""
+            _bytes_replace = b""
+        return re.compile(_pattern), re.compile(_pattern.encode()), _replace, _bytes_replace
+
+    @classmethod
+    def get(
+        cls,
+        *rules: str,
+        strip: bool = True,
+        unicode_form: str = None,
+    ) -> "TextNormalizer":
+        """Get the normalizer of a set of rules, compiled once per process
+
+        Args:
+            rules (str): names of the rules to apply
+            strip (bool): strip the leading and trailing whitespace
+            unicode_form (str): unicode normal form of str results, such as NFC
+
+        Returns:
+            TextNormalizer: shared normalizer
+        """
+        _key = (frozenset(rules), strip, unicode_form)
+        _normalizer = cls._normalizers.get(_key)
+        if _normalizer is None:
+            with cls._lock:
+                _normalizer = cls._normalizers.get(_key)
+                if _normalizer is None:
+                    _normalizer = TextNormalizer(rules, strip, unicode_form)
+                    cls._normalizers[_key] = _normalizer
+        return _normalizer
+
+    def normalize(
+        self,
+        text: Union[str, bytes],
+    ) -> Union[str, bytes]:
+        """Apply the rules to a text
+
+        Args:
+            text (Union[str, bytes]): text, bytes are UTF-8
+
+        Returns:
+            Union[str, bytes]: normalized text of the same type
+        """
+        if isinstance(text, bytes):
+            for _, _bytes_pattern, _, _bytes_replace in self._passes:
+                text = _bytes_pattern.sub(_bytes_replace, text)
+            return text.strip() if self.strip else text
+
+        if self.unicode_form:
+            text = unicodedata.normalize(self.unicode_form, text)
+        for _pattern, _, _replace, _ in self._passes:
+            text = _pattern.sub(_replace, text)
+        return text.strip() if self.strip else text
+
+
+def normalize(
+    text: Union[str, bytes],
+    *rules: str,
+) -> Union[str, bytes]:
+    """Apply normalization rules to a text with the shared normalizer
+
+    Args:
+        text (Union[str, bytes]): text, bytes are UTF-8
+        rules (str): names of the rules to apply
+
+    Returns:
+        Union[str, bytes]: normalized text of the same type
+    """
+    return TextNormalizer.get(*rules).normalize(text)
+
+
+def remove_classes(
+    soup,
+    classes: Iterable[str],
+):
+    """Remove boilerplate classes from the tags of a parsed page, dropping
+    the class attribute of the tags left without one
+
+    Args:
+        soup (BeautifulSoup): parsed page, changed in place
+        classes (Iterable[str]): classes to remove
+    """
+    classes = set(classes or [])
+    # only the tags holding one of the classes need a change
+    if not classes:
+        return
+    for tag in soup.find_all(class_=list(classes)):
+        tag["class"] = [cls for cls in tag["class"] if cls not in classes]
+        if not tag["class"]:
+            tag.attrs.pop("class")
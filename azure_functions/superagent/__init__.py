@@ -4,15 +4,22 @@ Supersearch processing module
 import os
 import json
 import logging
+import time
 
-from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
 from azure.core.exceptions import ResourceNotFoundError
-from azure.identity import DefaultAzureCredential
-from superagent.config import ConfigurationHandler
+from common.configcache import ConfigCache
+from common.credential import CredentialProvider
+from common.parseexecutor import ParseExecutor
+from superagent.config import ConfigurationHandler, Concurrency
 from superagent.manager import SuperAgentManager
 from superagent.ingest import Ingester
+from superagent.pipeline import Pipeline, Stage
+
+# seconds a timer invocation hands out new files, the files in flight are
+# finished after it and the rest is left for the next invocation
+TIME_BUDGET = 600
 
 
 class SuperAgent:
@@ -24,7 +31,7 @@ class SuperAgent:
         *args,
         **kwargs,
     ) -> None:
-        """Initialize the WebCrawler class"""
+        """Initialize the SuperAgent class"""
 
         self._logger = logging.getLogger(__name__)
         self._logger.setLevel(
@@ -33,7 +40,7 @@ class SuperAgent:
                 "INFO",
             )
         )
-        self._credential = DefaultAzureCredential()
+        self._credential = CredentialProvider.get_credential()
 
     def exists(
         self,
@@ -49,23 +56,38 @@ class SuperAgent:
         self,
         *args,
         **kwargs,
-    ):        
+    ):
         _config_name = kwargs.get("config_name", None)
         if self.exists(
             config_name=_config_name,
         ):
             _config_names = ConfigurationHandler().get_config_names(config_name=_config_name)
             _run_start_time = datetime.utcnow()
+            _deadline = time.monotonic() + float(
+                os.environ.get("SUPERAGENT_TIME_BUDGET", TIME_BUDGET)
+            )
             for _config in _config_names:
-                self._process(
-                    config_name=_config,
-                    run_start_time=_run_start_time,
-                )
+                if time.monotonic() >= _deadline:
+                    self._logger.info(
+                        "Time budget spent, %s is left for the next run",
+                        _config,
+                    )
+                    continue
+                try:
+                    self._process(
+                        config_name=_config,
+                        run_start_time=_run_start_time,
+                        deadline=_deadline,
+                    )
+                except Exception:  # pylint: disable=broad-except
+                    # one config failing does not stop the others
+                    self._logger.exception("Ingestion failed for %s", _config)
 
     def _process(
         self,
         config_name: str,
         run_start_time: datetime,
+        deadline: float = None,
     ):
         """Run the superagent"""
         _build_id = os.getenv("BUILD_ID", "Local Build")
@@ -73,11 +95,17 @@ class SuperAgent:
 
         # Run superagent in the same process
         _return_dict = {}
-        self._run_process(_config_name, run_start_time, _return_dict)
+        self._run_process(_config_name, run_start_time, _return_dict, deadline)
         _superagent_summary = _return_dict["superagent_summary"]
         self._logger.info(
             json.dumps(_superagent_summary),
         )
+        self._logger.info(
+            json.dumps(CredentialProvider.get_metrics()),
+        )
+        self._logger.info(
+            json.dumps(ConfigCache.get_metrics()),
+        )
         self._logger.info(
             "Crawl completed for build id %s for %s",
             _build_id,
@@ -89,6 +117,7 @@ class SuperAgent:
         config_name: str,
         run_start_time: datetime,
         return_dict: dict,
+        deadline: float = None,
     ):
 
         _superagent_manager = SuperAgentManager(
@@ -103,57 +132,52 @@ class SuperAgent:
             superagent_summary=_superagent_manager.superagent_summary,
             logger=self._logger,
             config_name=config_name,
+            deadline=deadline,
         )
         return_dict["superagent_summary"] = []
-        conatiner_path = _ingester.data_exists()
-        if conatiner_path:
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                future_to_container = {
-                    executor.submit(_ingester.ingest_page, container): container
-                    for container in conatiner_path
-                }
+        _concurrency = _configuration.concurrency or Concurrency()
+
+        def _save_page_summary(page):
+            # the records are written in batches, see flush_summary
+            _superagent_manager.flush_summary(run_start_time=run_start_time)
+            return page
 
-                for future in as_completed(future_to_container):
-                    container = future_to_container[future]
-                    try:
-                        result = future.result()
-                        if result:
-                            _superagent_manager.superagent_summary.end_time = datetime.now(timezone.utc)
-                            return_dict["superagent_summary"].append(
-                                _superagent_manager.save_summary(
-                                    run_start_time=run_start_time, container=container
-                                )
-                            )
-                    except Exception as e:
-                        self._logger.error(f"Failed to ingest {container}: {e}")
-        else:
-            self._logger.info("No data to ingest for %s", config_name)
-            _superagent_manager.superagent_summary.end_time = datetime.now(timezone.utc)
-            return_dict["superagent_summary"].append(
-                _superagent_manager.save_summary(
-                    run_start_time=run_start_time, container=None
-                )
+        # keep every parse process busy
+        _parse_concurrency = _concurrency.parse or max(2, ParseExecutor.get().max_workers)
+        _pipeline = Pipeline(
+            stages=[
+                Stage("check", _ingester.check_page, 1),
+                Stage("download", _ingester.download_page, _concurrency.download),
+                Stage("parse", _ingester.parse_page, _parse_concurrency),
+                Stage("questions", _ingester.generate_questions, _concurrency.questions),
+                Stage("store", _ingester.store_page, _concurrency.store),
+                Stage("summary", _save_page_summary, _concurrency.summary),
+            ],
+            queue_size=_concurrency.queuesize,
+            logger=self._logger,
+        )
+        try:
+            # the blobs are listed page by page while the pipeline runs
+            _pipeline_metrics = _pipeline.run(_ingester.list_pages())
+            self._logger.info(
+                json.dumps(_pipeline_metrics),
             )
-        # if len(conatiner_path) > 0:
-        #     for container in conatiner_path:
-        #         result = _ingester.ingest_page(container)
-        #         if result:
-        #             _superagent_manager.superagent_summary.end_time = datetime.now(
-        #                 timezone.utc
-        #             )
-        #             return_dict["superagent_summary"].append(
-        #                 _superagent_manager.save_summary(
-        #                     run_start_time=run_start_time, container=container
-        #                 )
-        #             )                
-        # else:
-        #     self._logger.info(
-        #         "No data to ingest for %s",
-        #         config_name,
-        #     )
-        #     _superagent_manager.superagent_summary.end_time = datetime.now(timezone.utc)
-        #     return_dict["superagent_summary"].append(
-        #         _superagent_manager.save_summary(
-        #             run_start_time=run_start_time, container=None
-        #         )
-        #     )
+            _checked = _pipeline_metrics["check"]
+            if not _checked["processed"] + _checked["dropped"] + _checked["failed"]:
+                self._logger.info("No data to ingest for %s", config_name)
+        except Exception:  # pylint: disable=broad-except
+            # the summary is saved with the pages done before the failure
+            self._logger.exception("Ingestion stopped for %s", config_name)
+            _superagent_manager.superagent_summary.closed_reason = "error"
+        # the manifest, the checkpoint and the caches are flushed even when
+        # the listing or the pipeline fails
+        try:
+            _ingester.close(failed=_pipeline.failed_items)
+        except Exception:  # pylint: disable=broad-except
+            # close logs each flush that failed
+            _superagent_manager.superagent_summary.closed_reason = "error"
+        if _ingester.stopped and _superagent_manager.superagent_summary.closed_reason is None:
+            _superagent_manager.superagent_summary.closed_reason = "time budget"
+        return_dict["superagent_summary"].append(
+            _superagent_manager.save_summary(run_start_time=run_start_time)
+        )
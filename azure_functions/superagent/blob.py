@@ -1,6 +1,13 @@
-from azure.identity import DefaultAzureCredential
+import base64
+from datetime import datetime
+
 from azure.storage.blob import BlobServiceClient
 
+from common.credential import CredentialProvider
+
+APPEND_BLOCK_SIZE = 4 * 1024 * 1024
+LIST_PAGE_SIZE = 5000
+
 
 class BlobHandler:
 
@@ -31,7 +38,7 @@ class BlobHandler:
         Returns:
             None
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
         if credential:
             _credential = credential
         _blob_service_client = BlobServiceClient(
@@ -70,7 +77,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
         if credential:
             _credential = credential
 
@@ -85,6 +92,38 @@ class BlobHandler:
         _blob = _blob_client.download_blob().readall()
         return _blob
 
+    @classmethod
+    def download_chunks(
+        cls,
+        storage_account_url: str,
+        container_name: str,
+        blob_path: str,
+        credential=None,
+    ):
+        """Download blob a chunk at a time
+
+        Args:
+            storage_account_url (_type_): storage account url
+            container_name (_type_): container name
+            blob_path (_type_): blob path
+
+        Returns:
+            Iterator[bytes]: chunks of the blob content
+        """
+        _credential = CredentialProvider.get_credential()
+        if credential:
+            _credential = credential
+
+        _blob_service_client = BlobServiceClient(
+            account_url=storage_account_url,
+            credential=_credential,
+        )
+        _container_client = _blob_service_client.get_container_client(
+            container=container_name
+        )
+        _blob_client = _container_client.get_blob_client(blob=blob_path)
+        yield from _blob_client.download_blob().chunks()
+
     @classmethod
     def ensure_container_exists(
         cls,
@@ -104,7 +143,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
         if credential:
             _credential = credential
         _blob_service_client = BlobServiceClient(
@@ -137,7 +176,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
 
         _blob_service_client = BlobServiceClient(
             account_url=storage_account_url,
@@ -168,7 +207,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
 
         _blob_service_client = BlobServiceClient(
             account_url=storage_account_url,
@@ -200,7 +239,7 @@ class BlobHandler:
         Returns:
             None
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
 
         _blob_service_client = BlobServiceClient(
             account_url=storage_account_url,
@@ -212,6 +251,46 @@ class BlobHandler:
         _blob_client = _container_client.get_blob_client(blob=blob_path)
         _blob_client.delete_blob()
 
+    @classmethod
+    def append(
+        cls,
+        storage_account_url: str,
+        container_name: str,
+        blob_path: str,
+        content: bytes,
+        credential=None,
+    ):
+        """Append to an append blob, created when it does not exist
+
+        Args:
+            storage_account_url (_type_): storage account url
+            container_name (_type_): container name
+            blob_path (_type_): blob path
+            content (_type_): content
+
+        Raises:
+            Exception: exception in case of failure
+
+        Returns:
+            None
+        """
+        _credential = CredentialProvider.get_credential()
+        if credential:
+            _credential = credential
+        _blob_service_client = BlobServiceClient(
+            account_url=storage_account_url,
+            credential=_credential,
+        )
+        _container_client = _blob_service_client.get_container_client(
+            container=container_name
+        )
+        _blob_client = _container_client.get_blob_client(blob=blob_path)
+        if not _blob_client.exists():
+            _blob_client.create_append_blob()
+        # an append block is at most 4 MiB
+        for _start in range(0, len(content), APPEND_BLOCK_SIZE):
+            _blob_client.append_block(content[_start:_start + APPEND_BLOCK_SIZE])
+
     @classmethod
     def blob_exists(
         cls,
@@ -232,7 +311,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
 
         _blob_service_client = BlobServiceClient(
             account_url=storage_account_url,
@@ -243,36 +322,60 @@ class BlobHandler:
         )
         _blob_client = _container_client.get_blob_client(blob=blob_path)
         return _blob_client.exists()
-    
+
     @classmethod
-    def get_blob_list(
-        cls, container_name, directory_path, accountcredentials, account_url
+    def list_blob_pages(
+        cls,
+        container_name: str,
+        directory_path: str,
+        accountcredentials=None,
+        account_url: str = None,
+        continuation_token: str = None,
+        modified_since: datetime = None,
+        results_per_page: int = LIST_PAGE_SIZE,
     ):
-        """Get list of blobs under given path"""
-        if not accountcredentials:
-            accountcredentials = DefaultAzureCredential()
+        """List the blobs under the given path a page at a time, as the
+        pages arrive, in the order of the listing (blob name)
 
-        # Connect to Azure Blob Storage
+        Args:
+            container_name (str): container name
+            directory_path (str): prefix of the blobs
+            continuation_token (str): token of the page to start from
+            modified_since (datetime): only the blobs modified after this time
+
+        Yields:
+            tuple: blob properties of the page and the token of the next page,
+            None after the last page
+        """
+        if not accountcredentials:
+            accountcredentials = CredentialProvider.get_credential()
         blob_service_client = BlobServiceClient(
             account_url=account_url, credential=accountcredentials
         )
-
-        # Get the container client for the specified container
         container_client = blob_service_client.get_container_client(container_name)
-
-        # List all blobs under the given directory path
-        blobs_list = container_client.list_blobs(name_starts_with=directory_path, include=["metadata"])
-        blobs_info = []
-        for blob in blobs_list:
-            blobs_info.append({
-            "name": blob.name,
-            "size": blob.size,
-            "last_modified": blob.last_modified})
-        blobs_info.sort(key=lambda x: x["last_modified"])
-
-        # Return only the blob names in sorted order
-        #sorted_blob_names = [blob[0] for blob in blobs_info]
-        return blobs_info
+        _pages = container_client.list_blobs(
+            name_starts_with=directory_path,
+            results_per_page=results_per_page,
+        ).by_page(continuation_token=continuation_token)
+        for _page in _pages:
+            blobs_info = []
+            for blob in _page:
+                # listing has no server side time filter
+                if modified_since and blob.last_modified <= modified_since:
+                    continue
+                _content_md5 = blob.content_settings.content_md5
+                blobs_info.append({
+                    "name": blob.name,
+                    "size": blob.size,
+                    "last_modified": blob.last_modified,
+                    "etag": blob.etag,
+                    "content_md5": (
+                        base64.b64encode(_content_md5).decode("utf-8")
+                        if _content_md5
+                        else None
+                    ),
+                })
+            yield blobs_info, _pages.continuation_token
 
     @classmethod
     def get_Blob_Content(
@@ -280,7 +383,7 @@ class BlobHandler:
     ):
         """to get the Blob content related to file path provided"""
         if not accountcredentials:
-            accountcredentials = DefaultAzureCredential()
+            accountcredentials = CredentialProvider.get_credential()
 
         # Connect to Azure Data Lake Storage
         blob_service_client = BlobServiceClient(
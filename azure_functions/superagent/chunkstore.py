@@ -0,0 +1,209 @@
+"""Content addressed store of the chunks written by the superagent.
+
+Chunks are keyed by the hash of their normalized text alone and stored
+once as chunks/{hash}.json, whichever files hold them. The chunk blob
+carries no metadata: the provenance of a file (title, blob path, source
+address, generated questions) is kept in its record files/{file}.json,
+which lists the hash and the metadata of each of its chunks in order, so
+a shared chunk never carries the provenance of another file nor goes
+stale when one of the files holding it changes.
+
+    Layout under the output path:
+        chunks/{hash}.json  content of a chunk
+        files/{file}.json   hashes and metadata of the chunks of a file
+
+The hashes of each file are also listed in its manifest entry. The
+reference counts are rebuilt from the manifest when the run starts, and
+the chunks no file references any more are deleted when the run closes.
+"""
+
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+
+from common.textnormalizer import TextNormalizer
+from superagent.manifest import Manifest
+
+# text compared by the chunk hashes
+_CHUNK_TEXT = TextNormalizer.get("whitespace", unicode_form="NFC")
+# version of the chunk keys, the files stored by an older version are
+# stored again and their chunk blobs rewritten without metadata
+KEY_VERSION = 3
+
+
+class ChunkStore:
+    """Reference counted chunk hashes of a run, safe to share between threads"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
+        self.manifest: Manifest = kwargs.get("manifest")
+        self._refs: dict[str, int] = {}
+        self._stored: set[str] = set()
+        # stored chunks only written by an older version, written again
+        self._outdated: set[str] = set()
+        # chunks being written by a file, the other files wait for them
+        self._writing: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @staticmethod
+    def key(
+        content: bytes,
+    ):
+        """Hash of the chunk text with its whitespace and unicode normalized
+
+        Args:
+            content (bytes): chunk content
+
+        Returns:
+            str: chunk hash
+        """
+        _text = _CHUNK_TEXT.normalize(content.decode("utf-8"))
+        return hashlib.sha256(_text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def blob_name(
+        key: str,
+    ):
+        return f"chunks/{key}.json"
+
+    @staticmethod
+    def record_name(
+        file_name: str,
+    ):
+        return f"files/{file_name}.json"
+
+    @staticmethod
+    def get_record(
+        keys: list,
+        chunks: list,
+    ):
+        """Record of a file, its chunks in order with their metadata
+
+        Args:
+            keys (list): chunk hashes of the file
+            chunks (list): chunks of the file
+
+        Returns:
+            dict: record of the file
+        """
+        return {
+            "chunks": [
+                {"hash": _key, "metadata": _chunk["metadata"]}
+                for _key, _chunk in zip(keys, chunks)
+            ],
+        }
+
+    def load(
+        self,
+    ):
+        """Count the references of every stored chunk from the manifest"""
+        with self._lock:
+            if self._loaded:
+                return
+            _current = set()
+            for _, _entry in self.manifest.items():
+                for _key in set(_entry.get("hashes") or []):
+                    self._refs[_key] = self._refs.get(_key, 0) + 1
+                    self._stored.add(_key)
+                    if _entry.get("keyversion") == KEY_VERSION:
+                        _current.add(_key)
+            self._outdated = self._stored - _current
+            self._loaded = True
+        self._logger.info("Chunk store loaded with %d chunks", len(self._stored))
+
+    def claim(
+        self,
+        keys: list,
+    ):
+        """Split the chunks of a file into the ones it has to write and the
+        ones another file is writing, the stored ones need nothing
+
+        Args:
+            keys (list): chunk hashes of the file
+
+        Returns:
+            tuple: futures of the chunks to write by key, futures to wait for
+        """
+        _own = {}
+        _wait = []
+        with self._lock:
+            for _key in dict.fromkeys(keys):
+                if _key in self._stored and _key not in self._outdated:
+                    continue
+                if _key in self._writing:
+                    _wait.append(self._writing[_key])
+                    continue
+                _future = Future()
+                self._writing[_key] = _future
+                _own[_key] = _future
+        return _own, _wait
+
+    def complete(
+        self,
+        key: str,
+        error: Exception = None,
+    ):
+        """Mark a claimed chunk as written, or failed
+
+        Args:
+            key (str): chunk hash
+            error (Exception): upload failure
+        """
+        with self._lock:
+            _future = self._writing.pop(key)
+            if error is None:
+                self._stored.add(key)
+                self._outdated.discard(key)
+        if error is None:
+            _future.set_result(key)
+        else:
+            _future.set_exception(error)
+
+    def reference(
+        self,
+        keys: list,
+        previous_keys: list = None,
+    ):
+        """Move the references of a file from its previous chunks to the new
+
+        Args:
+            keys (list): chunk hashes of the file
+            previous_keys (list): chunk hashes of its previous version
+
+        Returns:
+            set: chunk hashes of the file that other files hold as well
+        """
+        _previous = set(previous_keys or [])
+        _shared = set()
+        with self._lock:
+            for _key in set(keys):
+                # references of the other files
+                if self._refs.get(_key, 0) - (_key in _previous) > 0:
+                    _shared.add(_key)
+                self._refs[_key] = self._refs.get(_key, 0) + 1
+            for _key in _previous:
+                if _key in self._refs:
+                    self._refs[_key] -= 1
+        return _shared
+
+    def collect(
+        self,
+    ):
+        """Take the chunks no file references any more
+
+        Returns:
+            list: chunk hashes to delete
+        """
+        with self._lock:
+            _keys = [
+                _key
+                for _key in self._stored
+                if self._refs.get(_key, 0) <= 0 and _key not in self._writing
+            ]
+            for _key in _keys:
+                self._stored.discard(_key)
+                self._outdated.discard(_key)
+                self._refs.pop(_key, None)
+        return _keys
@@ -0,0 +1,293 @@
+"""Concurrent writer for the chunks stored by the superagent.
+
+The chunks of a file are uploaded at the same time through one container
+client shared by the run. The number of uploads in flight is limited per
+storage account across every writer in the process, and a file is only
+reported as written once every one of its chunks is acknowledged.
+
+    Output formats:
+        json    one {file}_{index}.json blob per chunk, metadata on the blob
+        jsonl   one {file}.jsonl blob per file, one chunk and its metadata
+                per line, for an indexer in the jsonLines parsing mode
+"""
+
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient
+
+from common.credential import CredentialProvider
+from common.textnormalizer import TextNormalizer
+
+MAX_CONCURRENT_WRITES = 16
+OUTPUT_FORMATS = ("json", "jsonl")
+# ASPX tags removed from the chunk content
+_CHUNK_TEXT = TextNormalizer.get("tags")
+
+
+class ChunkWriter:
+    """Writes the chunks of a file concurrently to the output container"""
+
+    # upload slots shared by the writers of a storage account
+    _account_slots: dict[str, threading.BoundedSemaphore] = {}
+    _slots_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
+        self.account = kwargs.get("storage_account_url")
+        self.path = kwargs.get("path")
+        self.output_format = kwargs.get("output_format") or "json"
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown chunk output format {self.output_format}")
+        self.max_concurrency = kwargs.get("max_concurrency") or MAX_CONCURRENT_WRITES
+        _credential = kwargs.get("credential") or CredentialProvider.get_credential()
+
+        self._service_client = BlobServiceClient(
+            account_url=self.account,
+            credential=_credential,
+        )
+        self._container_client = self._service_client.get_container_client(
+            container=kwargs.get("container_name")
+        )
+        self._slots = self._get_slots(self.account, self.max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="superagent-chunks",
+        )
+        self._metrics_lock = threading.Lock()
+        self.written = 0
+        self.deleted = 0
+
+    @classmethod
+    def _get_slots(
+        cls,
+        account: str,
+        max_concurrency: int,
+    ):
+        with cls._slots_lock:
+            if account not in cls._account_slots:
+                cls._account_slots[account] = threading.BoundedSemaphore(
+                    max_concurrency
+                )
+            return cls._account_slots[account]
+
+    def write(
+        self,
+        blob_path: str,
+        chunks: list,
+    ):
+        """Upload the chunks of a file and wait until all are acknowledged
+
+        Args:
+            blob_path (str): name of the file, the chunks are {blob_path}_{index}.json
+                or the lines of {blob_path}.jsonl
+            chunks (list): chunks with their content and metadata
+
+        Raises:
+            Exception: the first upload failure, after every upload has finished
+        """
+        if self.output_format == "jsonl":
+            self._write_lines(blob_path, chunks)
+            return
+        self.write_named(
+            blob_path,
+            {f"{blob_path}_{_index}.json": _chunk for _index, _chunk in enumerate(chunks)},
+        )
+
+    def write_named(
+        self,
+        blob_path: str,
+        chunks: dict,
+        on_done=None,
+    ):
+        """Upload chunks under the given names and wait until all are acknowledged
+
+        Args:
+            blob_path (str): name of the file the chunks come from
+            chunks (dict): chunk by blob name under the output path
+            on_done (Callable): called with the name and the error, None
+                on success, as each upload finishes
+
+        Raises:
+            Exception: the first upload failure, after every upload has finished
+        """
+        _futures = {
+            _name: self._executor.submit(
+                self._upload,
+                f"{self.path}/{_name}",
+                _chunk["content"],
+                _chunk["metadata"],
+            )
+            for _name, _chunk in chunks.items()
+        }
+        if on_done:
+            for _name, _future in _futures.items():
+                _future.add_done_callback(
+                    lambda future, name=_name: on_done(name, future.exception())
+                )
+        _futures = list(_futures.values())
+        wait(_futures)
+        _errors = [_future.exception() for _future in _futures if _future.exception()]
+        with self._metrics_lock:
+            self.written += len(_futures) - len(_errors)
+        if _errors:
+            self._logger.error(
+                "%d of %d chunks of %s failed to upload",
+                len(_errors),
+                len(_futures),
+                blob_path,
+            )
+            raise _errors[0]
+
+    def write_record(
+        self,
+        name: str,
+        record: dict,
+    ):
+        """Upload a JSON record under the output path and wait until it is
+        acknowledged
+
+        Args:
+            name (str): blob name under the output path
+            record (dict): record
+        """
+        self._executor.submit(
+            self._put,
+            f"{self.path}/{name}",
+            json.dumps(record),
+            None,
+        ).result()
+
+    def _write_lines(
+        self,
+        blob_path: str,
+        chunks: list,
+    ):
+        if not chunks:
+            return
+        _lines = []
+        for _index, _chunk in enumerate(chunks):
+            _line = {
+                "content": self._clean(_chunk["content"]),
+                "chunk_index": _index,
+                **_chunk["metadata"],
+            }
+            _lines.append(json.dumps(_line))
+        _future = self._executor.submit(
+            self._put,
+            f"{self.path}/{blob_path}.jsonl",
+            "\n".join(_lines) + "\n",
+            None,
+        )
+        _future.result()
+        with self._metrics_lock:
+            self.written += len(_lines)
+
+    def delete(
+        self,
+        blob_path: str,
+        count: int,
+        previous_count: int,
+        previous_format: str = "json",
+    ):
+        """Delete the output of the previous version of a file that the
+        new output does not overwrite
+
+        Args:
+            blob_path (str): name of the file
+            count (int): chunk count of the new version
+            previous_count (int): chunk count of the previous version
+            previous_format (str): output format of the previous version
+        """
+        _names = []
+        if previous_format == "json":
+            _start = count if self.output_format == "json" else 0
+            _names = [
+                f"{self.path}/{blob_path}_{_index}.json"
+                for _index in range(_start, previous_count)
+            ]
+        elif previous_count and (self.output_format != "jsonl" or not count):
+            _names = [f"{self.path}/{blob_path}.jsonl"]
+        _futures = [self._executor.submit(self._delete, _name) for _name in _names]
+        for _future in _futures:
+            _future.result()
+
+    def delete_named(
+        self,
+        names: list,
+    ):
+        """Delete chunks by blob name under the output path
+
+        Args:
+            names (list): blob names
+        """
+        _futures = [
+            self._executor.submit(self._delete, f"{self.path}/{_name}")
+            for _name in names
+        ]
+        for _future in _futures:
+            _future.result()
+
+    def _clean(
+        self,
+        body: bytes,
+    ):
+        return _CHUNK_TEXT.normalize(body.decode("utf-8"))
+
+    def _upload(
+        self,
+        name: str,
+        body: bytes,
+        metadata: dict,
+    ):
+        self._put(name, json.dumps({"content": self._clean(body)}), metadata)
+
+    def _put(
+        self,
+        name: str,
+        data: str,
+        metadata: dict,
+    ):
+        with self._slots:
+            self._container_client.upload_blob(
+                name=name,
+                data=data,
+                overwrite=True,
+                metadata=metadata,
+            )
+
+    def _delete(
+        self,
+        name: str,
+    ):
+        with self._slots:
+            try:
+                self._container_client.delete_blob(name)
+            except ResourceNotFoundError:
+                return
+        with self._metrics_lock:
+            self.deleted += 1
+
+    def get_metrics(
+        self,
+    ):
+        """Write metrics
+
+        Returns:
+            dict: chunks written and stale chunks deleted
+        """
+        with self._metrics_lock:
+            return {
+                "chunks_written": self.written,
+                "chunks_deleted": self.deleted,
+            }
+
+    def close(
+        self,
+    ):
+        """Wait for the uploads in flight and release the client"""
+        self._executor.shutdown(wait=True)
+        self._service_client.close()
@@ -7,8 +7,10 @@ import yaml
 from typing import List, Optional
 from pydantic import BaseModel
 
+from azure.core.exceptions import ResourceNotFoundError
 from azure.identity import AzureCliCredential
 
+from common.configcache import ConfigCache
 from superagent.blob import BlobHandler
 
 
@@ -27,30 +29,68 @@ class OpenAI(BaseModel):
     questionmodeldeployment: str
     questionmodelversion: str
     wordlimit:int
+    embeddingmodel: Optional[str] = None
+    embeddingdimensions: Optional[int] = None
+    # reuse the embeddings of unchanged text between runs
+    embeddingcache: Optional[bool] = None
+    batchtokenlimit: Optional[int] = None
+    batchsize: Optional[int] = None
+    generatequestions: Optional[bool] = None
+    questionbatchsize: Optional[int] = None
+    questiontokensperminute: Optional[int] = None
+    # completion tokens allowed for each generated question
+    questionmaxtokens: Optional[int] = None
 
 
 class Document(BaseModel):
     storage: Optional[Storage] = None
+    pagesize: Optional[int] = None
+    # only list the blobs modified since the last complete listing
+    watermark: Optional[bool] = None
 
 
 class Logs(BaseModel):
     storage: Storage
+    flushsize: Optional[int] = None
+    flushseconds: Optional[int] = None
 
 
 class SuperAgentIndex(BaseModel):
     storage: Storage
-    
-    
+    flushsize: Optional[int] = None
+    compactsegments: Optional[int] = None
+
+
 class StorageOutput(BaseModel):
     storage: Storage
-    
+    # json writes a blob per chunk, jsonl a blob per source file
+    format: Optional[str] = None
+    # store the chunks shared by several files once, json format only
+    dedup: Optional[bool] = None
+
+
+class Concurrency(BaseModel):
+    download: int = 8
+    # by default one per parse process of PARSE_PROCESSES, at least 2
+    parse: Optional[int] = None
+    questions: int = 2
+    store: int = 8
+    chunkwrites: int = 16
+    summary: int = 1
+    queuesize: int = 32
+
 
 class SuperAgentConfig(BaseModel):
     documents: Document
     storageoutput:Optional[StorageOutput] = None
     logs: Optional[Logs] = None
-    index: Optional[SuperAgentIndex] = None    
+    index: Optional[SuperAgentIndex] = None
     openai: Optional[OpenAI] = None
+    concurrency: Optional[Concurrency] = None
+
+
+def _parse_configuration(content: bytes) -> SuperAgentConfig:
+    return SuperAgentConfig.model_validate(yaml.safe_load(content)["superagent"])
 
 
 # Configuration used within the solution
@@ -99,22 +139,47 @@ class ConfigurationHandler:
         self.configuration_container_name = _container_name
         self.configuration_folder_name = _folder_name
 
-        BlobHandler.ensure_container_exists(
+        ConfigCache.ensure_container_exists(
             storage_account_url=self.configuration_storage_account_url,
             container_name=self.configuration_container_name,
             credential=self.credential,
         )
 
-    def exists(
+    def _get(
         self,
-        config_name,
+        name: str,
+        parse,
     ):
-        return BlobHandler.blob_exists(
+        return ConfigCache.get(
             storage_account_url=self.configuration_storage_account_url,
             container_name=self.configuration_container_name,
-            blob_path=f"{self.configuration_folder_name}/{config_name}",
+            blob_path=f"{self.configuration_folder_name}/{name}",
+            parse=parse,
+            credential=self.credential,
+        )
+
+    def _invalidate(
+        self,
+        name: str,
+    ):
+        ConfigCache.invalidate(
+            storage_account_url=self.configuration_storage_account_url,
+            container_name=self.configuration_container_name,
+            blob_path=f"{self.configuration_folder_name}/{name}",
         )
 
+    def exists(
+        self,
+        config_name,
+    ):
+        # reads the configuration into the cache for get_config_names and
+        # load, which share its download
+        try:
+            self._get(config_name, yaml.safe_load)
+        except ResourceNotFoundError:
+            return False
+        return True
+
     def get_config_names(
         self,
         config_name,
@@ -124,12 +189,7 @@ class ConfigurationHandler:
         Returns:
             list: List of with their configurations and schedules.
         """
-        _configuration = BlobHandler.download(
-            storage_account_url=self.configuration_storage_account_url,
-            container_name=self.configuration_container_name,
-            blob_path=f"{self.configuration_folder_name}/{config_name}",
-        )
-        _configuration = yaml.safe_load(_configuration)
+        _configuration = self._get(config_name, yaml.safe_load)
         # Preprocess raw into the expected dictionary format
         _raw_config = _configuration.get("superagent", [])
         return _raw_config
@@ -156,6 +216,7 @@ class ConfigurationHandler:
             content=yaml.dump(_configuration),  # Convert the dict back to
             overwrite=True,
         )
+        self._invalidate(file_name)
 
     def load(
         self,
@@ -169,16 +230,7 @@ class ConfigurationHandler:
         Returns:
             object: configuration
         """
-        _configuration = BlobHandler.download(
-            storage_account_url=self.configuration_storage_account_url,
-            container_name=self.configuration_container_name,
-            blob_path=f"{self.configuration_folder_name}/{name}"
-        )
-        _configuration = yaml.safe_load(_configuration)
-        _validated_configuration = SuperAgentConfig.model_validate(
-            _configuration["superagent"]
-        )
-        return _validated_configuration
+        return self._get(name, _parse_configuration)
 
     def save(
         self,
@@ -209,6 +261,7 @@ class ConfigurationHandler:
             overwrite=True,
             credential=self.credential,
         )
+        self._invalidate(name)
 
     def _load_local(self, name: str):
         """Load configuration from local file
@@ -238,8 +291,8 @@ class ConfigurationHandler:
         else:
             if not self.args.no_validate:
                 SuperAgentConfig.model_validate(_configuration["superagent"])
+            # save adds the folder of the configurations
             _blob_path = os.path.basename(file_path)
-            _blob_path = f"{self.configuration_folder_name}/{_blob_path}"
             self.save(
                 name=_blob_path,
                 configuration=_configuration,
@@ -255,6 +308,7 @@ class ConfigurationHandler:
             container_name=self.configuration_container_name,
             blob_path=f"{self.configuration_folder_name}/{config_name}",
         )
+        self._invalidate(config_name)
 
     def load_local(self, file_path: str):
         _configuration = self._load_local(name=file_path)
@@ -0,0 +1,79 @@
+"""Azure OpenAI embeddings for the superagent.
+
+Reuses the token aware batching of common.embeddings.OpenAIEmbeddings so
+that many chunks go in a single embeddings request, with one client kept
+for the lifetime of the ingester.
+"""
+
+import threading
+from typing import List
+
+from azure.identity import get_bearer_token_provider
+from openai import AzureOpenAI, OpenAI
+
+from common.embeddingcache import EmbeddingCache
+from common.embeddings import OpenAIEmbeddings
+from superagent.config import OpenAI as OpenAIConfig
+
+BATCH_TOKEN_LIMIT = 8100
+MAX_BATCH_SIZE = 16
+
+
+class SuperAgentEmbeddingService(OpenAIEmbeddings):
+    """Batched Azure OpenAI embeddings with a long lived client"""
+
+    def __init__(
+        self,
+        configuration: OpenAIConfig,
+        credential,
+        cache: EmbeddingCache = None,
+    ):
+        _model_name = configuration.embeddingmodel or configuration.modeldeployment
+        super().__init__(
+            open_ai_model_name=_model_name,
+            batch_aoai_model={
+                _model_name: {
+                    "token_limit": configuration.batchtokenlimit or BATCH_TOKEN_LIMIT,
+                    "max_batch_size": configuration.batchsize or MAX_BATCH_SIZE,
+                }
+            },
+            cache=cache,
+            dimensions=configuration.embeddingdimensions,
+        )
+        self.open_ai_deployment = configuration.modeldeployment
+        self.configuration = configuration
+        self.credential = credential
+        self._client = None
+        self._lock = threading.Lock()
+
+    def create_client(self) -> OpenAI:
+        "Client for Azure Open AI, created once and reused"
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = AzureOpenAI(
+                        azure_endpoint=self.configuration.endpoint,
+                        azure_deployment=self.configuration.modeldeployment,
+                        api_version=self.configuration.version,
+                        azure_ad_token_provider=get_bearer_token_provider(
+                            self.credential,
+                            "https://cognitiveservices.azure.com/.default",
+                        ),
+                    )
+        return self._client
+
+    def split_words(self, content: str, word_limit: int) -> List[str]:
+        """Split content into pieces of up to word_limit words
+
+        Args:
+            content (str): content
+            word_limit (int): maximum number of words per piece
+
+        Returns:
+            List[str]: pieces of the content
+        """
+        words = content.split()
+        return [
+            " ".join(words[i:i + word_limit])
+            for i in range(0, len(words), word_limit)
+        ]
@@ -0,0 +1,201 @@
+"""Buffered writer for the superagent search index.
+
+Documents are collected across files and uploaded in batches of up to
+1000 documents or a payload size threshold. The uploads run on a small
+thread pool so parsing carries on while a batch is in flight, and the
+documents that fail with a transient status are retried by key.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+from azure.search.documents import SearchClient
+
+MAX_BATCH_COUNT = 1000
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+MAX_CONCURRENT_FLUSHES = 4
+RETRY_ATTEMPTS = 3
+RETRY_WAIT = 2
+RETRYABLE_STATUS_CODES = (409, 422, 429, 503)
+
+
+class SearchIndexWriter:
+    """Buffered and concurrent document uploader for a run"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
+        self.key_field = kwargs.get("key_field", "chunk_id")
+        self.max_batch_count = min(
+            kwargs.get("max_batch_count") or MAX_BATCH_COUNT,
+            MAX_BATCH_COUNT,
+        )
+        self.max_batch_bytes = kwargs.get("max_batch_bytes") or MAX_BATCH_BYTES
+        _max_concurrent_flushes = (
+            kwargs.get("max_concurrent_flushes") or MAX_CONCURRENT_FLUSHES
+        )
+
+        _credential = kwargs.get("credential")
+        _search_key = os.environ.get("SEARCH_KEY")
+        if _search_key:
+            _credential = AzureKeyCredential(_search_key)
+        self._client = SearchClient(
+            endpoint=kwargs.get("endpoint"),
+            index_name=kwargs.get("index_name"),
+            credential=_credential,
+        )
+
+        self._buffer: list[dict] = []
+        self._buffer_bytes = 0
+        self._lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=_max_concurrent_flushes)
+        # blocks add when every flush slot is busy
+        self._slots = threading.BoundedSemaphore(_max_concurrent_flushes * 2)
+        self._futures = []
+
+        self.uploaded = 0
+        self.failed = 0
+        self.batches = 0
+
+    def add(
+        self,
+        document: dict,
+    ):
+        """Add a document, flushing the batch when a threshold is reached
+
+        Args:
+            document (dict): search document
+        """
+        _size = len(json.dumps(document, separators=(",", ":")))
+        with self._lock:
+            if self._buffer and self._buffer_bytes + _size > self.max_batch_bytes:
+                self._submit()
+            self._buffer.append(document)
+            self._buffer_bytes += _size
+            if len(self._buffer) >= self.max_batch_count:
+                self._submit()
+
+    def flush(
+        self,
+    ):
+        """Send the buffered documents and wait for every upload"""
+        with self._lock:
+            if self._buffer:
+                self._submit()
+            _futures = self._futures
+            self._futures = []
+        for _future in _futures:
+            _future.result()
+
+    def _submit(
+        self,
+    ):
+        # called with the lock held
+        _batch = self._buffer
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._slots.acquire()
+        _future = self._executor.submit(self._upload, _batch)
+        _future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(_future)
+
+    def _upload(
+        self,
+        documents: list,
+    ):
+        _pending = documents
+        for _attempt in range(RETRY_ATTEMPTS):
+            try:
+                _results = self._client.upload_documents(documents=_pending)
+            except HttpResponseError as e:
+                if e.status_code == 413 and len(_pending) > 1:
+                    # too large for one request, split it in two
+                    _half = len(_pending) // 2
+                    self._upload(_pending[:_half])
+                    self._upload(_pending[_half:])
+                    return
+                if e.status_code not in RETRYABLE_STATUS_CODES:
+                    self._record(0, len(_pending))
+                    raise
+                self._logger.warning(
+                    "Search upload failed with status %s, retrying %d documents",
+                    e.status_code,
+                    len(_pending),
+                )
+                time.sleep(RETRY_WAIT * 2**_attempt)
+                continue
+
+            _failed_keys = set()
+            _retry_keys = set()
+            for _result in _results:
+                if _result.succeeded:
+                    continue
+                if _result.status_code in RETRYABLE_STATUS_CODES:
+                    _retry_keys.add(_result.key)
+                else:
+                    _failed_keys.add(_result.key)
+                    self._logger.error(
+                        "Failed to index document %s: %s",
+                        _result.key,
+                        _result.error_message,
+                    )
+            self._record(
+                len(_pending) - len(_failed_keys) - len(_retry_keys),
+                len(_failed_keys),
+            )
+            _pending = [
+                _document
+                for _document in _pending
+                if _document[self.key_field] in _retry_keys
+            ]
+            if not _pending:
+                return
+            time.sleep(RETRY_WAIT * 2**_attempt)
+
+        self._logger.error(
+            "Giving up indexing %d documents after %d attempts",
+            len(_pending),
+            RETRY_ATTEMPTS,
+        )
+        self._record(0, len(_pending))
+
+    def _record(
+        self,
+        uploaded: int,
+        failed: int,
+    ):
+        with self._metrics_lock:
+            self.uploaded += uploaded
+            self.failed += failed
+            self.batches += 1
+
+    def get_metrics(
+        self,
+    ):
+        """Upload metrics
+
+        Returns:
+            dict: documents uploaded and failed and the number of requests
+        """
+        with self._metrics_lock:
+            return {
+                "documents_uploaded": self.uploaded,
+                "documents_failed": self.failed,
+                "upload_requests": self.batches,
+            }
+
+    def close(
+        self,
+    ):
+        """Flush the remaining documents and release the client"""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._client.close()
@@ -1,25 +1,35 @@
 import os
 import json
 import uuid
+import codecs
+import shutil
 import logging
 import hashlib
 import base64
-import yaml
-import re
+import tempfile
 import time
+from datetime import datetime, timedelta, timezone
+import threading
 import numpy as np
-from openai import AzureOpenAI, OpenAI
-from azure.core.credentials import AccessToken
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
-from azure.core.credentials import AzureKeyCredential
-
-from superagent.blob import BlobHandler
-from superagent.config import SuperAgentConfig
+from azure.core.exceptions import ResourceNotFoundError
+
+from common.embeddingcache import EmbeddingCache
+from superagent.blob import LIST_PAGE_SIZE, BlobHandler
+from superagent.chunkstore import KEY_VERSION, ChunkStore
+from superagent.chunkwriter import ChunkWriter
+from superagent.config import Concurrency, SuperAgentConfig
+from superagent.embeddings import SuperAgentEmbeddingService
+from superagent.indexwriter import SearchIndexWriter
+from superagent.manifest import Manifest
+from superagent.qgen import QuestionCache, QuestionGenerator
 from superagent.summary import Summary
 from superagent.parsers.aspx import ASPXParser
 from superagent.parsers.json import JSONParser
 
+# seconds the watermark of a listing is set back from its start, for the
+# clock skew between the function and the storage account
+WATERMARK_SKEW = int(os.environ.get("SUPERAGENT_WATERMARK_SKEW", 300))
+
 
 class Ingester:
     """Ingests data into the database."""
@@ -31,7 +41,6 @@ class Ingester:
         self.superagent_manager = kwargs.get("superagent_manager")
         self.superagent_summary = kwargs.get("superagent_summary")
         self.config_name = kwargs.get("config_name")
-        self.token: Optional[AccessToken] = None
         self.open_ai_service = self.configuration.openai.endpoint
         self.open_ai_model_name = self.configuration.openai.modeldeployment
         # BlobHandler.ensure_container_exists(
@@ -40,140 +49,500 @@ class Ingester:
         #     credential=self.credential,
         # )
 
-        self.container_path = []
-        self.file_blob_path = []
-        
-    
-    def data_exists(
+        # created on first use, only push mode uploads to the search index
+        self.index_writer = None
+        self._index_writer_lock = threading.Lock()
+        self.manifest = Manifest(
+            index=self.configuration.index,
+            config_name=self.config_name,
+            logger=self._logger,
+        )
+        _embedding_cache = None
+        if self.configuration.openai.embeddingcache:
+            _embedding_cache = EmbeddingCache.get(
+                path=os.path.join(
+                    tempfile.gettempdir(),
+                    f"superagent-{self.config_name}-embeddings.sqlite",
+                ),
+                storage_account_url=self.configuration.index.storage.account,
+                container_name=self.configuration.index.storage.container,
+                blob_path=f"{self.manifest.base_path}/embeddings.sqlite",
+                credential=self.credential,
+                logger=self._logger,
+            )
+        self.embedding_service = SuperAgentEmbeddingService(
+            configuration=self.configuration.openai,
+            credential=self.credential,
+            cache=_embedding_cache,
+        )
+        self.question_generator = None
+        if self.configuration.openai.generatequestions:
+            _question_cache = QuestionCache(
+                storage=self.configuration.index.storage,
+                blob_path=f"{self.manifest.base_path}/questions.json",
+                logger=self._logger,
+            )
+            _question_cache.load()
+            self.question_generator = QuestionGenerator(
+                open_ai_endpoint=self.configuration.openai.endpoint,
+                open_ai_api_version=self.configuration.openai.questionmodelversion,
+                open_ai_deployment_name=self.configuration.openai.questionmodeldeployment,
+                temperature=self.configuration.openai.temperature,
+                batch_size=self.configuration.openai.questionbatchsize,
+                tokens_per_minute=self.configuration.openai.questiontokensperminute,
+                question_tokens=self.configuration.openai.questionmaxtokens,
+                cache=_question_cache,
+                logger=self._logger,
+            )
+        _concurrency = self.configuration.concurrency or Concurrency()
+        self.chunk_writer = ChunkWriter(
+            storage_account_url=self.configuration.storageoutput.storage.account,
+            container_name=self.configuration.storageoutput.storage.container,
+            path=self.configuration.storageoutput.storage.path,
+            output_format=self.configuration.storageoutput.format,
+            credential=self.credential,
+            max_concurrency=_concurrency.chunkwrites,
+            logger=self._logger,
+        )
+        # identical chunks of different files are stored once
+        self.chunk_store = None
+        if self.configuration.storageoutput.dedup:
+            if self.chunk_writer.output_format != "json":
+                raise ValueError("Chunk deduplication needs the json output format")
+            self.chunk_store = ChunkStore(manifest=self.manifest, logger=self._logger)
+
+        # continuation token and watermark of the documents listing
+        self.listing_state = {}
+        self._listing_state_path = f"{self.manifest.base_path}/listing.json"
+        self._listing_complete = False
+        self._listing_watermark = None
+        # files the JSON exports of the run are streamed to
+        self._download_folder = tempfile.mkdtemp(prefix=f"superagent-{self.config_name}-")
+        # monotonic time after which no new file is handed out
+        self.deadline = kwargs.get("deadline")
+        # where the listing stopped when the time budget ran out
+        self._stopped_at = None
+
+    def list_pages(
         self,
     ):
-        directory_path = self.configuration.documents.storage.path + "/"
-        file_blobs = BlobHandler.get_blob_list(
-            container_name=self.configuration.documents.storage.container,
-            directory_path=directory_path,
+        """List the documents a listing page at a time, resuming from the
+        checkpoint left by an interrupted run and, with
+        documents.watermark, skipping the blobs not modified since the
+        last complete listing. Stops handing out files once the time
+        budget of the run is spent.
+
+        Yields:
+            dict: container path and listing properties of each blob
+        """
+        self.manifest.load()
+        if self.chunk_store is not None:
+            self.chunk_store.load()
+        self.listing_state = self._read_listing_state()
+        _storage = self.configuration.documents.storage
+        _modified_since = None
+        if self.configuration.documents.watermark and self.listing_state.get("watermark"):
+            _modified_since = datetime.fromisoformat(self.listing_state["watermark"])
+        _token = self.listing_state.get("continuation_token")
+        _cursor = self.listing_state.get("cursor")
+        _pending = self.listing_state.get("pending") or []
+        if _token or _cursor or _pending:
+            self._logger.info(
+                "Resuming the listing of %s with %d pending files",
+                _storage.path,
+                len(_pending),
+            )
+        # the next listing picks up every blob modified since this one
+        # started, a resumed listing keeps the start of the first part
+        self._listing_watermark = self.listing_state.get("next_watermark") or (
+            datetime.now(timezone.utc) - timedelta(seconds=WATERMARK_SKEW)
+        ).isoformat()
+
+        # files that failed or were not reached by the previous invocation
+        for _index, _item in enumerate(_pending):
+            if self._out_of_time():
+                self._stopped_at = {
+                    "continuation_token": _token,
+                    "cursor": _cursor,
+                    "pending": _pending[_index:],
+                }
+                return
+            yield self._load_item(_item)
+
+        for _page, _next_token in BlobHandler.list_blob_pages(
+            container_name=_storage.container,
+            directory_path=_storage.path + "/",
             accountcredentials=self.credential,
-            account_url=self.configuration.documents.storage.account,
-        )
-        if file_blobs:
-            for blob in file_blobs:
+            account_url=_storage.account,
+            continuation_token=_token,
+            modified_since=_modified_since,
+            results_per_page=self.configuration.documents.pagesize or LIST_PAGE_SIZE,
+        ):
+            for blob in _page:
+                # the listing is in name order, the files up to the cursor
+                # were handed out by the previous invocation
+                if _cursor and blob["name"] <= _cursor:
+                    continue
+                if self._out_of_time():
+                    self._stopped_at = {
+                        "continuation_token": _token,
+                        "cursor": _cursor,
+                        "pending": [],
+                    }
+                    return
+                _cursor = blob["name"]
                 # Check if the blob has a non-zero size
                 if blob["size"] and blob["size"] > 0:
-                    containerPath = (
-                        f"{self.configuration.documents.storage.container}/{blob['name']}"
-                    )
-                    self.container_path.append(containerPath)
-                    _, file_blob_path = containerPath.split("/", 1)
-                    self.file_blob_path.append(file_blob_path)
-            return self.container_path
-        else:
-            return self.container_path
-  
-    
-    def ingest_page(self, container):
+                    yield {
+                        "container": f"{_storage.container}/{blob['name']}",
+                        "properties": blob,
+                    }
+            # the pipeline is still working on this page, an interrupted
+            # run lists it again and the manifest skips what was done
+            if _next_token:
+                self._save_listing_state(
+                    continuation_token=_token,
+                    watermark=self.listing_state.get("watermark"),
+                    next_watermark=self._listing_watermark,
+                )
+            _token = _next_token
+            _cursor = None
+        self._listing_complete = True
+
+    @property
+    def stopped(self):
+        """The time budget stopped the listing before its end"""
+        return self._stopped_at is not None
+
+    def _out_of_time(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _dump_item(self, item: dict):
+        _properties = dict(item["properties"])
+        if _properties.get("last_modified"):
+            _properties["last_modified"] = _properties["last_modified"].isoformat()
+        return {"container": item["container"], "properties": _properties}
+
+    def _load_item(self, item: dict):
+        _properties = dict(item["properties"])
+        if _properties.get("last_modified"):
+            _properties["last_modified"] = datetime.fromisoformat(
+                _properties["last_modified"]
+            )
+        return {"container": item["container"], "properties": _properties}
+
+    def _read_listing_state(self):
+        try:
+            _content = BlobHandler.download(
+                storage_account_url=self.configuration.index.storage.account,
+                container_name=self.configuration.index.storage.container,
+                blob_path=self._listing_state_path,
+            )
+        except ResourceNotFoundError:
+            return {}
+        return json.loads(_content)
+
+    def _save_listing_state(self, **state):
+        BlobHandler.upload(
+            storage_account_url=self.configuration.index.storage.account,
+            container_name=self.configuration.index.storage.container,
+            blob_path=self._listing_state_path,
+            content=json.dumps(state).encode("utf-8"),
+            overwrite=True,
+        )
+        self.listing_state = state
+
+    def ingest_page(self, item: dict):
         """Ingesting page into the  Storage account."""
+        _page = self.check_page(item)
+        for _step in (
+            self.download_page,
+            self.parse_page,
+            self.generate_questions,
+            self.store_page,
+        ):
+            if _page is None:
+                return False
+            _page = _step(_page)
+        return _page is not None
+
+    def check_page(self, item: dict):
+        """Check the listing properties of the page against the manifest.
+
+        Args:
+            item (dict): container path and listing properties of the blob
 
-        self._container = container
-        logging.info(f"Ingesting blob: {self._container}")
-        _new_pages = []
-        _updated_pages = []
-        _deleted_pages = []
-        _unchanged_pages = []
-        _summary_pages = {}
-        container_name, file_blob_path = self._container.split("/", 1)
+        Returns:
+            dict: page to download, None when the page is unchanged
+        """
+        container = item["container"]
+        logging.info(f"Ingesting blob: {container}")
+        _, file_blob_path = container.split("/", 1)
         # Get the filename without the directory path
-        file_name = os.path.basename(self._container)
+        file_name = os.path.basename(container)
         # Remove the file extension
         file_name_without_ext, file_ext = os.path.splitext(file_name)
         # Only process JSON files for now
         # if file_ext.lower() != ".json" or file_ext.lower() != ".aspx":
         #     logging.info(f"Skipping non file: {file_name}")
         #     return False
-        blob_content = BlobHandler.download(
-            self.configuration.documents.storage.account,
-            container_name,
-            file_blob_path,
-            self.credential,
-        )
+        _properties = item["properties"]
+        _entry = self.manifest.get(file_blob_path) or {}
+        state = self._detect_change(_entry, _properties)
+        if state == "unchanged":
+            # nothing to download when the listing shows the blob is unchanged
+            if _entry.get("etag") != _properties.get("etag"):
+                self.manifest.set(
+                    file_blob_path,
+                    {**_entry, "etag": _properties.get("etag")},
+                )
+            self.superagent_summary.add("unchanged", file_blob_path)
+            return None
+        return {
+            "container": container,
+            "file_blob_path": file_blob_path,
+            "file_name": file_name_without_ext,
+            "file_ext": file_ext.lower(),
+            "properties": _properties,
+            "entry": _entry,
+            "state": state,
+        }
+
+    def download_page(self, page: dict):
+        """Download the page and compare its checksum with the manifest.
+
+        Returns:
+            dict: page to parse, None when the page is empty or unchanged
+        """
+        container_name, file_blob_path = page["container"].split("/", 1)
+        if page["file_ext"] == ".json":
+            # JSON exports are streamed to a file the parser reads from
+            blob_content, checksum = self._download_to_file(container_name, file_blob_path)
+        else:
+            blob_content = BlobHandler.download(
+                self.configuration.documents.storage.account,
+                container_name,
+                file_blob_path,
+                self.credential,
+            )
+            checksum = self._get_checksum(blob_content.decode("utf-8")) if blob_content else None
         if not blob_content:
             logging.error("Error: Blob content is empty")
-            return False
-        # Decode the blob content
+            return None
+        _properties = page["properties"]
+        _entry = page["entry"]
+        if page["state"] is None:
+            page["state"] = self._compare(checksum, _entry.get("checksum"))
+        page["manifest_entry"] = {
+            "checksum": checksum,
+            "etag": _properties.get("etag"),
+            "last_modified": (
+                _properties["last_modified"].isoformat()
+                if _properties.get("last_modified")
+                else None
+            ),
+        }
+        if page["state"] == "unchanged":
+            # remember the etag so the next run skips the download
+            page["manifest_entry"]["chunks"] = _entry.get("chunks")
+            page["manifest_entry"]["format"] = _entry.get("format")
+            page["manifest_entry"]["hashes"] = _entry.get("hashes")
+            page["manifest_entry"]["keyversion"] = _entry.get("keyversion")
+            self.manifest.set(file_blob_path, page["manifest_entry"])
+            self.superagent_summary.add("unchanged", file_blob_path)
+            self._remove_download(blob_content)
+            return None
+        page["content"] = blob_content
+        return page
+
+    def _download_to_file(self, container_name: str, file_blob_path: str):
+        """Stream a blob to a file of the run, computing its checksum on the way.
+
+        Returns:
+            tuple: path of the file, None when the blob is empty, and checksum
+        """
+        _md5_hash = hashlib.md5()
+        # the checksum is of the UTF-8 text, as for _get_checksum
+        _decoder = codecs.getincrementaldecoder("utf-8")()
+        _size = 0
+        _file = tempfile.NamedTemporaryFile(
+            dir=self._download_folder, suffix=".json", delete=False
+        )
+        try:
+            with _file:
+                for _chunk in BlobHandler.download_chunks(
+                    self.configuration.documents.storage.account,
+                    container_name,
+                    file_blob_path,
+                    self.credential,
+                ):
+                    _decoder.decode(_chunk)
+                    _md5_hash.update(_chunk)
+                    _file.write(_chunk)
+                    _size += len(_chunk)
+                _decoder.decode(b"", final=True)
+        except BaseException:
+            self._remove_download(_file.name)
+            raise
+        if not _size:
+            self._remove_download(_file.name)
+            return None, None
+        return _file.name, base64.b64encode(_md5_hash.digest()).decode("utf-8")
+
+    def _remove_download(self, content):
+        """Remove the file a blob was streamed to, once parsed or skipped"""
+        if isinstance(content, str):
+            try:
+                os.remove(content)
+            except FileNotFoundError:
+                pass
+
+    def parse_page(self, page: dict):
+        """Parse the page into chunks with the parser for its file type.
+
+        Returns:
+            dict: page with its chunks
+        """
         # File type to parser method mapping
         parser_map = {
             ".aspx": ASPXParser.read_aspx,
             ".json": JSONParser.read_json
         }
-        
-        parser_func = parser_map.get(file_ext.lower())
-        
-        # Read current index
-        index_data = self._read_index()
-        checksum = self._get_checksum(blob_content.decode("utf-8"))
-        if file_blob_path in index_data:
-            # prevchecksum = index_data[file_blob_path]
-            state = "unchanged"
-            # blob_content = BlobHandler.delete(
-            #     self.configuration.documents.storage.account,
-            #     container_name,
-            #     file_blob_path)
-            # state = self._compare(checksum, prevchecksum)
-        else:
-            # New entry: add to index and upload
-            index_data[file_blob_path] = checksum
-            self._save_index(index_data)
-            state = "new"
+        parser_func = parser_map.get(page["file_ext"])
+        _content = page.pop("content")
+        try:
             # Dynamically invoke the parser method
-            _chunks = parser_func(
+            page["chunks"] = parser_func(
                 superagent_manager=self.superagent_manager,
-                response=blob_content,
+                response=_content,
                 logger=self._logger,
-                blob_path=file_blob_path,
-                container=self._container            
+                blob_path=page["file_blob_path"],
+                container=page["container"],
+            ) or []
+        finally:
+            self._remove_download(_content)
+        return page
+
+    def generate_questions(self, page: dict):
+        """Generate a question for each chunk of the page, the chunks keep
+        the question set by the parser when generation is off or fails.
+        The number of failed questions is recorded in the manifest entry,
+        the next run processes the file again for them.
+
+        Returns:
+            dict: page with the generated questions in the chunk metadata
+        """
+        _chunks = page["chunks"]
+        if self.question_generator is None or not _chunks:
+            return page
+        _intent = self.decode_base64(_chunks[0]["metadata"].get("title", "")) or "unknown"
+        try:
+            _questions = self.question_generator.generate_many(
+                [_chunk["content"].decode("utf-8") for _chunk in _chunks],
+                _intent,
             )
-            for i, _chunk in enumerate(_chunks):
-                self._store_pages(
-                    _chunk["content"],  # Extract content,
-                    _chunk["metadata"], # Extract metadata
-                    file_name_without_ext,
-                    index=i)                   
-        # if state:
-        #     for _chunk in _chunks:
-        #         if state.lower() == "new":
-        #             _new_pages.append(_chunk)
-        #         if state.lower() == "unchanged":
-        #             _unchanged_pages.append(_chunk)
-        #         if state.lower() == "updated":
-        #             _updated_pages.append(_chunk)
-
-        #     if _new_pages:
-        #         for _page_data in _new_pages:
-        #             self._store_pages(
-        #                 _page_data["content"],  # Extract content,
-        #                 _page_data["metadata"], # Extract metadata
-        #                 file_name_without_ext,
-        #             )
-
-        #     if _updated_pages:
-        #         for _page_data in _updated_pages:
-        #             self._store_pages(
-        #                 _page_data["content"],  # Extract content,
-        #                 _page_data["metadata"], # Extract metadata
-        #                 file_name_without_ext,
-        #             )
-                    
-        # # update superagent summary logs
-        # self.superagent_summary.new_file = [
-        #     base64.b64decode(_a_page["metadata"]["title"]).decode("utf-8") for _a_page in _new_pages
-        # ]
-        # self.superagent_summary.updated_file = [
-        #    base64.b64decode(_a_page["metadata"]["title"]).decode("utf-8") for _a_page in _updated_pages
-        # ]
-        # self.superagent_summary.unchanged_file = [
-        #     base64.b64decode(_a_page["metadata"]["title"]).decode("utf-8") for _a_page in _unchanged_pages
-        # ]
-        return True
-    
-    
+        except Exception as e:
+            self._logger.warning(
+                "Question generation failed for %s: %s", page["file_blob_path"], e
+            )
+            _questions = [None] * len(_chunks)
+        _failed = sum(1 for _question in _questions if not _question)
+        if _failed:
+            self._logger.warning(
+                "%d of %d questions failed for %s, retried by the next run",
+                _failed,
+                len(_chunks),
+                page["file_blob_path"],
+            )
+            page["manifest_entry"]["questionsfailed"] = _failed
+        for _chunk, _question in zip(_chunks, _questions):
+            if _question:
+                _chunk["metadata"]["generatedquestion"] = base64.b64encode(
+                    _question.encode("utf-8")
+                ).decode("utf-8")
+        return page
+
+    def store_page(self, page: dict):
+        """Store the chunks of the page and record it in the manifest.
+
+        Returns:
+            dict: stored page
+        """
+        _chunks = page["chunks"]
+        # raises unless every chunk is acknowledged, the file is then
+        # left out of the manifest and picked up again by the next run
+        if self.chunk_store is not None:
+            _duplicates = self._store_deduplicated(page)
+        else:
+            self.chunk_writer.write(page["file_name"], _chunks)
+            if page["entry"].get("format") == "chunks":
+                # record of the file from when it was deduplicated
+                self.chunk_writer.delete_named(
+                    [ChunkStore.record_name(page["file_name"])]
+                )
+            else:
+                self.chunk_writer.delete(
+                    page["file_name"],
+                    len(_chunks),
+                    page["entry"].get("chunks") or 0,
+                    page["entry"].get("format") or "json",
+                )
+            page["manifest_entry"]["format"] = self.chunk_writer.output_format
+            _duplicates = 0
+        # record the file once all of its chunks are stored
+        page["manifest_entry"]["chunks"] = len(_chunks)
+        self.manifest.set(page["file_blob_path"], page["manifest_entry"])
+        self.superagent_summary.add_chunks(len(_chunks), _duplicates)
+        self.superagent_summary.add(
+            "new" if page["state"] == "new" else "updated",
+            page["file_blob_path"],
+            chunks=len(_chunks),
+        )
+        return page
+
+    def _store_deduplicated(self, page: dict):
+        """Store the chunks of the page no file has stored yet under the
+        hash of their text, write the record of the file with the metadata
+        of its chunks, and move the references of the file to them.
+
+        Returns:
+            int: chunks of the page that other files hold as well
+        """
+        _chunks = page["chunks"]
+        _keys = [ChunkStore.key(_chunk["content"]) for _chunk in _chunks]
+        _own, _wait = self.chunk_store.claim(_keys)
+        _first = {}
+        for _key, _chunk in zip(_keys, _chunks):
+            # the metadata of the file is kept in its record
+            _first.setdefault(_key, {"content": _chunk["content"], "metadata": None})
+        _names = {ChunkStore.blob_name(_key): _key for _key in _own}
+        self.chunk_writer.write_named(
+            page["file_name"],
+            {_name: _first[_key] for _name, _key in _names.items()},
+            on_done=lambda name, error: self.chunk_store.complete(_names[name], error),
+        )
+        # chunks another file is writing right now
+        for _future in _wait:
+            _future.result()
+        # written once every chunk it points to is stored
+        self.chunk_writer.write_record(
+            ChunkStore.record_name(page["file_name"]),
+            ChunkStore.get_record(_keys, _chunks),
+        )
+        if page["entry"].get("format") != "chunks":
+            # output of the file from before the deduplication
+            self.chunk_writer.delete(
+                page["file_name"],
+                0,
+                page["entry"].get("chunks") or 0,
+                page["entry"].get("format") or "json",
+            )
+        _shared = self.chunk_store.reference(_keys, page["entry"].get("hashes"))
+        page["manifest_entry"]["format"] = "chunks"
+        page["manifest_entry"]["hashes"] = _keys
+        page["manifest_entry"]["keyversion"] = KEY_VERSION
+        return sum(1 for _key in _keys if _key in _shared)
+
     def _get_checksum(
         self,
         content,
@@ -188,186 +557,209 @@ class Ingester:
 
     def _compare(self, checksum, prevchecksum):
         return "new" if not prevchecksum else "unchanged" if checksum == prevchecksum else "updated"
-    
-    def _read_index(
-        self
-    ):
-        _credential = self.credential
-        if BlobHandler.blob_exists(
-            storage_account_url=self.configuration.index.storage.account,
-            container_name=self.configuration.index.storage.container,
-            blob_path=f"{self.configuration.index.storage.path}/{self.config_name}"
-        ):
-            blob_content = BlobHandler.download(
-                storage_account_url=self.configuration.index.storage.account,
-                container_name=self.configuration.index.storage.container,
-                blob_path=f"{self.configuration.index.storage.path}/{self.config_name}"
-            )
-            if not blob_content:  # Handle empty content
-                logging.info("Warning: No Index Summary found.")
-                return {}
-            _index = yaml.safe_load(blob_content.decode("utf-8"))
-            return _index
-        else:
-            logging.info("Warning: No Index Summary found.")
-            return {}
 
-    def _save_index(
-        self,
-        pages,
-    ):
-        _credential = self.credential
-        _index = yaml.dump(
-            pages,
-            indent=4,
-        )
-        _blob = BlobHandler.upload(
-            storage_account_url=self.configuration.index.storage.account,
-            container_name=self.configuration.index.storage.container,
-            blob_path=f"{self.configuration.index.storage.path}/{self.config_name}",
-            content=_index.encode("utf-8"),
-            credential=_credential,
-            overwrite=True,
-        )
-        # blob_content = BlobHandler.download(
-        #         storage_account_url=self.configuration.index.storage.account,
-        #         container_name=self.configuration.index.storage.container,
-        #         blob_path=f"{self.configuration.index.storage.path}/{self.config_name}"
-        # )
-        # if not blob_content:  # Handle empty content
-        #     logging.info("Warning: No Index Summary found.")
-        #     return {}
-        # _index = yaml.safe_load(blob_content.decode("utf-8"))
-        # return _index
+    def _detect_change(self, entry: dict, properties: dict):
+        """Detect a change from the listing properties of the blob
+
+        Args:
+            entry (dict): manifest entry of the blob
+            properties (dict): listing properties of the blob
+
+        Returns:
+            str: new, unchanged or updated, None when the content is needed
+        """
+        if not entry:
+            return "new"
+        if (
+            self.chunk_store is not None
+            and entry.get("format") == "chunks"
+            and entry.get("keyversion") != KEY_VERSION
+        ):
+            # the chunk blobs of older versions carry the metadata of a
+            # file, the file is stored again with its record
+            return "updated"
+        if entry.get("questionsfailed") and self.question_generator is not None:
+            # generate the questions that failed, the others are cached
+            return "updated"
+        if entry.get("etag") and entry["etag"] == properties.get("etag"):
+            return "unchanged"
+        # the checksum is the base64 md5 of the content, same as content_md5
+        if entry.get("checksum") and properties.get("content_md5"):
+            return self._compare(properties["content_md5"], entry["checksum"])
+        return None
 
-    def _store_pages(
-        self,
-        body: dict,
-        metadata: dict,
-        blob_path: str,
-        index: int = 0  # Add index to uniquely identify chunks
-    ):
-        _credential = self.credential
-        decoded_body = body.decode("utf-8")
-        
-        # Remove ASPX tags and clean the content
-        cleaned_body = re.sub(r"<.*?>", "", decoded_body).strip()
-        json_content = {
-            "content": cleaned_body
-            }
-        # Serialize the JSON content
-        json_body = json.dumps(json_content, indent=4)
-        # Append index to blob path for unique file names: filename_0.json, filename_1.json, ...
-        full_blob_path = f"{blob_path}_{index}.json"
-        BlobHandler.upload(
-            storage_account_url=self.configuration.storageoutput.storage.account,
-            container_name=self.configuration.storageoutput.storage.container,
-            blob_path=f"{self.configuration.storageoutput.storage.path}/{full_blob_path}",
-            content=json_body,
-            metadata=metadata,
-            credential=_credential,
-            overwrite=True,
-        )
-        # _embeddings= self.generate_embedding(
-        #     content=cleaned_body,
-        # )
-        # self.upload_index(_embeddings, cleaned_body, metadata)
-        
     def generate_embedding(self, content):
         """Generate emeddings
 
         Args:
             content (content type): content for which emeddings to be generated
         Returns:
-            _type_: return response in boolean for the success or failure
+            list: average of the embeddings of the word_limit chunks of the
+            content, None for empty content
         """
         word_limit = self.configuration.openai.wordlimit  # Set the word limit for chunking
-        if content: 
-            _content = content
-            # Split content into words
-            words = content.split()
-            
-            # Create chunks of up to word_limit words
-            chunks = [
-                ' '.join(words[i:i + word_limit])
-                for i in range(0, len(words), word_limit)
-            ]
-        # Initialize the Azure OpenAI client
-        client = AzureOpenAI(
-            azure_endpoint=self.open_ai_service,  # Azure OpenAI endpoint
-            azure_deployment=self.open_ai_model_name,  # Deployment name (e.g., "text-embedding-ada-002")
-            api_version=self.configuration.openai.version,  # API version (e.g., "2023-05-15")
-            api_key=self.wrap_credential(),  # Pass the token,
-        )
-        embeddings = []  # Initialize the list before the loop
-        for chunk in chunks:
-            response = client.embeddings.create(
-                input=chunk,
-                model=self.open_ai_model_name
-                )
-            embeddings.append(response.data[0].embedding)
-        # Convert embeddings to a list
+        # Create chunks of up to word_limit words
+        chunks = self.embedding_service.split_words(content or "", word_limit)
+        if not chunks:
+            return None
+        # Embed all the chunks in as few requests as the token limits allow
+        embeddings = self.generate_embeddings(chunks)
         # ✅ Average the list of embeddings to get a single flat vector
         averaged_embedding = np.mean(embeddings, axis=0).tolist()
 
         return averaged_embedding
-    
+
+    def generate_embeddings(self, contents):
+        """Generate one embedding per content in batched requests
+
+        Args:
+            contents (list): contents for which emeddings to be generated
+        Returns:
+            list: embeddings in the same order as the contents
+        """
+        return self.embedding_service.create_embeddings(contents)
+
     def upload_index(self, embeddings, content, metadata):
         """Index Creation method
+        The document is buffered by the run's index writer and uploaded
+        in batches, call close at the end of the run to send the rest.
+        Only for push mode callers, the pipeline of a run stores chunks for
+        the pull indexer and does not call it.
 
         Args:
             embeddings (_type_): embeddings
             content (_type_):  content
             metadata (_type_): metadata
 
-        Raises:
-            Exception: return exception in case of failure
-
         Returns:
             _type_: return the response in boolean for the success or failure
         """
-        
-        index_name = self.configuration.openai.IndexName       
-        _response = False
-        search_client = SearchClient(
-            endpoint=self.configuration.openai.searchendpoint,
-            index_name=index_name,
-            credential=AzureKeyCredential(os.environ.get("SEARCH_KEY"))
-        )
         # Decode Base64 metadata values
         base64_metadata = {
             key: self.decode_base64(value) if isinstance(value, str) else value
             for key, value in metadata.items()
         }
-        documents = [
-            {
-                "parent_id": base64_metadata["parent_id"],  # Parent ID for the document
-                "title": base64_metadata["title"],  # Title for the document
-                "description": base64_metadata["description"],  # Description of the document
-                "generatedquestion": base64_metadata["generatedquestion"],  # generatedquestion of the document
-                "blob_path": base64_metadata["blob_path"],  # Blob path for the document
-                "source_address": base64_metadata["source_address"],  # Source address of the document
-                "chunk": content,  # Content of the document
-                "chunk_id": str(uuid.uuid4()),  # Unique ID for the document
-                "vector": embeddings,  # Embeddings for the document
-            }
-        ]
-        with search_client as client:
-            _response = client.upload_documents(documents)
-            return _response
-        if _response:
-            return True
-        else:
-            raise Exception("Failed to create index")
-        
-    def wrap_credential(self) -> str:
-        """Retrieves an Azure AD token for authentication"""
-        if not self.token or self.token.expires_on <= time.time():
-            self.token = self.credential.get_token(
-                "https://cognitiveservices.azure.com/.default"
+        document = {
+            "parent_id": base64_metadata["parent_id"],  # Parent ID for the document
+            "title": base64_metadata["title"],  # Title for the document
+            "description": base64_metadata["description"],  # Description of the document
+            "generatedquestion": base64_metadata["generatedquestion"],  # generatedquestion of the document
+            "blob_path": base64_metadata["blob_path"],  # Blob path for the document
+            "source_address": base64_metadata["source_address"],  # Source address of the document
+            "chunk": content,  # Content of the document
+            "chunk_id": str(uuid.uuid4()),  # Unique ID for the document
+            "vector": embeddings,  # Embeddings for the document
+        }
+        self._get_index_writer().add(document)
+        return True
+
+    def _get_index_writer(self):
+        """Index writer of the run, created on first use"""
+        if self.index_writer is None:
+            with self._index_writer_lock:
+                if self.index_writer is None:
+                    self.index_writer = SearchIndexWriter(
+                        endpoint=self.configuration.openai.searchendpoint,
+                        index_name=self.configuration.openai.IndexName,
+                        credential=self.credential,
+                        logger=self._logger,
+                    )
+        return self.index_writer
+
+    def close(self, failed: list = None):
+        """Flush the buffered index documents, the chunks, the caches and the
+        manifest at the end of a run, then write the checkpoint of the
+        listing for the next run. Every flush runs even when another one
+        fails, the checkpoint is only written once the manifest is flushed
+        and the first failure is raised at the end.
+
+        Args:
+            failed (list): items that failed in the pipeline, retried first
+                by the next run when the time budget stopped this one
+        """
+        failed = failed or []
+        _errors = {}
+        for _name, _flush in (
+            ("index writer", self._close_index_writer),
+            ("chunk writer", self._close_chunk_writer),
+            ("embedding cache", self._save_embedding_cache),
+            ("question cache", self._save_question_cache),
+            ("manifest", self.manifest.close),
+        ):
+            try:
+                _flush()
+            except Exception as e:
+                self._logger.exception("Closing the %s failed", _name)
+                _errors[_name] = e
+        shutil.rmtree(self._download_folder, ignore_errors=True)
+        if "manifest" not in _errors:
+            try:
+                self._save_checkpoint(failed)
+            except Exception as e:
+                self._logger.exception("Saving the listing checkpoint failed")
+                _errors["checkpoint"] = e
+        if _errors:
+            raise next(iter(_errors.values()))
+
+    def _close_index_writer(self):
+        if self.index_writer is not None:
+            self.index_writer.close()
+            self._logger.info(
+                json.dumps(self.index_writer.get_metrics()),
             )
-        return self.token.token  # Return the bearer token
-    
+
+    def _close_chunk_writer(self):
+        try:
+            if self.chunk_store is not None:
+                # chunks no file references any more
+                self.chunk_writer.delete_named(
+                    [ChunkStore.blob_name(_key) for _key in self.chunk_store.collect()]
+                )
+        finally:
+            self.chunk_writer.close()
+        self._logger.info(
+            json.dumps(self.chunk_writer.get_metrics()),
+        )
+
+    def _save_embedding_cache(self):
+        if self.embedding_service.cache is not None:
+            self.embedding_service.cache.save()
+            self._logger.info(
+                json.dumps(self.embedding_service.cache.get_metrics()),
+            )
+
+    def _save_question_cache(self):
+        if self.question_generator is not None:
+            self.question_generator.cache.save()
+            self._logger.info(
+                json.dumps(self.question_generator.get_metrics()),
+            )
+
+    def _save_checkpoint(self, failed: list):
+        if self._listing_complete:
+            if not failed:
+                self._save_listing_state(watermark=self._listing_watermark)
+            else:
+                # list everything again from the same watermark
+                self._save_listing_state(watermark=self.listing_state.get("watermark"))
+        elif self._stopped_at is not None:
+            _pending = [
+                self._dump_item(_item)
+                for _item in failed
+                if isinstance(_item, dict) and "properties" in _item
+            ]
+            self._save_listing_state(
+                continuation_token=self._stopped_at["continuation_token"],
+                cursor=self._stopped_at["cursor"],
+                pending=_pending + self._stopped_at["pending"],
+                watermark=self.listing_state.get("watermark"),
+                next_watermark=self._listing_watermark,
+            )
+            self._logger.info(
+                "Time budget spent, checkpoint written with %d pending files",
+                len(_pending) + len(self._stopped_at["pending"]),
+            )
+
     def decode_base64(self, value):
         """Try decoding Base64 once, and if it's still Base64, decode again."""
         try:
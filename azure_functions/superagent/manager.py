@@ -12,6 +12,8 @@ processes the JSON data to extract specific
 """
 
 import json
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime
 
@@ -22,6 +24,9 @@ from superagent.config import (
 )
 from superagent.summary import Summary
 
+SUMMARY_FLUSH_SIZE = 1000
+SUMMARY_FLUSH_SECONDS = 300
+
 
 @dataclass
 class SuperAgentManager:
@@ -44,6 +49,9 @@ class SuperAgentManager:
 
       
         self.superagent_summary: Summary = Summary(config_name=self.config_name)
+        self._summary_lock = threading.Lock()
+        self._summary_flushed_at = time.monotonic()
+        self._summary_container_checked = False
 
     def _initalize_documents_store(
         self
@@ -66,15 +74,90 @@ class SuperAgentManager:
             self.documents_container_name,
         )
 
+    def _get_summary_blob_path(
+        self,
+        run_start_time: datetime,
+    ):
+        _build_id = self.superagent_summary.build_id
+        _config_name = (
+            self.superagent_summary.config_name.replace(".yaml", "")
+            if ".yaml" in self.superagent_summary.config_name
+            else self.superagent_summary.config_name
+        )
+        _log_time = run_start_time.strftime("%Y%m%d/%H%M%S")
+        return f"{_log_time}/{_build_id}/{_config_name}/log_summary.ndjson"
+
+    def flush_summary(
+        self,
+        run_start_time: datetime,
+        force: bool = False,
+    ):
+        """Append the per file records collected since the last flush to the
+        run's summary log once the size or time threshold is reached. The
+        records that cannot be written are kept for the next flush.
+
+        Args:
+            run_start_time (datetime): start time of the run
+            force (bool): flush whatever the thresholds
+
+        Raises:
+            Exception: the forced flush failed
+        """
+        _logs = self.configuration.logs
+        if not _logs:
+            # nowhere to write them, keep the file lists only
+            self.superagent_summary.take_records()
+            return
+        _flush_size = _logs.flushsize or SUMMARY_FLUSH_SIZE
+        _flush_seconds = _logs.flushseconds or SUMMARY_FLUSH_SECONDS
+        with self._summary_lock:
+            _due = (
+                force
+                or len(self.superagent_summary.records) >= _flush_size
+                or time.monotonic() - self._summary_flushed_at >= _flush_seconds
+            )
+            if not _due:
+                return
+            self._summary_flushed_at = time.monotonic()
+            _records = self.superagent_summary.take_records()
+            if not _records:
+                return
+            try:
+                if not self._summary_container_checked:
+                    BlobHandler.ensure_container_exists(
+                        storage_account_url=_logs.storage.account,
+                        container_name=_logs.storage.container,
+                    )
+                    self._summary_container_checked = True
+                _content = "".join(
+                    json.dumps(_record, separators=(",", ":")) + "\n"
+                    for _record in _records
+                )
+                BlobHandler.append(
+                    storage_account_url=_logs.storage.account,
+                    container_name=_logs.storage.container,
+                    blob_path=f"{_logs.storage.path}/{self._get_summary_blob_path(run_start_time)}",
+                    content=_content.encode("utf-8"),
+                )
+            except Exception as e:
+                self.superagent_summary.restore_records(_records)
+                if force:
+                    raise
+                self._logger.warning(
+                    "Could not write %d summary records, kept for the next flush: %s",
+                    len(_records),
+                    e,
+                )
+
     def save_summary(
         self,
         run_start_time: datetime,
-        container: str = None,
     ):
-        """save crawl summary
+        """save the summary once at the end of the run, the remaining per file
+        records followed by a line with the run metrics
 
         Args:
-            summary (_type_): summary
+            run_start_time (datetime): start time of the run
 
         Raises:
             Exception: exception in case of failure
@@ -82,39 +165,12 @@ class SuperAgentManager:
         Returns:
             _type_: response
         """
-        if self.configuration.logs:
-            _logs_storage_account_url = self.configuration.logs.storage.account
-            _logs_container_name = self.configuration.logs.storage.container
-            _file_name = container.split("/")[-1] if container else "no_blob_found"
-            _file_name = (
-                _file_name.replace(".json", "") if ".json" in _file_name else _file_name
-            )
-            _build_id = self.superagent_summary.build_id
-            _config_name = (
-                self.superagent_summary.config_name.replace(".yaml", "")
-                if ".yaml" in self.superagent_summary.config_name
-                else self.superagent_summary.config_name
-            )
-
-            _log_time = run_start_time.strftime("%Y%m%d/%H%M%S")
-            _file_name = f"{_file_name}_log_summary.json"
-            _blob_path = f"{_log_time}/{_build_id}/{_config_name}/{_file_name}"
-            self.superagent_summary.log = _blob_path
-
-            BlobHandler.ensure_container_exists(
-                storage_account_url=_logs_storage_account_url,
-                container_name=_logs_container_name,
-            )
-
-            _superagent_summary_content = json.dumps(
-                self.superagent_summary.get_full_log(),
-                indent=4,
-            )
-            BlobHandler.upload(
-                storage_account_url=_logs_storage_account_url,
-                container_name=_logs_container_name,
-                blob_path=f"{self.configuration.logs.storage.path}/{_blob_path}",
-                content=_superagent_summary_content,
-                overwrite=True,
-            )
+        self.superagent_summary.close(
+            log=(
+                self._get_summary_blob_path(run_start_time)
+                if self.configuration.logs
+                else None
+            ),
+        )
+        self.flush_summary(run_start_time, force=True)
         return self.superagent_summary.get_metrics()
@@ -0,0 +1,320 @@
+"""Manifest of the files processed by the superagent.
+
+The manifest is loaded once per run into an in-memory map protected by a
+lock. Changes are flushed in batches as append-only JSON Lines delta
+segments next to a JSON snapshot, and the segments are folded back into
+the snapshot once there are enough of them.
+
+    Layout under the index storage path:
+        {config}/manifest.json          snapshot of all the entries
+        {config}/delta/{sequence}.jsonl  changes made since the snapshot
+"""
+
+import json
+import logging
+import threading
+
+import yaml
+from azure.core.exceptions import ResourceNotFoundError
+
+from superagent.blob import BlobHandler
+from superagent.config import SuperAgentIndex
+
+MANIFEST_VERSION = 1
+FLUSH_SIZE = 500
+COMPACT_SEGMENTS = 20
+
+
+class Manifest:
+    """Thread safe manifest of processed files keyed by blob path"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
+        self.index: SuperAgentIndex = kwargs.get("index")
+        self.config_name = kwargs.get("config_name")
+        self.flush_size = self.index.flushsize or FLUSH_SIZE
+        self.compact_segments = self.index.compactsegments or COMPACT_SEGMENTS
+
+        _config_name = self.config_name
+        if _config_name.endswith(".yaml"):
+            _config_name = _config_name[: -len(".yaml")]
+        # folder of the files kept for the config between runs
+        self.base_path = f"{self.index.storage.path}/{_config_name}"
+        self._snapshot_path = f"{self.base_path}/manifest.json"
+        self._delta_path = f"{self.base_path}/delta/"
+        # the yaml index used before the manifest, migrated on first load
+        self._legacy_path = f"{self.index.storage.path}/{self.config_name}"
+
+        self._entries: dict[str, dict] = {}
+        self._pending: dict[str, dict] = {}
+        self._segments: list[str] = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._loaded = False
+        self._migrated = False
+
+    def load(
+        self,
+    ):
+        """Load the snapshot and replay the delta segments once per run"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._entries = self._read_snapshot()
+            for _segment in self._list_segments():
+                self._replay_segment(_segment)
+            self._loaded = True
+        self._logger.info(
+            "Manifest %s loaded with %d entries and %d segments",
+            self.base_path,
+            len(self._entries),
+            len(self._segments),
+        )
+
+    def _read_snapshot(
+        self,
+    ):
+        try:
+            _content = BlobHandler.download(
+                storage_account_url=self.index.storage.account,
+                container_name=self.index.storage.container,
+                blob_path=self._snapshot_path,
+            )
+            _snapshot = json.loads(_content)
+            return _snapshot.get("entries", {})
+        except ResourceNotFoundError:
+            return self._read_legacy_index()
+
+    def _read_legacy_index(
+        self,
+    ):
+        try:
+            _content = BlobHandler.download(
+                storage_account_url=self.index.storage.account,
+                container_name=self.index.storage.container,
+                blob_path=self._legacy_path,
+            )
+        except ResourceNotFoundError:
+            self._logger.info("No manifest found for %s", self.config_name)
+            return {}
+        _index = yaml.safe_load(_content.decode("utf-8")) or {}
+        self._logger.info(
+            "Migrating %d entries from the yaml index %s",
+            len(_index),
+            self._legacy_path,
+        )
+        _entries = {}
+        for _path, _value in _index.items():
+            if isinstance(_value, dict):
+                _entries[_path] = _value
+            else:
+                _entries[_path] = {"checksum": _value}
+        # written as a full snapshot when the run closes the manifest
+        self._migrated = True
+        return _entries
+
+    def _list_segments(
+        self,
+    ):
+        _blobs = BlobHandler.list(
+            storage_account_url=self.index.storage.account,
+            container_name=self.index.storage.container,
+            blob_path=self._delta_path,
+        )
+        _segments = sorted(_blob.name for _blob in _blobs)
+        if _segments:
+            _last = _segments[-1].rsplit("/", 1)[-1].split(".", 1)[0]
+            self._sequence = int(_last)
+        return _segments
+
+    def _replay_segment(
+        self,
+        segment: str,
+    ):
+        _content = BlobHandler.download(
+            storage_account_url=self.index.storage.account,
+            container_name=self.index.storage.container,
+            blob_path=segment,
+        )
+        for _line in _content.splitlines():
+            if not _line.strip():
+                continue
+            _record = json.loads(_line)
+            if _record.get("deleted"):
+                self._entries.pop(_record["path"], None)
+            else:
+                self._entries[_record["path"]] = _record["entry"]
+        self._segments.append(segment)
+
+    def get(
+        self,
+        path: str,
+    ):
+        """Get the manifest entry for a blob path
+
+        Args:
+            path (str): blob path
+
+        Returns:
+            dict: entry or None when the path is not tracked
+        """
+        with self._lock:
+            return self._entries.get(path)
+
+    def items(
+        self,
+    ):
+        """Snapshot of the entries
+
+        Returns:
+            list: blob path and entry pairs
+        """
+        with self._lock:
+            return list(self._entries.items())
+
+    def __contains__(
+        self,
+        path: str,
+    ):
+        with self._lock:
+            return path in self._entries
+
+    def __len__(
+        self,
+    ):
+        with self._lock:
+            return len(self._entries)
+
+    def set(
+        self,
+        path: str,
+        entry: dict,
+    ):
+        """Record the entry for a blob path, flushing when the batch is full
+
+        Args:
+            path (str): blob path
+            entry (dict): entry such as the checksum of the blob
+        """
+        with self._lock:
+            self._entries[path] = entry
+            self._pending[path] = entry
+            _flush = len(self._pending) >= self.flush_size
+        if _flush:
+            self.flush()
+
+    def remove(
+        self,
+        path: str,
+    ):
+        """Remove a blob path from the manifest
+
+        Args:
+            path (str): blob path
+        """
+        with self._lock:
+            if self._entries.pop(path, None) is None:
+                return
+            self._pending[path] = None
+            _flush = len(self._pending) >= self.flush_size
+        if _flush:
+            self.flush()
+
+    def flush(
+        self,
+    ):
+        """Write the pending changes as a new delta segment"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                _pending = self._pending
+                self._pending = {}
+                self._sequence += 1
+                _segment = f"{self._delta_path}{self._sequence:010d}.jsonl"
+            _lines = []
+            for _path, _entry in _pending.items():
+                if _entry is None:
+                    _record = {"path": _path, "deleted": True}
+                else:
+                    _record = {"path": _path, "entry": _entry}
+                _lines.append(json.dumps(_record, separators=(",", ":")))
+            try:
+                BlobHandler.upload(
+                    storage_account_url=self.index.storage.account,
+                    container_name=self.index.storage.container,
+                    blob_path=_segment,
+                    content=("\n".join(_lines) + "\n").encode("utf-8"),
+                    overwrite=True,
+                )
+            except Exception:
+                # keep the changes for the next flush, newer values win
+                with self._lock:
+                    _pending.update(self._pending)
+                    self._pending = _pending
+                raise
+            with self._lock:
+                self._segments.append(_segment)
+            self._logger.debug(
+                "Manifest segment %s written with %d changes",
+                _segment,
+                len(_lines),
+            )
+
+    def compact(
+        self,
+    ):
+        """Fold the delta segments into a new snapshot"""
+        with self._flush_lock:
+            with self._lock:
+                # pending changes go straight into the snapshot
+                _pending = dict(self._pending)
+                _segments = list(self._segments)
+                _snapshot = {
+                    "version": MANIFEST_VERSION,
+                    "entries": dict(self._entries),
+                }
+            # the pending changes and the segments are only forgotten once
+            # the snapshot holding them is written
+            BlobHandler.upload(
+                storage_account_url=self.index.storage.account,
+                container_name=self.index.storage.container,
+                blob_path=self._snapshot_path,
+                content=json.dumps(_snapshot, separators=(",", ":")).encode("utf-8"),
+                overwrite=True,
+            )
+            with self._lock:
+                for _path, _entry in _pending.items():
+                    # changes made during the upload stay pending
+                    if _path in self._pending and self._pending[_path] is _entry:
+                        del self._pending[_path]
+                self._segments = self._segments[len(_segments):]
+            for _segment in _segments:
+                try:
+                    BlobHandler.delete(
+                        storage_account_url=self.index.storage.account,
+                        container_name=self.index.storage.container,
+                        blob_path=_segment,
+                    )
+                except ResourceNotFoundError:
+                    pass
+        self._logger.info(
+            "Manifest %s compacted with %d entries",
+            self.base_path,
+            len(_snapshot["entries"]),
+        )
+
+    def close(
+        self,
+    ):
+        """Flush the pending changes at the end of a run and compact
+        when the segments have piled up or the index was migrated"""
+        self.flush()
+        with self._lock:
+            _compact = (
+                self._migrated or len(self._segments) >= self.compact_segments
+            )
+        if _compact:
+            self.compact()
+            self._migrated = False
@@ -1,13 +1,32 @@
 """ASPX Parser for agent."""
 
-import re
 import os
 import base64
-from bs4 import BeautifulSoup
+import logging
+from bs4 import BeautifulSoup, FeatureNotFound
 from langchain.text_splitter import MarkdownTextSplitter
-from superagent.qgen import QuestionGenerator
+from common.parseexecutor import ParseExecutor
 from superagent.config import SuperAgentConfig
 
+# html.parser by default, lxml is faster; compare the chunks with
+# benchmarks/aspx_parser.py before switching
+HTML_PARSER = os.environ.get("SUPERAGENT_HTML_PARSER", "html.parser")
+
+
+def make_soup(content):
+    """Parse the page with the configured parser, html.parser when
+    the configured one is not installed."""
+    try:
+        return BeautifulSoup(content, HTML_PARSER)
+    except FeatureNotFound:
+        return BeautifulSoup(content, "html.parser")
+
+
+def parse_aspx(content: bytes, blob_path: str, container: str):
+    """Parse an ASPX page into chunks and metadata, run by the parse executor"""
+    _aspx_parser = ASPXParser(logger=logging.getLogger(__name__))
+    return _aspx_parser.extract_metadata(content, blob_path, container)
+
 
 class ASPXParser:
     """
@@ -25,23 +44,22 @@ class ASPXParser:
         Store the ASPX content in Azure Blob Storage.
         """
         # Store the content in Azure Blob Storage
-        _superagent_manager = kwargs.get("superagent_manager")
         _response = kwargs.get("response")
         _logger = kwargs.get("logger")
         _blob_path = kwargs.get("blob_path")
         _container = kwargs.get("container")
-        _aspx_parser = ASPXParser(
-            configuration=_superagent_manager.configuration,
-            summary=_superagent_manager.superagent_summary,
-            logger=_logger,
+        _contents = ParseExecutor.get().parse(
+            "superagent.parsers.aspx.parse_aspx",
+            _response,
+            blob_path=_blob_path,
+            container=_container,
         )
-        _contents = _aspx_parser.extract_metadata(_response, _blob_path, _container)
         if _contents:
             return _contents
         else:
             _logger.error("No content extracted from ASPX page.")
             return None
-        
+
     def extract_metadata(self, content: bytes, blob_path: str, container: str):
         """
         Cleans the ASPX content by removing extra whitespace and special characters.
@@ -51,14 +69,14 @@ class ASPXParser:
             and metadata for the page. Metadata must comply with HTTP header rules,
             and the content must be a byte array encoded in UTF-8.
         """
-        # Parse ASPX content
-        soup = BeautifulSoup(content, "html.parser")
-        
+        # Parse ASPX content once, every extraction below shares the tree
+        soup = make_soup(content)
+
         # Extract Page Title
         _page_title = (
-            soup.find("SharePointWebControls:FieldValue", {"FieldName": "Title"}) or 
-            soup.title or 
-            " ".join(h1.get_text(strip=True) for h1 in soup.find_all("h1")) or 
+            soup.find("SharePointWebControls:FieldValue", {"FieldName": "Title"}) or
+            soup.title or
+            " ".join(h1.get_text(strip=True) for h1 in soup.find_all("h1")) or
             "No Title Found"
         )
         _page_title = " ".join(str(_page_title).split()[:100])  # Limit to 200 words
@@ -75,9 +93,6 @@ class ASPXParser:
         if not parent_text.strip():  # Default if no parent ID is found
             parent_text = "No Parent Found"
         parent_text = " ".join(parent_text.split()[:100])  # Limit to 200 words
-        
-        # Serialize the modified HTML back to a string
-        _page_text = re.sub(r"[\n\r\t]", "", soup.get_text()).strip()
 
         # Encode metadata to base64
         _title = base64.b64encode(_page_title.encode("utf-8")).decode("utf-8")
@@ -87,24 +102,19 @@ class ASPXParser:
         _parent_id = base64.b64encode(parent_text.encode("utf-8")).decode(
             "utf-8"
         )
-        
+
         fullpath = os.environ.get("SharePointURL") + container
         source_address = base64.b64encode(fullpath.encode("utf-8")).decode("utf-8")
         blob_path = base64.b64encode(blob_path.encode("utf-8")).decode("utf-8")
-       
+
         # Perform chunking using the custom_markdown_chunking method
         _chunks = None
         if len(content) > 0:
-            _chunks = self.custom_section_anchor_chunking(content)
+            _chunks = self.custom_section_anchor_chunking(soup)
 
         if _chunks:
-            # _question_generator = QuestionGenerator(
-            #     open_ai_endpoint=self.configuration.openai.endpoint,
-            #     open_ai_api_version=self.configuration.openai.questionmodelversion,
-            #     open_ai_deployment_name=self.configuration.openai.questionmodeldeployment,
-            #     temperature=self.configuration.openai.temperature,
-            # )
-
+            # the questions are generated per batch of chunks by
+            # Ingester.generate_questions, the description is the fallback
             # Generate metadata for each chunk using a list comprehension
             return [
                 {
@@ -127,21 +137,32 @@ class ASPXParser:
         """
         Split content using MarkdownTextSplitter from LangChain.
         Falls back to size-based chunking if input isn't markdown-like.
+        The content can be a parsed page, its plain text or raw HTML.
         """
-        # Process the contentindexdata HTML content
-        soup = BeautifulSoup(content, "html.parser")
-        plain_text = soup.get_text(
-            separator="\n", strip=True
-        )  # Extract plain text from HTML
+        if isinstance(content, str):
+            plain_text = content
+        else:
+            # Process the contentindexdata HTML content
+            soup = content if isinstance(content, BeautifulSoup) else make_soup(content)
+            plain_text = soup.get_text(
+                separator="\n", strip=True
+            )  # Extract plain text from HTML
 
         # Use MarkdownTextSplitter to split the plain text
         splitter = MarkdownTextSplitter()
         chunks = splitter.split_text(plain_text)  # Now, you are splitting plain text
         return chunks
 
-    def custom_section_anchor_chunking(self, content):
-        soup = BeautifulSoup(content, "html.parser")
-        chunks = []
+    def custom_section_anchor_chunking(self, soup):
+        """
+        Split the page into one chunk per anchored <h3> section.
+        A section runs from the <h3> holding <a name="anchor"> to the next
+        <h3> whose first link is a section anchor, and collects the text of
+        the <tr> rows in between. The tree is visited once and the chunks
+        come out in document order.
+        """
+        if not isinstance(soup, BeautifulSoup):
+            soup = make_soup(soup)
 
         # Step 1: Find all <a href="#..."> section anchors
         anchors = set()
@@ -150,21 +171,33 @@ class ASPXParser:
             if href.startswith("#") and len(href) > 1:
                 anchors.add(href[1:])
 
-        # Step 2: Extract content for each anchor section
-        for anchor in anchors:
-            # Match <h3> tag containing <a name="anchor">
-            h3_tag = soup.find(lambda tag: tag.name == "h3" and tag.find("a", attrs={"name": anchor}))
-
-            if not h3_tag:
-                continue
-
-            section_lines = [f"#{anchor}", h3_tag.get_text(strip=True)]
-            for sibling in h3_tag.find_all_next():
-                if sibling.name == "h3" and sibling.find("a") and sibling.find("a").get("name") in anchors:
-                    break
-                if sibling.name == "tr":
-                    section_lines.append(sibling.get_text(separator="\n", strip=True))
+        # Step 2: Walk the page once, sending <tr> text to the open sections
+        sections = []
+        open_sections = []
+        started = set()
+        if anchors:
+            for tag in soup.find_all(["h3", "tr"]):
+                if tag.name == "tr":
+                    if open_sections:
+                        text = tag.get_text(separator="\n", strip=True)
+                        for section_lines in open_sections:
+                            section_lines.append(text)
+                    continue
+
+                first_link = tag.find("a")
+                if first_link and first_link.get("name") in anchors:
+                    open_sections = []
+                for a_tag in tag.find_all("a", attrs={"name": True}):
+                    anchor = a_tag["name"]
+                    # the first <h3> holding the anchor starts its section
+                    if anchor in anchors and anchor not in started:
+                        started.add(anchor)
+                        section_lines = [f"#{anchor}", tag.get_text(strip=True)]
+                        sections.append(section_lines)
+                        open_sections.append(section_lines)
 
+        chunks = []
+        for section_lines in sections:
             chunk = "\n".join(section_lines).strip()
             if chunk:
                 chunks.append(chunk)
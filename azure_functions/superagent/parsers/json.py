@@ -1,19 +1,212 @@
-"""JSON Parser for agent."""
+"""JSON Parser for agent.
 
-import re
+The export is read from the file it was downloaded to in a single pass
+over its top level fields, a block at a time: the index data is decoded
+and chunked a window at a time as it is read, only the other fields used
+for the chunks are kept, and for pages without index data the export is
+serialized aside to a spooled file as it is read, then chunked a window
+at a time. The working memory of a file is therefore bounded by
+CHUNK_WINDOW, save for the objects and arrays of a page without index
+data, which are read one field at a time. The peak memory of each file is
+measured with tracemalloc when it is parsed in a worker process.
+"""
+
+import io
 import os
+import re
 import json
 import base64
-from typing import List
-from bs4 import BeautifulSoup
+import codecs
+import logging
+import multiprocessing
+import tempfile
+import tracemalloc
+from typing import Iterable, Iterator, List, Union
 from langchain.text_splitter import MarkdownTextSplitter
-from superagent.qgen import QuestionGenerator
+from common.parseexecutor import ParseExecutor
 from superagent.config import SuperAgentConfig
 
+# fields of the export used for the chunks, every other field is skipped
+FIELDS = (
+    "Title",
+    "ARM_ProductDetail_Description",
+    "ARM_Content_Reference",
+    "ARM_Content_IndexData",
+)
+# the page content, chunked as it is read
+INDEX_DATA = "ARM_Content_IndexData"
+# characters of page content handed to the text splitter at a time
+CHUNK_WINDOW = int(os.environ.get("SUPERAGENT_JSON_CHUNK_WINDOW", 1024 * 1024))
+# bytes of the export read at a time
+READ_SIZE = 64 * 1024
+# measure the peak memory of the files parsed in a worker process
+TRACE_MEMORY = os.environ.get("SUPERAGENT_JSON_TRACE_MEMORY", "True") == "True"
+
+# a run of characters and short escapes of a JSON string, or a unicode
+# escape, surrogate pairs kept whole
+_STRING_PART = re.compile(
+    r'(?:[^"\\]|\\["\\/bfnrt])+'
+    r"|\\u[dD][89abAB][0-9a-fA-F]{2}\\u[dD][c-fC-F][0-9a-fA-F]{2}"
+    r"|\\u[0-9a-fA-F]{4}"
+)
+_HIGH_SURROGATE = re.compile(r"\\u[dD][89abAB][0-9a-fA-F]{2}")
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# characters that may follow a value
+_DELIMITERS = " \t\n\r,:]}"
+_DECODER = json.JSONDecoder()
+
+
+def parse_json(content: Union[bytes, str], blob_path: str, container: str):
+    """Parse a JSON export, or the file holding it, into chunks and metadata,
+    run by the parse executor
+
+    Returns:
+        dict: chunks, size of the export and peak memory of the parse in
+            bytes, None unless parsed in a worker process
+    """
+    _size = os.path.getsize(content) if isinstance(content, str) else len(content)
+    # the threads of the calling process would share the measurement
+    _trace = (
+        TRACE_MEMORY
+        and multiprocessing.parent_process() is not None
+        and not tracemalloc.is_tracing()
+    )
+    if _trace:
+        tracemalloc.start()
+    try:
+        _json_parser = JSONParser(logger=logging.getLogger(__name__))
+        _chunks = _json_parser.extract_metadata(content, blob_path, container)
+        _peak_memory = tracemalloc.get_traced_memory()[1] if _trace else None
+    finally:
+        if _trace:
+            tracemalloc.stop()
+    return {
+        "chunks": _chunks,
+        "size": _size,
+        "peak_memory": _peak_memory,
+    }
+
+
+class _ExportReader:
+    """Text of an export, decoded a block at a time"""
+
+    def __init__(self, json_file) -> None:
+        self._file = json_file
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+
+    def _fill(
+        self,
+        size: int = None,
+    ):
+        """Read more of the export, dropping the text already read
+
+        Returns:
+            bool: False at the end of the export
+        """
+        _block = self._file.read(size or READ_SIZE)
+        self._buffer = self._buffer[self._position:] + self._decoder.decode(
+            _block, final=not _block
+        )
+        self._position = 0
+        return bool(_block)
+
+    def peek(
+        self,
+    ):
+        """Next character after whitespace
+
+        Returns:
+            str: character, empty at the end of the export
+        """
+        while True:
+            self._position = _WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ""
+
+    def expect(
+        self,
+        character: str,
+    ):
+        """Read the next character after whitespace
+
+        Raises:
+            ValueError: the next character is another one
+        """
+        if self.peek() != character:
+            raise ValueError(f"Expecting {character!r} in the JSON export")
+        self._position += 1
+
+    def read_value(
+        self,
+    ):
+        """Decode the next value whole
+
+        Returns:
+            object: value
+        """
+        self.peek()
+        while True:
+            try:
+                _value, _end = _DECODER.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                # the value goes on in the next blocks, read as much again
+                # so a long value is decoded a few times only
+                if not self._fill(max(READ_SIZE, len(self._buffer))):
+                    raise
+                continue
+            # a number may go on in the next block, "1.5e" decodes as 1.5
+            if (
+                _end == len(self._buffer) or self._buffer[_end] not in _DELIMITERS
+            ) and self._fill():
+                continue
+            self._position = _end
+            return _value
+
+    def read_string(
+        self,
+    ) -> Iterator[str]:
+        """Decode the next string a window at a time, a piece holds at most
+        a window and the block read after it
+
+        Returns:
+            Iterator[str]: pieces of the string
+        """
+        self.expect('"')
+        _parts = []
+        _size = 0
+        while True:
+            _match = _STRING_PART.match(self._buffer, self._position)
+            # an escape, or the low half of a surrogate pair, may go on in
+            # the next block
+            if (
+                (_match is None or _HIGH_SURROGATE.fullmatch(_match.group()))
+                and len(self._buffer) - self._position < 12
+                and self._fill()
+            ):
+                continue
+            if _match is None:
+                if self._buffer[self._position:self._position + 1] != '"':
+                    raise ValueError("Invalid string in the JSON export")
+                self._position += 1
+                break
+            _parts.append(_match.group())
+            _size += len(_parts[-1])
+            self._position = _match.end()
+            if _size >= CHUNK_WINDOW:
+                yield json.loads(f'"{"".join(_parts)}"')
+                _parts = []
+                _size = 0
+        if _parts:
+            yield json.loads(f'"{"".join(_parts)}"')
+
 
 class JSONParser:
     """
-    ASPX parser for the superagent.
+    JSON parser for the superagent.
     """
 
     def __init__(self, *args, **kwargs):
@@ -27,48 +220,67 @@ class JSONParser:
         Store the JSON content in Azure Blob Storage.
         """
         # Store the content in Azure Blob Storage
-        _superagent_manager = kwargs.get("superagent_manager")
         _response = kwargs.get("response")
         _logger = kwargs.get("logger")
         _blob_path = kwargs.get("blob_path")
         _container = kwargs.get("container")
-        _json_parser = JSONParser(
-            configuration=_superagent_manager.configuration,
-            summary=_superagent_manager.superagent_summary,
-            logger=_logger,
+        _result = ParseExecutor.get().parse(
+            "superagent.parsers.json.parse_json",
+            _response,
+            blob_path=_blob_path,
+            container=_container,
+        )
+        _contents = _result["chunks"]
+        _logger.info(
+            "Parsed %s: %d bytes, %d chunks, peak memory %s",
+            _blob_path,
+            _result["size"],
+            len(_contents or []),
+            (
+                f"{_result['peak_memory'] / (1024 * 1024):.1f} MiB"
+                if _result["peak_memory"] is not None
+                else "not measured"
+            ),
         )
-        _contents = _json_parser.extract_metadata(_response, _blob_path, _container)
         if _contents:
             return _contents
         else:
             _logger.error("No content extracted from JSON file.")
             return None
-        
-    def extract_metadata(self, json_content: bytes, blob_path: str, container: str):
+
+    def extract_metadata(self, json_content: Union[bytes, str], blob_path: str, container: str):
         """
         Cleans the JSON content by removing extra whitespace and special characters.
 
+        Args:
+            json_content (Union[bytes, str]): the export, or the path of the file holding it
+
         Returns:
             A list of dictionaries, where each dictionary contains the content
             and metadata for the page. Metadata must comply with HTTP header rules,
             and the content must be a byte array encoded in UTF-8.
         """
+        if isinstance(json_content, str):
+            _json_file = open(json_content, "rb")
+        else:
+            _json_file = io.BytesIO(json_content)
+        data = {}
+        _contents = []
+        with _json_file, tempfile.SpooledTemporaryFile(
+            max_size=CHUNK_WINDOW, mode="w+", encoding="utf-8"
+        ) as _dump:
+            # Chunk the index data as it is read
+            for chunk in self.stream_chunks(self.read_export(_json_file, _dump, data, blob_path)):
+                _contents.append(chunk.encode("utf-8"))
+            # If HTML is empty, fallback to the full JSON as a string
+            if not data.get(INDEX_DATA):
+                for chunk in self.stream_chunks(self.read_pieces(_dump)):
+                    _contents.append(chunk.encode("utf-8"))
         # Extract fields
-        data = json.loads(json_content.decode("utf-8"))
         page_title = data.get("Title", "No Title Found")
         page_description = data.get("ARM_ProductDetail_Description", "No Description Found")
         parent_path = data.get("ARM_Content_Reference", "No Parent Found")
-        html_content = data.get("ARM_Content_IndexData", "")
-        # If HTML is empty, fallback to the full JSON as a string
-        if not html_content:
-            html_content = json.dumps(data)
-        # Clean and parse content HTML
-        soup = BeautifulSoup(html_content, "html.parser")
-        page_text = re.sub(r"[\n\r\t]", "", soup.get_text()).strip()
-
-        # Chunk the content
-        _chunks = self.custom_markdown_chunking(html_content) if html_content else []
-        fullpath = os.environ.get("SharePointURL") + parent_path        
+        fullpath = os.environ.get("SharePointURL") + parent_path
         # Encode metadata
         encoded_metadata = {
             "title": base64.b64encode(page_title.encode("utf-8")).decode("utf-8"),
@@ -79,27 +291,107 @@ class JSONParser:
         }
 
         # Generate question for each chunk if present
-        if _chunks:
-            # _question_generator = QuestionGenerator(
-            #     open_ai_endpoint=self.configuration.openai.endpoint,
-            #     open_ai_api_version=self.configuration.openai.questionmodelversion,
-            #     open_ai_deployment_name=self.configuration.openai.questionmodeldeployment,
-            #     temperature=self.configuration.openai.temperature,
-            # )
+        if _contents:
+            # the questions are generated per batch of chunks by
+            # Ingester.generate_questions
 
             return [
                 {
-                    "content": chunk.encode("utf-8"),
+                    "content": content,
                     "metadata": {
                         **encoded_metadata,
                         "generatedquestion": "",
                     },
                 }
-                for chunk in _chunks
+                for content in _contents
             ]
 
         return None
 
+    def read_export(self, json_file, dump, fields: dict, blob_path: str) -> Iterator[str]:
+        """
+        Read the export in one pass over its top level fields. The index
+        data is yielded a window at a time as it is decoded, the other
+        fields used for the chunks are kept in fields, and until index data
+        is found the export is also written to dump the way json.dumps
+        writes it, for pages without index data.
+
+        Raises:
+            ValueError: the export is not a JSON object, or not valid JSON
+        """
+        _reader = _ExportReader(json_file)
+        if _reader.peek() != "{":
+            raise ValueError(f"JSON export {blob_path} is not an object")
+        _reader.expect("{")
+        _separator = "{"
+        # the dump is only needed until index data is found
+        _dumping = True
+        _more = _reader.peek() != "}"
+        if not _more:
+            _reader.expect("}")
+        while _more:
+            _key = _reader.read_value()
+            if not isinstance(_key, str):
+                raise ValueError(f"JSON export {blob_path} has a key that is not a string")
+            _reader.expect(":")
+            if _dumping:
+                dump.write(f"{_separator}{json.dumps(_key)}: ")
+            _separator = ", "
+            if _reader.peek() == '"' and (_key == INDEX_DATA or _key not in FIELDS):
+                # long strings are read a window at a time
+                if _dumping:
+                    dump.write('"')
+                for _piece in _reader.read_string():
+                    if _key == INDEX_DATA:
+                        # only the presence of the index data is kept
+                        fields[INDEX_DATA] = True
+                        _dumping = False
+                        yield _piece
+                    elif _dumping:
+                        dump.write(json.dumps(_piece)[1:-1])
+                if _dumping:
+                    dump.write('"')
+            else:
+                _value = _reader.read_value()
+                if _key in FIELDS and _key != INDEX_DATA:
+                    fields[_key] = _value
+                if _dumping:
+                    dump.write(json.dumps(_value))
+            _more = _reader.peek() == ","
+            _reader.expect("," if _more else "}")
+        if _reader.peek():
+            raise ValueError(f"JSON export {blob_path} has data after its object")
+        if _dumping:
+            dump.write("{}" if _separator == "{" else "}")
+
+    def read_pieces(self, dump) -> Iterator[str]:
+        """
+        The serialized export a window at a time.
+        """
+        dump.seek(0)
+        while True:
+            _piece = dump.read(CHUNK_WINDOW)
+            if not _piece:
+                return
+            yield _piece
+
+    def stream_chunks(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Chunk the content a window at a time, cutting the windows at a
+        line break when there is one so the splitter sees whole lines.
+        """
+        _buffer = ""
+        for _piece in pieces:
+            _buffer += _piece
+            while len(_buffer) > CHUNK_WINDOW:
+                _cut = _buffer.rfind("\n", 0, CHUNK_WINDOW)
+                if _cut <= 0:
+                    _cut = CHUNK_WINDOW
+                yield from self.custom_markdown_chunking(_buffer[:_cut])
+                _buffer = _buffer[_cut:]
+        if _buffer:
+            yield from self.custom_markdown_chunking(_buffer)
+
     def custom_markdown_chunking(self, content: str) -> List[str]:
         """
         Split content using MarkdownTextSplitter from LangChain.
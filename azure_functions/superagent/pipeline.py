@@ -0,0 +1,203 @@
+"""Staged ingestion pipeline for the superagent.
+
+Each stage has its own worker limit and reads from a bounded queue, so a
+slow stage applies backpressure to the one before it instead of every
+file holding a thread for its whole list, download, parse and store.
+The blocking work of a stage runs on that stage's own thread pool.
+
+    Returns:
+        _type_: return the per stage metrics of the run
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+# marks the end of the items in a queue
+_DONE = object()
+
+
+class Stage:
+    """A pipeline stage: a blocking function applied to every item.
+
+    The function returns the item for the next stage, or None when the
+    item has nothing left to do.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        concurrency: int = 1,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, concurrency)
+        self.executor = executor
+        self._own_executor = executor is None
+
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_seconds = 0.0
+        self.max_queue_depth = 0
+
+    def get_metrics(
+        self,
+    ):
+        """Stage metrics
+
+        Returns:
+            dict: items processed, dropped and failed, latency and queue depth
+        """
+        _completed = self.processed + self.dropped + self.failed
+        return {
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "average_latency": (
+                round(self.busy_seconds / _completed, 3) if _completed else 0
+            ),
+            "max_latency": round(self.max_seconds, 3),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class Pipeline:
+    """Runs items through stages connected by bounded queues"""
+
+    def __init__(
+        self,
+        stages: list,
+        queue_size: int = 32,
+        logger=None,
+    ) -> None:
+        self.stages: list[Stage] = stages
+        self.queue_size = queue_size
+        self._logger = logger or logging.getLogger(__name__)
+        # items whose stage raised, for the caller to retry
+        self.failed_items = []
+
+    def run(
+        self,
+        items: Iterable,
+    ):
+        """Run the items through every stage and wait for the end
+
+        Args:
+            items (Iterable): items for the first stage
+
+        Returns:
+            dict: metrics of each stage
+        """
+        for _stage in self.stages:
+            if _stage.executor is None:
+                _stage.executor = ThreadPoolExecutor(
+                    max_workers=_stage.concurrency,
+                    thread_name_prefix=f"superagent-{_stage.name}",
+                )
+        try:
+            asyncio.run(self._run(items))
+        finally:
+            for _stage in self.stages:
+                if _stage._own_executor:
+                    _stage.executor.shutdown(wait=True)
+                    _stage.executor = None
+        return self.get_metrics()
+
+    async def _run(
+        self,
+        items: Iterable,
+    ):
+        _queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        _workers = []
+        for _index, _stage in enumerate(self.stages):
+            _output = _queues[_index + 1] if _index + 1 < len(_queues) else None
+            _stage_workers = [
+                asyncio.create_task(self._work(_stage, _queues[_index], _output))
+                for _ in range(_stage.concurrency)
+            ]
+            _workers.append(_stage_workers)
+
+        # the items may come from a slow generator, such as a paged
+        # listing, read them off the event loop
+        _loop = asyncio.get_running_loop()
+        _items = iter(items)
+        while True:
+            _item = await _loop.run_in_executor(None, next, _items, _DONE)
+            if _item is _DONE:
+                break
+            # waits here when the first stage is behind
+            await _queues[0].put(_item)
+            self._track_depth(self.stages[0], _queues[0])
+
+        # close the stages one after the other
+        for _index, _stage_workers in enumerate(_workers):
+            for _ in _stage_workers:
+                await _queues[_index].put(_DONE)
+            await asyncio.gather(*_stage_workers)
+
+    async def _work(
+        self,
+        stage: Stage,
+        input_queue: asyncio.Queue,
+        output_queue: Optional[asyncio.Queue],
+    ):
+        _loop = asyncio.get_running_loop()
+        while True:
+            _item = await input_queue.get()
+            if _item is _DONE:
+                return
+            _start = time.perf_counter()
+            try:
+                _result = await _loop.run_in_executor(
+                    stage.executor,
+                    stage.func,
+                    _item,
+                )
+            except Exception as e:
+                stage.failed += 1
+                self.failed_items.append(_item)
+                self._logger.error(
+                    "Stage %s failed for %s: %s",
+                    stage.name,
+                    _item.get("container") if isinstance(_item, dict) else _item,
+                    e,
+                )
+                _result = None
+            else:
+                if _result is None:
+                    stage.dropped += 1
+                else:
+                    stage.processed += 1
+            finally:
+                _elapsed = time.perf_counter() - _start
+                stage.busy_seconds += _elapsed
+                stage.max_seconds = max(stage.max_seconds, _elapsed)
+
+            if _result is not None and output_queue is not None:
+                await output_queue.put(_result)
+                _next = self.stages[self.stages.index(stage) + 1]
+                self._track_depth(_next, output_queue)
+
+    def _track_depth(
+        self,
+        stage: Stage,
+        queue: asyncio.Queue,
+    ):
+        stage.max_queue_depth = max(stage.max_queue_depth, queue.qsize())
+
+    def get_metrics(
+        self,
+    ):
+        """Metrics of each stage
+
+        Returns:
+            dict: stage name to its metrics
+        """
+        return {_stage.name: _stage.get_metrics() for _stage in self.stages}
@@ -4,26 +4,230 @@
         _type_: return the results based on API request
 """
 
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+
 import openai
+import tiktoken
 
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from azure.core.exceptions import ResourceNotFoundError
+from azure.identity import get_bearer_token_provider
 
 from tenacity import (
     retry,
     retry_if_exception,
     stop_after_attempt,
-    wait_random_exponential,
-    wait_fixed,
 )
 
+from common.credential import CredentialProvider
+from superagent.blob import BlobHandler
+
 FIXED_WAIT = 5
 RETRY_ATTEMPTS = 3
+# chunks sent in one prompt
+BATCH_SIZE = 8
+TOKENS_PER_MINUTE = 30000
+# words of a chunk sent as its context
+CONTEXT_WORD_LIMIT = 300
+# completion tokens allowed for each question of a batch, an answer cut
+# at the limit is generated again one question at a time
+QUESTION_TOKENS = 64
+
+_SYSTEM_MSG = """You're a question generator that generates questions
+                     based on the context and intent provided.
+                     You should not mention Vodafone or
+                     any other company name.
+                     You should generate questions with less than 10 words.
+                     You should use simple language.
+                     RESPOND **ONLY** IN PORTUGUESE."""
+
+_BATCH_MSG = (
+    "Generate one question of less than 10 words for each numbered context below, "
+    "based on the context and the intent.\n"
+    'Answer only with a JSON object {{"questions": [...]}} holding one question per '
+    "context, in the same order.\n"
+    "- Intent: {intent}"
+)
 
 
 def is_rate_limit_error(exception):
     return isinstance(exception, openai.RateLimitError)
 
 
+def is_transient_error(exception):
+    """Rate limits, timeouts, connection and server errors"""
+    return isinstance(
+        exception,
+        (
+            openai.RateLimitError,
+            openai.APIConnectionError,
+            openai.InternalServerError,
+        ),
+    )
+
+
+def _wait_till_retry_after(retry_state):
+    """Seconds to wait before the next attempt, from the Retry-After
+    header of the rate limit response"""
+    _exception = retry_state.outcome.exception()
+    _response = getattr(_exception, "response", None)
+    retry_after = FIXED_WAIT
+    if _response is not None:
+        try:
+            retry_after = int(float(_response.headers.get("Retry-After", FIXED_WAIT)))
+        except ValueError:
+            pass
+    _generator = retry_state.args[0]
+    _generator._logger.info(
+        "Retrying after %d seconds as per Retry-After header", retry_after
+    )
+    # hold the other threads back as well
+    _generator.budget.pause(retry_after)
+    return retry_after
+
+
+class TokenBudget:
+    """Tokens per minute shared by the threads calling the model"""
+
+    def __init__(
+        self,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+    ):
+        self.tokens_per_minute = tokens_per_minute
+        self._window = deque()
+        self._used = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(
+        self,
+        tokens: int,
+    ):
+        """Wait until the tokens fit in the budget of the last minute
+
+        Args:
+            tokens (int): estimated tokens of the request
+        """
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                _now = time.monotonic()
+                while self._window and _now - self._window[0][0] >= 60:
+                    self._used -= self._window.popleft()[1]
+                if (
+                    _now >= self._paused_until
+                    and self._used + tokens <= self.tokens_per_minute
+                ):
+                    self._window.append((_now, tokens))
+                    self._used += tokens
+                    return
+                _wait = self._paused_until - _now
+                if self._window:
+                    _wait = max(_wait, 60 - (_now - self._window[0][0]))
+            time.sleep(max(_wait, 0.05))
+
+    def pause(
+        self,
+        seconds: float,
+    ):
+        """Stop every request for the given seconds, after a rate limit"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class QuestionCache:
+    """Generated questions keyed by the hash of the intent and content,
+    kept in a JSON blob between runs"""
+
+    def __init__(self, *args, **kwargs):
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
+        self.storage = kwargs.get("storage")
+        self.blob_path = kwargs.get("blob_path")
+        self._questions: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._changed = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(
+        content: str,
+        intent: str,
+    ):
+        return hashlib.sha256(f"{intent}\0{content}".encode("utf-8")).hexdigest()
+
+    def load(
+        self,
+    ):
+        """Load the questions of the previous runs"""
+        try:
+            _content = BlobHandler.download(
+                storage_account_url=self.storage.account,
+                container_name=self.storage.container,
+                blob_path=self.blob_path,
+            )
+        except ResourceNotFoundError:
+            return
+        with self._lock:
+            self._questions = json.loads(_content)
+        self._logger.info(
+            "Question cache %s loaded with %d questions",
+            self.blob_path,
+            len(self._questions),
+        )
+
+    def get(
+        self,
+        key: str,
+    ):
+        with self._lock:
+            _question = self._questions.get(key)
+            if _question is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return _question
+
+    def set(
+        self,
+        key: str,
+        question: str,
+    ):
+        with self._lock:
+            self._questions[key] = question
+            self._changed = True
+
+    def save(
+        self,
+    ):
+        """Write the questions back when new ones were generated"""
+        with self._lock:
+            if not self._changed:
+                return
+            _content = json.dumps(self._questions, separators=(",", ":"))
+            self._changed = False
+        BlobHandler.upload(
+            storage_account_url=self.storage.account,
+            container_name=self.storage.container,
+            blob_path=self.blob_path,
+            content=_content.encode("utf-8"),
+            overwrite=True,
+        )
+
+    def get_metrics(
+        self,
+    ):
+        with self._lock:
+            return {
+                "question_cache_hits": self.hits,
+                "question_cache_misses": self.misses,
+            }
+
+
 class QuestionGenerator:
     """Question Generator class for
     generating questions based on the context given"""
@@ -36,41 +240,48 @@ class QuestionGenerator:
         open_ai_endpoint = kwargs.get("open_ai_endpoint")
         open_ai_api_version = kwargs.get("open_ai_api_version")
         self.open_ai_deployment_name = kwargs.get("open_ai_deployment_name")
-        self._logger = kwargs.get("logger")
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
         self.temperature = float(kwargs.get("temperature"))
+        self.batch_size = kwargs.get("batch_size") or BATCH_SIZE
+        self.question_tokens = kwargs.get("question_tokens") or QUESTION_TOKENS
+        self.cache: QuestionCache = kwargs.get("cache")
+        self.budget = TokenBudget(
+            kwargs.get("tokens_per_minute") or TOKENS_PER_MINUTE
+        )
+        self._encoding = tiktoken.get_encoding("cl100k_base")
+        self.requests = 0
+        self._lock = threading.Lock()
         self.client = openai.AzureOpenAI(
             azure_endpoint=open_ai_endpoint,
             azure_ad_token_provider=get_bearer_token_provider(
-                DefaultAzureCredential(),
+                CredentialProvider.get_credential(),
                 "https://cognitiveservices.azure.com/.default",
             ),
             api_version=open_ai_api_version,
         )
 
-    def _wait_till_retry_after(self, retry_state):
-        import time
-
-        response = retry_state.outcome.result()
-        retry_after = int(
-            response.headers.get(
-                "Retry-After",
-                FIXED_WAIT,
-            )
-        )
-        self._logger.info(
-            "Retrying after %d seconds as per Retry-After header", retry_after
-        )
-        time.sleep(retry_after)
-
     @retry(
-        retry=retry_if_exception(is_rate_limit_error),
+        retry=retry_if_exception(is_transient_error),
         wait=_wait_till_retry_after,
         stop=stop_after_attempt(RETRY_ATTEMPTS),
+        reraise=True,
     )
     def _completion_with_retry_after(self, **kwargs):
+        _tokens = sum(
+            len(self._encoding.encode(_message["content"]))
+            for _message in kwargs.get("messages", [])
+        )
+        self.budget.acquire(_tokens + (kwargs.get("max_tokens") or self.question_tokens))
+        with self._lock:
+            self.requests += 1
         return self.client.chat.completions.create(**kwargs)
 
     def _call_openai(self, **kwargs):
+        return self._chat(**kwargs).message.content.strip()
+
+    def _chat(self, **kwargs):
+        """Completion choice of a prompt, max_tokens only limits the answer
+        when given"""
         messages = [
             {
                 "role": "system",
@@ -81,15 +292,17 @@ class QuestionGenerator:
                 "content": kwargs.get("user_msg") + "\n" + kwargs.get("context"),
             },
         ]
+        _options = {}
+        if kwargs.get("max_tokens"):
+            _options["max_tokens"] = kwargs["max_tokens"]
         # Call the OpenAI chat completion API to generate an answer
         _completion = self._completion_with_retry_after(
             messages=messages,
             model=self.open_ai_deployment_name,
             temperature=self.temperature,
+            **_options,
         )
-        # Append the result to the answers_df DataFrame
-        _content = _completion.choices[0].message.content.strip()
-        return _content
+        return _completion.choices[0]
 
     def generate(
         self,
@@ -98,13 +311,7 @@ class QuestionGenerator:
     ):
         """Generate a question based on the context given"""
         # Your existing logic to generate a question
-        _system_msg = """You're a question generator that generates questions
-                     based on the context and intent provided.
-                     You should not mention Vodafone or
-                     any other company name.
-                     You should generate questions with less than 10 words.
-                     You should use simple language.
-                     RESPOND **ONLY** IN PORTUGUESE."""
+        _system_msg = _SYSTEM_MSG
         if intent.lower() == "unknown":
             # Adjust user message for generic question generation
             _user_msg = """Generate a generic question of less than 10 words."""
@@ -120,3 +327,85 @@ class QuestionGenerator:
             system_msg=_system_msg, user_msg=_user_msg, context=content
         )
         return _generated_question
+
+    def generate_many(
+        self,
+        contents: list,
+        intent: str,
+    ):
+        """Generate a question for each content, several contents per
+        prompt, reusing the cached questions of unchanged contents
+
+        Args:
+            contents (list): chunk contents
+            intent (str): intent of the page, such as its title
+
+        Returns:
+            list: one question per content, None when it failed
+        """
+        _questions = [None] * len(contents)
+        _keys = [QuestionCache.key(_content, intent) for _content in contents]
+        _missing = []
+        for _index, _key in enumerate(_keys):
+            _question = self.cache.get(_key) if self.cache else None
+            if _question is None:
+                _missing.append(_index)
+            else:
+                _questions[_index] = _question
+
+        for _start in range(0, len(_missing), self.batch_size):
+            _batch = _missing[_start:_start + self.batch_size]
+            _generated = self._generate_batch([contents[_i] for _i in _batch], intent)
+            for _index, _question in zip(_batch, _generated):
+                _questions[_index] = _question
+                if _question and self.cache:
+                    self.cache.set(_keys[_index], _question)
+        return _questions
+
+    def _generate_batch(
+        self,
+        contents: list,
+        intent: str,
+    ):
+        _contexts = "\n\n".join(
+            f"[{_number}] " + " ".join(_content.split()[:CONTEXT_WORD_LIMIT])
+            for _number, _content in enumerate(contents, start=1)
+        )
+        _user_msg = _BATCH_MSG.format(intent=intent)
+        try:
+            _choice = self._chat(
+                system_msg=_SYSTEM_MSG,
+                user_msg=_user_msg,
+                context=_contexts,
+                max_tokens=self.question_tokens * len(contents) + 20,
+            )
+            if _choice.finish_reason == "length":
+                raise ValueError(f"answer cut at {self.question_tokens} tokens per question")
+            _answer = _choice.message.content.strip()
+            _questions = json.loads(_answer[_answer.index("{"):_answer.rindex("}") + 1])
+            _questions = [str(_question).strip() for _question in _questions["questions"]]
+            if len(_questions) == len(contents):
+                return _questions
+            self._logger.warning(
+                "Expected %d questions, got %d", len(contents), len(_questions)
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            self._logger.warning("Could not read the generated questions: %s", e)
+        if len(contents) == 1:
+            return [None]
+        # one prompt per content when the batch answer cannot be used
+        return [self._generate_batch([_content], intent)[0] for _content in contents]
+
+    def get_metrics(
+        self,
+    ):
+        """Question generation metrics
+
+        Returns:
+            dict: requests sent and cache hits and misses
+        """
+        with self._lock:
+            _metrics = {"question_requests": self.requests}
+        if self.cache:
+            _metrics.update(self.cache.get_metrics())
+        return _metrics
@@ -1,4 +1,5 @@
 import os
+import threading
 from datetime import datetime, timezone
 
 
@@ -26,11 +27,102 @@ class Summary:
         self.deleted_file: list[str] = []
         self.unchanged_file: list[str] = []
 
+        self.chunks: int = 0
+        self.duplicate_chunks: int = 0
+
         self.closed_reason: str = None
         self.log: str = None
 
+        # per file records not written to the log yet
+        self.records: list[dict] = []
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        state: str,
+        path: str,
+        **details,
+    ):
+        """Record the outcome of a file, safe to call from the pipeline threads
+
+        Args:
+            state (str): new, updated, deleted or unchanged
+            path (str): blob path of the file
+        """
+        _record = {
+            "type": "file",
+            "time": datetime.now(timezone.utc).strftime(DATEIME_FORMAT),
+            "state": state,
+            "file": path,
+            **details,
+        }
+        with self._lock:
+            getattr(self, f"{state}_file").append(path)
+            self.records.append(_record)
+
+    def add_chunks(
+        self,
+        chunks: int,
+        duplicates: int = 0,
+    ):
+        """Count the chunks of a stored file
+
+        Args:
+            chunks (int): chunks of the file
+            duplicates (int): chunks that other files hold as well
+        """
+        with self._lock:
+            self.chunks += chunks
+            self.duplicate_chunks += duplicates
+
+    def take_records(
+        self,
+    ):
+        """Take the records added since the last call
+
+        Returns:
+            list: per file records
+        """
+        with self._lock:
+            _records = self.records
+            self.records = []
+        return _records
+
+    def restore_records(
+        self,
+        records: list,
+    ):
+        """Put back taken records that could not be written, before the ones
+        added since
+
+        Args:
+            records (list): per file records
+        """
+        with self._lock:
+            self.records = records + self.records
+
+    def close(
+        self,
+        log: str = None,
+    ):
+        """Mark the end of the run and record its metrics after the files
+
+        Args:
+            log (str): path of the summary log
+        """
+        with self._lock:
+            self.end_time = datetime.now(timezone.utc)
+            self.log = log
+            self.records.append({"type": "run", **self._get_metrics()})
+
     def get_metrics(
         self,
+    ):
+        with self._lock:
+            return self._get_metrics()
+
+    def _get_metrics(
+        self,
     ):
         return {
             "build_id": self.build_id,
@@ -43,6 +135,12 @@ class Summary:
             "updated": len(self.updated_file),
             "deleted": len(self.deleted_file),
             "unchanged": len(self.unchanged_file),
+            "chunks": self.chunks,
+            "duplicate_chunks": self.duplicate_chunks,
+            "dedup_ratio": (
+                round(self.duplicate_chunks / self.chunks, 3) if self.chunks else 0
+            ),
+            "closed_reason": self.closed_reason,
             "log": self.log,
         }
 
@@ -50,13 +148,14 @@ class Summary:
         self,
     ):
         _full_log = {}
-        _full_log.update(self.get_metrics())
-        _full_log.update(
-            {
-                "new_files": self.new_file,
-                "updated_files": self.updated_file,
-                "deleted_files": self.deleted_file,
-                "unchanged_files": self.unchanged_file,
-            }
-        )
+        with self._lock:
+            _full_log.update(self._get_metrics())
+            _full_log.update(
+                {
+                    "new_files": list(self.new_file),
+                    "updated_files": list(self.updated_file),
+                    "deleted_files": list(self.deleted_file),
+                    "unchanged_files": list(self.unchanged_file),
+                }
+            )
         return _full_log
@@ -11,8 +11,8 @@ import os
 import time
 import uuid
 
-from azure.identity import DefaultAzureCredential
 from common import KeyVault
+from common.credential import CredentialProvider
 from common.handlers import KeyVaultHandler
 from common.openaiembeddingservice import AzureOpenAIEmbeddingService
 from helpers.configmapper import ConfigMapper
@@ -44,7 +44,7 @@ class SuperSearch:
         self._index_name = SUPERSEARCH_INDEX_NAME
         self._speed_perform_api = SpeedPerformAPI()
         self._content_parser = ContentParser()
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
         _key_vault_handler = KeyVaultHandler()
         _open_ai_service = _key_vault_handler.get_secret(
             secret_name=KeyVault.open_ai_service_secret_name,
@@ -6,8 +6,9 @@
 
 import openai
 
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from azure.identity import get_bearer_token_provider
 
+from common.credential import CredentialProvider
 from common.handlers import KeyVaultHandler
 
 
@@ -47,7 +48,7 @@ class QuestionGenerator:
         client = openai.AzureOpenAI(
             azure_endpoint=self._open_ai_endpoint,
             azure_ad_token_provider=get_bearer_token_provider(
-                DefaultAzureCredential(),
+                CredentialProvider.get_credential(),
                 "https://cognitiveservices.azure.com/.default",
             ),
             api_version=self._open_ai_api_version,
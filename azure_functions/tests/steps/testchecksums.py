@@ -0,0 +1,107 @@
+"""Test Stored Checksums Steps."""
+
+import hashlib
+import logging
+from unittest.mock import patch
+
+from azure.core.exceptions import ResourceNotFoundError
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from webcrawler.config import CrawlerConfig
+from webcrawler.manager import WebCrawlerManager
+
+
+def checksum(content):
+    """Checksum metadata of a stored chunk."""
+    return hashlib.md5(content, usedforsecurity=False).hexdigest()
+
+
+@given("a crawler manager whose {domain} chunks were stored before")
+def step_impl(context, domain):  # noqa: F811 # pylint: disable=function-redefined
+    """a crawler manager whose {domain} chunks were stored before."""
+    _configuration = CrawlerConfig.model_validate(
+        {
+            "documents": {
+                "storage": {"account": "https://account", "container": "documents"},
+                "urls": [f"https://{domain}/index.html"],
+            },
+        }
+    )
+    _handler_patcher = patch("webcrawler.manager.ConfigurationHandler")
+    _handler = _handler_patcher.start()
+    context.add_cleanup(_handler_patcher.stop)
+    _handler.return_value.load.return_value = _configuration
+
+    _blob_patcher = patch("webcrawler.manager.BlobHandler")
+    context.blob_handler = _blob_patcher.start()
+    context.add_cleanup(_blob_patcher.stop)
+    context.blob_handler.list_metadata.return_value = {
+        f"{domain}/index.html/index_0.html": {"checksum": checksum(b"page")},
+    }
+    context.blob_handler.get_properties.side_effect = ResourceNotFoundError("missing")
+
+    context.crawler_manager = WebCrawlerManager(
+        config_name="config.yaml",
+        logger=logging.getLogger(__name__),
+    )
+    context.crawler_manager.prefetch_checksums()
+
+
+def store(context, url, content):
+    """Store a page of a single chunk."""
+    context.crawler_manager.store_in_blob(
+        url=url,
+        contents=[{"content": content, "metadata": {}}],
+        content_type="text/html",
+    )
+
+
+@when("the crawler manager stores the same page of {domain}")
+def step_impl(context, domain):  # noqa: F811 # pylint: disable=function-redefined
+    """the crawler manager stores the same page of {domain}."""
+    store(context, f"https://{domain}/index.html", b"page")
+
+
+@when("the crawler manager stores a changed page of {domain}")
+def step_impl(context, domain):  # noqa: F811 # pylint: disable=function-redefined
+    """the crawler manager stores a changed page of {domain}."""
+    store(context, f"https://{domain}/index.html", b"changed page")
+
+
+@when("the crawler manager stores a new page of {domain} twice")
+def step_impl(context, domain):  # noqa: F811 # pylint: disable=function-redefined
+    """the crawler manager stores a new page of {domain} twice."""
+    store(context, f"https://{domain}/new.html", b"new page")
+    store(context, f"https://{domain}/new.html", b"new page")
+
+
+@then("no chunk is uploaded")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """no chunk is uploaded."""
+    context.blob_handler.upload.assert_not_called()
+
+
+@then("{count:d} chunk is uploaded")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """{count:d} chunk is uploaded."""
+    assert context.blob_handler.upload.call_count == count
+
+
+@then("no chunk properties are read")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """no chunk properties are read."""
+    context.blob_handler.get_properties.assert_not_called()
+
+
+@then("the chunk properties are read once")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the chunk properties are read once."""
+    context.blob_handler.get_properties.assert_called_once()
+
+
+@then("the page is recorded as {state}")
+def step_impl(context, state):  # noqa: F811 # pylint: disable=function-redefined
+    """the page is recorded as {state}."""
+    _summary = context.crawler_manager.crawler_summary
+    _pages = _summary.new_pages if state == "new" else _summary.updated_pages
+    assert len(_pages) == 1, _pages
@@ -0,0 +1,231 @@
+"""Test Chunk Store Steps."""
+
+import json
+import logging
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from superagent.chunkstore import KEY_VERSION, ChunkStore
+from superagent.chunkwriter import ChunkWriter
+from superagent.ingest import Ingester
+from superagent.summary import Summary
+
+
+def chunk_keys(text):
+    """Keys of the chunks '1 and 2'."""
+    return [f"chunk-{_key.strip()}" for _key in text.split(" and ")]
+
+
+def get_chunk_store(context, entries):
+    """Chunk store over a manifest of the given entries."""
+    _manifest = MagicMock()
+    _manifest.items.return_value = list(entries.items())
+    context.chunk_store = ChunkStore(manifest=_manifest)
+    context.chunk_store.load()
+    context.claims = {}
+
+
+def section(name):
+    """Content of a section."""
+    return f"<p>The {name} section of the pages.</p>".encode("utf-8")
+
+
+@given('the chunk text "{text}"')
+def step_impl(context, text):  # noqa: F811 # pylint: disable=function-redefined
+    """the chunk text "{text}"."""
+    context.chunk_key = ChunkStore.key(text.encode("utf-8"))
+
+
+@then('it has the key of the chunk text "{text}"')
+def step_impl(context, text):  # noqa: F811 # pylint: disable=function-redefined
+    """it has the key of the chunk text "{text}"."""
+    assert context.chunk_key == ChunkStore.key(text.encode("utf-8"))
+
+
+@then('it has another key than the chunk text "{text}"')
+def step_impl(context, text):  # noqa: F811 # pylint: disable=function-redefined
+    """it has another key than the chunk text "{text}"."""
+    assert context.chunk_key != ChunkStore.key(text.encode("utf-8"))
+
+
+@given("a chunk store over a manifest without chunks")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """a chunk store over a manifest without chunks."""
+    get_chunk_store(context, {})
+
+
+@given("a chunk store over a manifest where file {name} has the chunks {keys}")
+def step_impl(context, name, keys):  # noqa: F811 # pylint: disable=function-redefined
+    """a chunk store over a manifest where file {name} has the chunks {keys}."""
+    get_chunk_store(
+        context,
+        {name: {"hashes": chunk_keys(keys), "keyversion": KEY_VERSION}},
+    )
+
+
+@given("a chunk store over a manifest where file {name} has the outdated chunks {keys}")
+def step_impl(context, name, keys):  # noqa: F811 # pylint: disable=function-redefined
+    """a chunk store over a manifest where file {name} has the outdated chunks {keys}."""
+    get_chunk_store(context, {name: {"hashes": chunk_keys(keys)}})
+
+
+@when("file {name} claims the chunks {keys}")
+def step_impl(context, name, keys):  # noqa: F811 # pylint: disable=function-redefined
+    """file {name} claims the chunks {keys}."""
+    context.claims[name] = context.chunk_store.claim(chunk_keys(keys))
+
+
+@then("file {name} writes the chunks {keys}")
+def step_impl(context, name, keys):  # noqa: F811 # pylint: disable=function-redefined
+    """file {name} writes the chunks {keys}."""
+    _own, _wait = context.claims[name]
+    assert sorted(_own) == chunk_keys(keys), _own
+    assert not _wait, _wait
+
+
+@then("another file writes the chunks {keys} again")
+def step_impl(context, keys):  # noqa: F811 # pylint: disable=function-redefined
+    """another file writes the chunks {keys} again."""
+    _own, _wait = context.chunk_store.claim(chunk_keys(keys))
+    assert sorted(_own) == chunk_keys(keys), _own
+    assert not _wait, _wait
+
+
+@then("file {name} writes the chunk {key} and waits for {count:d} chunk")
+def step_impl(context, name, key, count):  # noqa: F811 # pylint: disable=function-redefined
+    """file {name} writes the chunk {key} and waits for {count:d} chunk."""
+    _own, _wait = context.claims[name]
+    assert sorted(_own) == chunk_keys(key), _own
+    assert len(_wait) == count, _wait
+    assert not any(_future.done() for _future in _wait)
+
+
+@when("the chunk {key} is written")
+def step_impl(context, key):  # noqa: F811 # pylint: disable=function-redefined
+    """the chunk {key} is written."""
+    context.chunk_store.complete(chunk_keys(key)[0])
+
+
+@then("file {name} stops waiting")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """file {name} stops waiting."""
+    _, _wait = context.claims[name]
+    assert all(_future.result(timeout=1) for _future in _wait)
+
+
+@then("file {name} claims nothing for the chunks {keys}")
+def step_impl(context, name, keys):  # noqa: F811 # pylint: disable=function-redefined
+    """file {name} claims nothing for the chunks {keys}."""
+    _own, _wait = context.chunk_store.claim(chunk_keys(keys))
+    assert not _own and not _wait, (_own, _wait)
+
+
+@when("file {name} is stored again with the chunks {keys}")
+def step_impl(context, name, keys):  # noqa: F811 # pylint: disable=function-redefined
+    """file {name} is stored again with the chunks {keys}."""
+    _previous = dict(context.chunk_store.manifest.items())[name]["hashes"]
+    _own, _ = context.chunk_store.claim(chunk_keys(keys))
+    for _key in _own:
+        context.chunk_store.complete(_key)
+    context.chunk_store.reference(chunk_keys(keys), _previous)
+
+
+@then("the chunk store collects the chunk {key}")
+def step_impl(context, key):  # noqa: F811 # pylint: disable=function-redefined
+    """the chunk store collects the chunk {key}."""
+    _keys = context.chunk_store.collect()
+    assert _keys == chunk_keys(key), _keys
+    assert context.chunk_store.collect() == []
+
+
+@given("an ingester storing deduplicated chunks")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """an ingester storing deduplicated chunks."""
+    _patcher = patch("superagent.chunkwriter.BlobServiceClient")
+    _service_client = _patcher.start()
+    context.add_cleanup(_patcher.stop)
+    context.container_client = _service_client.return_value.get_container_client.return_value
+
+    _ingester = Ingester.__new__(Ingester)
+    _ingester._logger = logging.getLogger(__name__)
+    _ingester.manifest = MagicMock()
+    _ingester.manifest.items.return_value = []
+    _ingester.superagent_summary = Summary("config.yaml")
+    _ingester.chunk_writer = ChunkWriter(
+        storage_account_url="https://account",
+        container_name="output",
+        path="chunks",
+        credential=object(),
+    )
+    context.add_cleanup(_ingester.chunk_writer.close)
+    _ingester.chunk_store = ChunkStore(manifest=_ingester.manifest)
+    _ingester.chunk_store.load()
+    context.ingester = _ingester
+
+
+@when("the ingester stores {path} with the sections {sections}")
+def step_impl(context, path, sections):  # noqa: F811 # pylint: disable=function-redefined
+    """the ingester stores {path} with the sections {sections}."""
+    context.ingester.store_page(
+        {
+            "file_blob_path": path,
+            "file_name": path.rsplit(".", 1)[0],
+            "state": "new",
+            "entry": {},
+            "manifest_entry": {},
+            "chunks": [
+                {"content": section(_name), "metadata": {"blob_path": path}}
+                for _name in sections.split(" and ")
+            ],
+        }
+    )
+
+
+def uploads(context):
+    """Uploaded blobs by name."""
+    return {
+        _call.kwargs["name"]: _call.kwargs
+        for _call in context.container_client.upload_blob.call_args_list
+    }
+
+
+@then("{count:d} chunk blobs are written")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """{count:d} chunk blobs are written."""
+    _names = [_name for _name in uploads(context) if _name.startswith("chunks/chunks/")]
+    assert len(_names) == count, _names
+    assert context.container_client.upload_blob.call_count == count + 2
+
+
+@then("the chunk blob of {name} has no metadata")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the chunk blob of {name} has no metadata."""
+    _name = f"chunks/{ChunkStore.blob_name(ChunkStore.key(section(name)))}"
+    _upload = uploads(context)[_name]
+    assert _upload["metadata"] is None, _upload
+    assert name in json.loads(_upload["data"])["content"], _upload
+
+
+@then("the record of {file_name} lists {sections} with the metadata of {path}")
+def step_impl(context, file_name, sections, path):  # noqa: F811 # pylint: disable=function-redefined
+    """the record of {file_name} lists {sections} with the metadata of {path}."""
+    _upload = uploads(context)[f"chunks/{ChunkStore.record_name(file_name)}"]
+    assert json.loads(_upload["data"]) == {
+        "chunks": [
+            {"hash": ChunkStore.key(section(_name)), "metadata": {"blob_path": path}}
+            for _name in sections.split(" and ")
+        ],
+    }, _upload
+
+
+@then("the summary reports {duplicates:d} duplicate chunk of {chunks:d} across files")
+def step_impl(context, duplicates, chunks):  # noqa: F811 # pylint: disable=function-redefined
+    """the summary reports {duplicates:d} duplicate chunk of {chunks:d} across files."""
+    _summary = context.ingester.superagent_summary
+    _summary.end_time = datetime.now(timezone.utc)
+    _metrics = _summary.get_metrics()
+    assert _metrics["chunks"] == chunks, _metrics
+    assert _metrics["duplicate_chunks"] == duplicates, _metrics
+    assert _metrics["dedup_ratio"] == round(duplicates / chunks, 3), _metrics
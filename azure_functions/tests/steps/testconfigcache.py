@@ -0,0 +1,133 @@
+"""Test Config Cache Steps."""
+
+import os
+from unittest import mock
+
+import yaml
+from azure.core.exceptions import ResourceNotModifiedError
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from common.configcache import ConfigCache
+
+
+class InMemoryBlob:
+    """Blob client downloading a configuration held in memory."""
+
+    def __init__(self, context):
+        self._context = context
+
+    def download_blob(self, etag=None, match_condition=None):
+        """Download the blob unless its ETag is the one given."""
+        if etag is not None and etag == self._context.etag:
+            raise ResourceNotModifiedError("Not modified")
+        _downloader = mock.MagicMock()
+        _downloader.readall.return_value = self._context.content
+        _downloader.properties.etag = self._context.etag
+        return _downloader
+
+
+def read_names(content):
+    """Names of the configurations listed in a configuration."""
+    return list(yaml.safe_load(content)["superagent"])
+
+
+def read(context, parse):
+    """Read the configuration blob through the cache."""
+    context.values.append(
+        ConfigCache.get(
+            storage_account_url="https://account",
+            container_name="configurations",
+            blob_path=context.blob_path,
+            parse=parse,
+            credential="credential",
+        )
+    )
+
+
+@given('a configuration blob "{blob_path}"')
+def step_impl(context, blob_path):  # noqa: F811 # pylint: disable=function-redefined
+    """a configuration blob "{blob_path}"."""
+    context.blob_path = blob_path
+    context.content = b"superagent:\n  - pages.yaml\n"
+    context.etag = "1"
+    context.values = []
+    for _name, _value in (
+        ("_entries", {}),
+        ("_clients", {}),
+        ("_metrics", {_metric: 0 for _metric in ConfigCache.get_metrics()}),
+    ):
+        _patcher = mock.patch.object(ConfigCache, _name, _value)
+        _patcher.start()
+        context.add_cleanup(_patcher.stop)
+    _patcher = mock.patch("common.configcache.BlobServiceClient")
+    _client = _patcher.start()
+    context.add_cleanup(_patcher.stop)
+    _client.return_value.get_blob_client.return_value = InMemoryBlob(context)
+
+
+@given("configurations are checked on every read")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """configurations are checked on every read."""
+    _patcher = mock.patch.dict(os.environ, {"CONFIG_CACHE_TTL": "0"})
+    _patcher.start()
+    context.add_cleanup(_patcher.stop)
+
+
+@when("the configuration is read as YAML")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the configuration is read as YAML."""
+    read(context, yaml.safe_load)
+
+
+@when("the configuration is read as YAML again")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the configuration is read as YAML again."""
+    read(context, yaml.safe_load)
+
+
+@when("the configuration is read as its names")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the configuration is read as its names."""
+    read(context, read_names)
+    assert context.values[-1] == ["pages.yaml"], context.values[-1]
+
+
+@when("the configuration blob changes")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the configuration blob changes."""
+    context.content = b"superagent:\n  - pages.yaml\n  - tariffs.yaml\n"
+    context.etag = "2"
+
+
+@then("the configuration was downloaded {count:d} time")
+@then("the configuration was downloaded {count:d} times")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """the configuration was downloaded {count:d} times."""
+    _metrics = ConfigCache.get_metrics()
+    assert _metrics["config_downloads"] == count, _metrics
+
+
+@then("the cache served {count:d} hit")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """the cache served {count:d} hit."""
+    _metrics = ConfigCache.get_metrics()
+    assert _metrics["config_hits"] == count, _metrics
+
+
+@then("the blob was not modified {count:d} time")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """the blob was not modified {count:d} time."""
+    _metrics = ConfigCache.get_metrics()
+    assert _metrics["config_not_modified"] == count, _metrics
+
+
+@then("the same configuration was returned")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the same configuration was returned."""
+    assert context.values[0] is context.values[1], context.values
+
+
+@then("the configuration read last is the changed one")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the configuration read last is the changed one."""
+    assert context.values[-1] == {"superagent": ["pages.yaml", "tariffs.yaml"]}, context.values[-1]
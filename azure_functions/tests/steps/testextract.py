@@ -0,0 +1,100 @@
+"""Test Extract Steps."""
+
+from unittest import mock
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+import superagent
+from superagent import SuperAgent
+
+
+def get_names(names):
+    """Names of a step listed as "a, b and c"."""
+    return names.replace(" and ", ", ").split(", ")
+
+
+def patch(context, target, **kwargs):
+    """Patch a name of the superagent module for the scenario."""
+    _patcher = mock.patch.object(superagent, target, **kwargs)
+    _mock = _patcher.start()
+    context.add_cleanup(_patcher.stop)
+    return _mock
+
+
+def get_configs(context, names, failing_close=None, failing_manager=None):
+    """Configs whose manager and ingester are mocks recording the run."""
+    context.closed = []
+    context.summaries = {}
+
+    _handler = patch(context, "ConfigurationHandler").return_value
+    _handler.exists.return_value = True
+    _handler.get_config_names.return_value = get_names(names)
+    _provider = patch(context, "CredentialProvider")
+    _provider.get_metrics.return_value = {}
+
+    def _manager(config_name, logger):
+        if config_name == failing_manager:
+            raise ValueError(f"Cannot read {config_name}")
+        _manager = mock.MagicMock()
+        _manager.configuration.concurrency = None
+        _manager.superagent_summary.closed_reason = None
+
+        def _save_summary(run_start_time):
+            context.summaries[config_name] = _manager.superagent_summary
+            return {"config_name": config_name}
+
+        _manager.save_summary.side_effect = _save_summary
+        return _manager
+
+    def _ingester(**kwargs):
+        _ingester = mock.MagicMock()
+        _ingester.list_pages.return_value = iter([])
+        _ingester.stopped = False
+        _config_name = kwargs["config_name"]
+
+        def _close(failed):
+            context.closed.append(_config_name)
+            if _config_name == failing_close:
+                raise OSError(f"Cannot flush the manifest of {_config_name}")
+
+        _ingester.close.side_effect = _close
+        return _ingester
+
+    patch(context, "SuperAgentManager", side_effect=_manager)
+    patch(context, "Ingester", side_effect=_ingester)
+
+
+@given("the configs {names} where closing the ingestion of {name} fails")
+def step_impl(context, names, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the configs {names} where closing the ingestion of {name} fails."""
+    get_configs(context, names, failing_close=name)
+
+
+@given("the configs {names} where the manager of {name} cannot start")
+def step_impl(context, names, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the configs {names} where the manager of {name} cannot start."""
+    get_configs(context, names, failing_manager=name)
+
+
+@when("the super agent extracts the configs")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the super agent extracts the configs."""
+    SuperAgent().extract(config_name="all")
+
+
+@then("the configs {names} were closed")
+def step_impl(context, names):  # noqa: F811 # pylint: disable=function-redefined
+    """the configs {names} were closed."""
+    assert context.closed == get_names(names), context.closed
+
+
+@then("the summary of the configs {names} was saved")
+def step_impl(context, names):  # noqa: F811 # pylint: disable=function-redefined
+    """the summary of the configs {names} was saved."""
+    assert list(context.summaries) == get_names(names), list(context.summaries)
+
+
+@then("the summary of {name} was closed by an error")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the summary of {name} was closed by an error."""
+    assert context.summaries[name].closed_reason == "error", context.summaries[name].closed_reason
@@ -0,0 +1,106 @@
+"""Test Index Writer Steps."""
+
+from unittest.mock import MagicMock, patch
+
+from azure.core.exceptions import HttpResponseError
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from superagent.indexwriter import SearchIndexWriter
+
+
+def get_search_index(context, upload):
+    """Search client recording the keys of each upload request."""
+    context.requests = []
+
+    def _upload_documents(documents):
+        _keys = [int(_document["chunk_id"]) for _document in documents]
+        context.requests.append(_keys)
+        return upload(_keys)
+
+    _patcher = patch("superagent.indexwriter.SearchClient")
+    _client = _patcher.start()
+    context.add_cleanup(_patcher.stop)
+    _client.return_value.upload_documents.side_effect = _upload_documents
+    _patcher = patch("superagent.indexwriter.RETRY_WAIT", 0)
+    _patcher.start()
+    context.add_cleanup(_patcher.stop)
+
+
+def get_result(key, status_code):
+    """Indexing result of a document."""
+    return MagicMock(
+        key=str(key),
+        succeeded=status_code == 200,
+        status_code=status_code,
+        error_message=None if status_code == 200 else "failed",
+    )
+
+
+def get_failing_index(context, status_code, keys):
+    """Search index failing the documents with the keys once."""
+    _failing = {int(_key) for _key in keys.replace(" and ", ", ").split(", ")}
+
+    def _upload(request_keys):
+        _results = [
+            get_result(_key, status_code if _key in _failing else 200)
+            for _key in request_keys
+        ]
+        _failing.difference_update(request_keys)
+        return _results
+
+    get_search_index(context, _upload)
+
+
+@given("a search index answering {status_code:d} for the documents {keys} once")
+def step_impl(context, status_code, keys):  # noqa: F811 # pylint: disable=function-redefined
+    """a search index answering {status_code:d} for the documents {keys} once."""
+    get_failing_index(context, status_code, keys)
+
+
+@given("a search index refusing requests of more than {count:d} documents")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """a search index refusing requests of more than {count:d} documents."""
+
+    def _upload(request_keys):
+        if len(request_keys) > count:
+            _error = HttpResponseError(message="Request Entity Too Large")
+            _error.status_code = 413
+            raise _error
+        return [get_result(_key, 200) for _key in request_keys]
+
+    get_search_index(context, _upload)
+
+
+@when("the index writer uploads {count:d} documents")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """the index writer uploads {count:d} documents."""
+    context.index_writer = SearchIndexWriter(
+        endpoint="https://search",
+        index_name="index",
+        credential=MagicMock(),
+    )
+    for _key in range(1, count + 1):
+        context.index_writer.add({"chunk_id": str(_key), "content": "text"})
+    context.index_writer.close()
+
+
+@then("the search index received the requests {requests}")
+def step_impl(context, requests):  # noqa: F811 # pylint: disable=function-redefined
+    """the search index received the requests {requests}."""
+    # "1-3 then 2 and 5" are the requests of the documents 1 to 3, then 2 and 5
+    _expected = []
+    for _request in requests.split(" then "):
+        _keys = []
+        for _range in _request.replace(" and ", ", ").split(", "):
+            _first, _, _last = _range.partition("-")
+            _keys.extend(range(int(_first), int(_last or _first) + 1))
+        _expected.append(_keys)
+    assert context.requests == _expected, context.requests
+
+
+@then("the index writer uploaded {uploaded:d} documents and failed {failed:d}")
+def step_impl(context, uploaded, failed):  # noqa: F811 # pylint: disable=function-redefined
+    """the index writer uploaded {uploaded:d} documents and failed {failed:d}."""
+    _metrics = context.index_writer.get_metrics()
+    assert _metrics["documents_uploaded"] == uploaded, _metrics
+    assert _metrics["documents_failed"] == failed, _metrics
@@ -0,0 +1,123 @@
+"""Test JSON Parser Steps."""
+
+import io
+import json
+import os
+from unittest import mock
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from superagent.parsers import json as json_parser
+from superagent.parsers.json import INDEX_DATA, JSONParser, parse_json
+
+
+def get_export(index_data):
+    """Export of a page with the fields used for the chunks."""
+    _export = {
+        "Title": "Page été",
+        "ARM_Content_Reference": "/sites/page",
+        "Tags": ["a", "b"],
+        "Rating": 1.5e+300,
+        "Body": "quoted \"text\" \\ and 😀",
+    }
+    if index_data is not None:
+        _export[INDEX_DATA] = index_data
+    return _export
+
+
+@given("the JSON parser reads windows of {window:d} characters in blocks of {size:d} bytes")
+def step_impl(context, window, size):  # noqa: F811 # pylint: disable=function-redefined
+    """the JSON parser reads windows of {window:d} characters in blocks of {size:d} bytes."""
+    context.window = window
+    for _name, _value in (("CHUNK_WINDOW", window), ("READ_SIZE", size)):
+        _patcher = mock.patch.object(json_parser, _name, _value)
+        _patcher.start()
+        context.add_cleanup(_patcher.stop)
+
+
+@given("a JSON export whose index data has {count:d} lines")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """a JSON export whose index data has {count:d} lines."""
+    context.index_data = "".join(
+        f"<p>Line {_line} é \"\\\" 😀</p>\n" for _line in range(count)
+    )
+    context.export = get_export(context.index_data)
+
+
+@given("a JSON export without index data")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """a JSON export without index data."""
+    context.index_data = None
+    context.export = get_export(None)
+
+
+@when("the JSON parser reads the export")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the JSON parser reads the export."""
+    _json_file = io.BytesIO(json.dumps(context.export, ensure_ascii=False).encode("utf-8"))
+    context.dump = io.StringIO()
+    context.fields = {}
+    context.pieces = list(
+        JSONParser().read_export(_json_file, context.dump, context.fields, "pages/page.json")
+    )
+
+
+@when("the export is parsed")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the export is parsed."""
+    context.content = json.dumps(context.export).encode("utf-8")
+    with mock.patch.dict(os.environ, {"SharePointURL": "https://sharepoint"}):
+        context.result = parse_json(context.content, "pages/page.json", "container")
+
+
+@then("the index data is read in more than {count:d} pieces of at most {size:d} characters")
+def step_impl(context, count, size):  # noqa: F811 # pylint: disable=function-redefined
+    """the index data is read in more than {count:d} pieces of at most {size:d} characters."""
+    assert len(context.pieces) > count, len(context.pieces)
+    # a window and the block read after it
+    assert all(len(_piece) <= size for _piece in context.pieces), [len(_piece) for _piece in context.pieces]
+
+
+@then("the pieces join into the index data")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the pieces join into the index data."""
+    assert "".join(context.pieces) == context.index_data
+
+
+@then("the fields of the export are kept")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the fields of the export are kept."""
+    assert context.fields == {
+        "Title": context.export["Title"],
+        "ARM_Content_Reference": context.export["ARM_Content_Reference"],
+        INDEX_DATA: True,
+    }, context.fields
+
+
+@then("no index data is read")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """no index data is read."""
+    assert not context.pieces, context.pieces
+    assert INDEX_DATA not in context.fields, context.fields
+
+
+@then("the dump holds the serialized export")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the dump holds the serialized export."""
+    assert context.dump.getvalue() == json.dumps(context.export), context.dump.getvalue()
+
+
+@then("the result holds the chunks of the export and its size")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the result holds the chunks of the export and its size."""
+    assert context.result["size"] == len(context.content), context.result["size"]
+    _chunks = context.result["chunks"]
+    assert _chunks, _chunks
+    assert all(isinstance(_chunk["content"], bytes) for _chunk in _chunks)
+    assert "Line 39" in _chunks[-1]["content"].decode("utf-8")
+
+
+@then("the peak memory is not measured")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the peak memory is not measured."""
+    assert context.result["peak_memory"] is None, context.result["peak_memory"]
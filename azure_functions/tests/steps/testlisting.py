@@ -0,0 +1,184 @@
+"""Test Listing Steps."""
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from azure.core.exceptions import ResourceNotFoundError
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from superagent.ingest import Ingester
+
+
+def get_names(names):
+    """Names of a step listed as "a, b and c"."""
+    return names.replace(" and ", ", ").split(", ")
+
+
+def get_ingester(context):
+    """Ingester listing the documents, without its writers and caches."""
+    _ingester = Ingester.__new__(Ingester)
+    _ingester._logger = logging.getLogger(__name__)
+    _ingester.configuration = context.configuration
+    _ingester.credential = None
+    _ingester.manifest = MagicMock(base_path="index/pages")
+    _ingester.chunk_store = None
+    _ingester.listing_state = {}
+    _ingester._listing_state_path = "index/pages/listing.json"
+    _ingester._listing_complete = False
+    _ingester._listing_watermark = None
+    _ingester._stopped_at = None
+    _ingester.deadline = None
+    return _ingester
+
+
+def get_blob_handler(context):
+    """Blob handler over the documents and the state blobs in memory."""
+
+    def _download(storage_account_url, container_name, blob_path):
+        if blob_path not in context.state_blobs:
+            raise ResourceNotFoundError("Not found")
+        return context.state_blobs[blob_path]
+
+    def _upload(storage_account_url, container_name, blob_path, content, overwrite):
+        context.state_blobs[blob_path] = content
+
+    def _list_blob_pages(
+        container_name,
+        directory_path,
+        accountcredentials,
+        account_url,
+        continuation_token,
+        modified_since,
+        results_per_page,
+    ):
+        # the token of a page is the index of its first blob
+        _names = sorted(context.documents)
+        _start = int(continuation_token or 0)
+        for _index in range(_start, len(_names), results_per_page):
+            _next = _index + results_per_page
+            yield [
+                {
+                    "name": _name,
+                    "size": 10,
+                    "last_modified": context.documents[_name],
+                }
+                for _name in _names[_index:_next]
+                if not modified_since or context.documents[_name] > modified_since
+            ], (str(_next) if _next < len(_names) else None)
+
+    _blob_handler = MagicMock()
+    _blob_handler.download.side_effect = _download
+    _blob_handler.upload.side_effect = _upload
+    _blob_handler.list_blob_pages.side_effect = _list_blob_pages
+    return _blob_handler
+
+
+def get_documents(context, names, count, watermark):
+    """Documents modified a day ago, listed count per page."""
+    _modified = datetime.now(timezone.utc) - timedelta(days=1)
+    context.documents = {_name: _modified for _name in get_names(names)}
+    context.state_blobs = {}
+    context.configuration = MagicMock()
+    context.configuration.documents.storage.path = "pages"
+    context.configuration.documents.pagesize = count
+    context.configuration.documents.watermark = watermark
+    _patcher = patch("superagent.ingest.BlobHandler", get_blob_handler(context))
+    _patcher.start()
+    context.add_cleanup(_patcher.stop)
+
+
+def hand_out(context, count=None):
+    """Files a run hands out, all of them without a count."""
+    context.ingester = get_ingester(context)
+    context.items = []
+    for _item in context.ingester.list_pages():
+        context.items.append(_item)
+        if len(context.items) == count:
+            break
+
+
+@given("the documents {names} listed {count:d} per page")
+def step_impl(context, names, count):  # noqa: F811 # pylint: disable=function-redefined
+    """the documents {names} listed {count:d} per page."""
+    get_documents(context, names, count, watermark=False)
+
+
+@given("the documents {names} listed {count:d} per page with a watermark")
+def step_impl(context, names, count):  # noqa: F811 # pylint: disable=function-redefined
+    """the documents {names} listed {count:d} per page with a watermark."""
+    get_documents(context, names, count, watermark=True)
+
+
+@when("a run hands out {count:d} files and stops")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """a run hands out {count:d} files and stops."""
+    hand_out(context, count)
+
+
+@when("a run lists the documents and completes")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """a run lists the documents and completes."""
+    hand_out(context)
+    context.ingester._save_checkpoint([])
+
+
+@when("a run lists the documents and the file {name} fails")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """a run lists the documents and the file {name} fails."""
+    hand_out(context)
+    context.ingester._save_checkpoint(
+        [_item for _item in context.items if _item["properties"]["name"] == name]
+    )
+
+
+@when("a run hands out {count:d} files, the file {name} fails and the time budget runs out")
+def step_impl(context, count, name):  # noqa: F811 # pylint: disable=function-redefined
+    """a run hands out {count:d} files, the file {name} fails and the time budget runs out."""
+    context.ingester = get_ingester(context)
+    context.items = []
+    _items = context.ingester.list_pages()
+    for _item in _items:
+        context.items.append(_item)
+        if len(context.items) == count:
+            break
+    # no file is handed out once the deadline passed
+    context.ingester.deadline = 0
+    assert next(_items, None) is None
+    context.ingester._save_checkpoint(
+        [_item for _item in context.items if _item["properties"]["name"] == name]
+    )
+
+
+@then("the run was stopped by the time budget")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the run was stopped by the time budget."""
+    assert context.ingester.stopped
+
+
+@when("the document {name} changes")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the document {name} changes."""
+    context.documents[name] = datetime.now(timezone.utc)
+
+
+@when("the next run lists the documents")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the next run lists the documents."""
+    hand_out(context)
+
+
+@then("the listing checkpoint resumes from the page of {name}")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the listing checkpoint resumes from the page of {name}."""
+    _state = json.loads(context.state_blobs["index/pages/listing.json"])
+    _token = str(sorted(context.documents).index(name))
+    assert _state["continuation_token"] == _token, _state
+
+
+@then("the run hands out the files {names}")
+def step_impl(context, names):  # noqa: F811 # pylint: disable=function-redefined
+    """the run hands out the files {names}."""
+    _names = [_item["properties"]["name"] for _item in context.items]
+    assert _names == get_names(names), _names
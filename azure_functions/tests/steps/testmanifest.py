@@ -0,0 +1,187 @@
+"""Test Manifest Steps."""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import yaml
+from azure.core.exceptions import ResourceNotFoundError
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from superagent.config import Storage, SuperAgentIndex
+from superagent.manifest import Manifest
+
+
+class InMemoryBlobs:
+    """Blob storage of a test, the blob handler calls keyed by blob path"""
+
+    def __init__(self):
+        self.blobs = {}
+        self.on_upload = None
+
+    def upload(self, blob_path, content, **kwargs):
+        """Upload blob."""
+        if self.on_upload:
+            self.on_upload(blob_path)
+        self.blobs[blob_path] = content
+
+    def download(self, blob_path, **kwargs):
+        """Download blob."""
+        if blob_path not in self.blobs:
+            raise ResourceNotFoundError(blob_path)
+        return self.blobs[blob_path]
+
+    def list(self, blob_path, **kwargs):
+        """List blobs."""
+        return [
+            SimpleNamespace(name=_name)
+            for _name in self.blobs
+            if _name.startswith(blob_path)
+        ]
+
+    def delete(self, blob_path, **kwargs):
+        """Delete blob."""
+        if blob_path not in self.blobs:
+            raise ResourceNotFoundError(blob_path)
+        del self.blobs[blob_path]
+
+    def segments(self):
+        """Delta segments of the test manifest."""
+        return [_name for _name in self.blobs if _name.startswith("index/config/delta/")]
+
+
+def get_manifest():
+    """Manifest of the test configuration."""
+    return Manifest(
+        index=SuperAgentIndex(
+            storage=Storage(account="https://account", container="index", path="index"),
+            flushsize=100,
+        ),
+        config_name="config.yaml",
+    )
+
+
+def entry(name):
+    """Manifest entry of a test file."""
+    return {"checksum": f"checksum-{name}"}
+
+
+def names(text):
+    """Names of 'a, b and c'."""
+    return [_name.strip() for _name in text.replace(" and ", ",").split(",")]
+
+
+def use_blobs(context):
+    """Patch the blob handler of the manifest with an in-memory storage."""
+    context.blobs = InMemoryBlobs()
+    _patcher = patch("superagent.manifest.BlobHandler", context.blobs)
+    _patcher.start()
+    context.add_cleanup(_patcher.stop)
+
+
+@given("a manifest over an empty index storage")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """a manifest over an empty index storage."""
+    use_blobs(context)
+    context.manifest = get_manifest()
+    context.manifest.load()
+
+
+@given("a manifest over a yaml index with {files}")
+def step_impl(context, files):  # noqa: F811 # pylint: disable=function-redefined
+    """a manifest over a yaml index with {files}."""
+    use_blobs(context)
+    _index = {}
+    for _name in names(files):
+        # the first index held the checksums, later ones the entries
+        _index[_name] = f"checksum-{_name}" if not _index else entry(_name)
+    context.blobs.blobs["index/config.yaml"] = yaml.safe_dump(_index).encode("utf-8")
+    context.manifest = get_manifest()
+
+
+@when("the manifest records {files} then removes {removed} and flushes")
+def step_impl(context, files, removed):  # noqa: F811 # pylint: disable=function-redefined
+    """the manifest records {files} then removes {removed} and flushes."""
+    for _name in names(files):
+        context.manifest.set(_name, entry(_name))
+    for _name in names(removed):
+        context.manifest.remove(_name)
+    context.manifest.flush()
+
+
+@when("the manifest flushes after recording {files}")
+def step_impl(context, files):  # noqa: F811 # pylint: disable=function-redefined
+    """the manifest flushes after recording {files}."""
+    for _name in names(files):
+        context.manifest.set(_name, entry(_name))
+    context.manifest.flush()
+
+
+@when("the manifest records {files} while the snapshot is uploaded")
+def step_impl(context, files):  # noqa: F811 # pylint: disable=function-redefined
+    """the manifest records {files} while the snapshot is uploaded."""
+
+    def _record(blob_path):
+        if blob_path.endswith("manifest.json"):
+            context.blobs.on_upload = None
+            for _name in names(files):
+                context.manifest.set(_name, entry(_name))
+
+    context.blobs.on_upload = _record
+    context.manifest.compact()
+
+
+@when("the manifest is compacted")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the manifest is compacted."""
+    context.manifest.compact()
+
+
+@when("the manifest is closed")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the manifest is closed."""
+    context.manifest.close()
+
+
+@when("the manifest is loaded and closed")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the manifest is loaded and closed."""
+    context.manifest.load()
+    context.manifest.close()
+
+
+@then("a new manifest loads {files} from {count:d} delta segment")
+def step_impl(context, files, count):  # noqa: F811 # pylint: disable=function-redefined
+    """a new manifest loads {files} from {count:d} delta segment."""
+    _manifest = get_manifest()
+    _manifest.load()
+    assert dict(_manifest.items()) == {
+        _name: entry(_name) for _name in names(files)
+    }, _manifest.items()
+    assert len(context.blobs.segments()) == count, context.blobs.segments()
+
+
+@then("the manifest snapshot holds {files}")
+def step_impl(context, files):  # noqa: F811 # pylint: disable=function-redefined
+    """the manifest snapshot holds {files}."""
+    _snapshot = json.loads(context.blobs.blobs["index/config/manifest.json"])
+    assert sorted(_snapshot["entries"]) == names(files), _snapshot
+
+
+@then("no delta segment is left")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """no delta segment is left."""
+    assert not context.blobs.segments(), context.blobs.segments()
+
+
+@then("the migrated entry of {name} holds its checksum")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the migrated entry of {name} holds its checksum."""
+    assert context.manifest.get(name) == entry(name), context.manifest.get(name)
+
+
+@then("the migrated entry of {name} is kept as is")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the migrated entry of {name} is kept as is."""
+    _snapshot = json.loads(context.blobs.blobs["index/config/manifest.json"])
+    assert _snapshot["entries"][name] == entry(name), _snapshot
@@ -0,0 +1,88 @@
+"""Test Pipeline Steps."""
+
+import threading
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from superagent.pipeline import Pipeline, Stage
+
+
+def get_pipeline(context, parse):
+    """Pipeline of a parse stage and a store stage keeping its items."""
+    context.stored = []
+    _lock = threading.Lock()
+
+    def _store(item):
+        with _lock:
+            context.stored.append(item)
+        return item
+
+    context.pipeline = Pipeline(
+        [
+            Stage("parse", parse, concurrency=2),
+            Stage("store", _store, concurrency=2),
+        ],
+        queue_size=2,
+    )
+
+
+@given("a pipeline whose parse stage fails for odd items")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """a pipeline whose parse stage fails for odd items."""
+
+    def _parse(item):
+        if item % 2:
+            raise ValueError(f"Cannot parse {item}")
+        return item
+
+    get_pipeline(context, _parse)
+
+
+@given("a pipeline whose parse stage drops even items")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """a pipeline whose parse stage drops even items."""
+    get_pipeline(context, lambda item: item if item % 2 else None)
+
+
+@when("the pipeline runs {count:d} items")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """the pipeline runs {count:d} items."""
+    context.metrics = context.pipeline.run(iter(range(count)))
+
+
+@then("the failed items are {items}")
+def step_impl(context, items):  # noqa: F811 # pylint: disable=function-redefined
+    """the failed items are {items}."""
+    _items = [int(_item) for _item in items.replace(" and ", ",").split(",")]
+    assert sorted(context.pipeline.failed_items) == _items, context.pipeline.failed_items
+
+
+@then("no item failed")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """no item failed."""
+    assert context.pipeline.failed_items == [], context.pipeline.failed_items
+
+
+@then("the parse stage processed {processed:d} items and failed {failed:d}")
+def step_impl(context, processed, failed):  # noqa: F811 # pylint: disable=function-redefined
+    """the parse stage processed {processed:d} items and failed {failed:d}."""
+    _metrics = context.metrics["parse"]
+    assert _metrics["processed"] == processed, _metrics
+    assert _metrics["failed"] == failed, _metrics
+
+
+@then("the parse stage processed {processed:d} items and dropped {dropped:d}")
+def step_impl(context, processed, dropped):  # noqa: F811 # pylint: disable=function-redefined
+    """the parse stage processed {processed:d} items and dropped {dropped:d}."""
+    _metrics = context.metrics["parse"]
+    assert _metrics["processed"] == processed, _metrics
+    assert _metrics["dropped"] == dropped, _metrics
+
+
+@then("the store stage received the {parity} items")
+def step_impl(context, parity):  # noqa: F811 # pylint: disable=function-redefined
+    """the store stage received the {parity} items."""
+    _remainder = 0 if parity == "even" else 1
+    assert sorted(context.stored) == [
+        _item for _item in range(10) if _item % 2 == _remainder
+    ], context.stored
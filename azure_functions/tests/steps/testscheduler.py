@@ -0,0 +1,99 @@
+"""Test Crawl Scheduler Steps."""
+
+import multiprocessing
+import time
+from unittest.mock import patch
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from webcrawler.scheduler import CrawlScheduler
+
+
+def values(text):
+    """Values of 'a, b and c'."""
+    return [_value.strip() for _value in text.replace(" and ", ",").split(",")]
+
+
+def run_crawl(config_name, concurrent_requests):
+    """Crawl of a test, its start and end times as its summary."""
+    if config_name == "fail":
+        raise ValueError(f"Cannot crawl {config_name}")
+    _start = time.time()
+    time.sleep(0.5)
+    return {
+        "config_name": config_name,
+        "concurrent_requests": concurrent_requests,
+        "start": _start,
+        "end": time.time(),
+    }
+
+
+@given("a crawl scheduler of {count:d} crawls at once")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """a crawl scheduler of {count:d} crawls at once."""
+    context.scheduler = CrawlScheduler(
+        max_concurrent_crawls=count,
+        concurrent_requests=64,
+    )
+
+
+@when("the crawls {crawls} are scheduled")
+def step_impl(context, crawls):  # noqa: F811 # pylint: disable=function-redefined
+    """the crawls {crawls} are scheduled."""
+    _concurrent_requests = context.scheduler.get_concurrent_requests(
+        len(values(crawls))
+    )
+    _crawls = []
+    for _crawl in values(crawls):
+        _name, _domain = _crawl.split(" on ")
+        _crawls.append(
+            {
+                "name": _name,
+                "domains": {_domain},
+                "kwargs": {
+                    "config_name": _name,
+                    "concurrent_requests": _concurrent_requests,
+                },
+            }
+        )
+    # the target of a step file cannot be imported by a spawned process
+    with patch(
+        "webcrawler.scheduler.multiprocessing",
+        multiprocessing.get_context("fork"),
+    ):
+        context.summaries = context.scheduler.run(run_crawl, _crawls)
+
+
+@then("the crawls {name} and {other_name} did not run at the same time")
+def step_impl(context, name, other_name):  # noqa: F811 # pylint: disable=function-redefined
+    """the crawls {name} and {other_name} did not run at the same time."""
+    _first, _second = sorted(
+        [context.summaries[name], context.summaries[other_name]],
+        key=lambda _summary: _summary["start"],
+    )
+    assert _first["end"] <= _second["start"], (_first, _second)
+
+
+@then("the crawls {name} and {other_name} ran at the same time")
+def step_impl(context, name, other_name):  # noqa: F811 # pylint: disable=function-redefined
+    """the crawls {name} and {other_name} ran at the same time."""
+    _summary = context.summaries[name]
+    _other_summary = context.summaries[other_name]
+    assert _summary["start"] < _other_summary["end"], (_summary, _other_summary)
+    assert _other_summary["start"] < _summary["end"], (_summary, _other_summary)
+
+
+@then("every crawl got {count:d} concurrent requests")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """every crawl got {count:d} concurrent requests."""
+    for _summary in context.summaries.values():
+        assert _summary["concurrent_requests"] == count, _summary
+
+
+@then("the summary of the crawl {name} holds its error")
+def step_impl(context, name):  # noqa: F811 # pylint: disable=function-redefined
+    """the summary of the crawl {name} holds its error."""
+    _summary = context.summaries[name]
+    assert _summary["config_name"] == name, _summary
+    assert _summary["error"] == f"Cannot crawl {name}", _summary
+    assert "ValueError" in _summary["traceback"], _summary
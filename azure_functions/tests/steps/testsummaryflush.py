@@ -0,0 +1,98 @@
+"""Test Summary Flush Steps."""
+
+import json
+import threading
+import time
+from datetime import datetime
+from unittest import mock
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from superagent.manager import SuperAgentManager
+from superagent.summary import Summary
+
+
+def get_names(names):
+    """Names of a step listed as "a, b and c"."""
+    return names.replace(" and ", ", ").split(", ")
+
+
+@given("a super agent manager flushing its summary every {count:d} records")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """a super agent manager flushing its summary every {count:d} records."""
+    context.appends = []
+    context.failures = 0
+
+    def _append(storage_account_url, container_name, blob_path, content):
+        if context.failures:
+            context.failures -= 1
+            raise OSError("Cannot append to the summary log")
+        context.appends.append(content.decode("utf-8"))
+
+    _patcher = mock.patch("superagent.manager.BlobHandler")
+    _blob_handler = _patcher.start()
+    context.add_cleanup(_patcher.stop)
+    _blob_handler.append.side_effect = _append
+
+    _manager = SuperAgentManager.__new__(SuperAgentManager)
+    _manager._logger = mock.MagicMock()
+    _manager.configuration = mock.MagicMock()
+    _manager.configuration.logs.flushsize = count
+    _manager.configuration.logs.flushseconds = 3600
+    _manager.superagent_summary = Summary(config_name="pages")
+    _manager._summary_lock = threading.Lock()
+    _manager._summary_flushed_at = time.monotonic()
+    _manager._summary_container_checked = False
+    context.manager = _manager
+    context.run_start_time = datetime(2024, 1, 1)
+
+
+@given("the summary log cannot be appended to once")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the summary log cannot be appended to once."""
+    context.failures = 1
+
+
+@when("the files {names} are recorded and the summary is flushed")
+def step_impl(context, names):  # noqa: F811 # pylint: disable=function-redefined
+    """the files {names} are recorded and the summary is flushed."""
+    for _name in get_names(names):
+        context.manager.superagent_summary.add("new", _name)
+    context.manager.flush_summary(context.run_start_time)
+
+
+@when("the files {names} are recorded and the last flush fails")
+def step_impl(context, names):  # noqa: F811 # pylint: disable=function-redefined
+    """the files {names} are recorded and the last flush fails."""
+    for _name in get_names(names):
+        context.manager.superagent_summary.add("new", _name)
+    try:
+        context.manager.flush_summary(context.run_start_time, force=True)
+    except OSError:
+        return
+    raise AssertionError("The last flush did not fail")
+
+
+@then("the summary log holds no record")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the summary log holds no record."""
+    assert not context.appends, context.appends
+
+
+@then("the summary log holds the files {names} in {count:d} append")
+def step_impl(context, names, count):  # noqa: F811 # pylint: disable=function-redefined
+    """the summary log holds the files {names} in {count:d} append."""
+    assert len(context.appends) == count, context.appends
+    _files = [
+        json.loads(_line)["file"]
+        for _content in context.appends
+        for _line in _content.splitlines()
+    ]
+    assert _files == get_names(names), _files
+
+
+@then("the summary keeps the files {names}")
+def step_impl(context, names):  # noqa: F811 # pylint: disable=function-redefined
+    """the summary keeps the files {names}."""
+    _files = [_record["file"] for _record in context.manager.superagent_summary.records]
+    assert _files == get_names(names), _files
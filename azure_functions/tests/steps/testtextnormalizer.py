@@ -0,0 +1,55 @@
+"""Test Text Normalizer Steps."""
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+from bs4 import BeautifulSoup
+
+from common.textnormalizer import TextNormalizer, remove_classes
+
+
+def get_text(text):
+    """Text of a step with its escaped line breaks and tabs."""
+    return text.replace("\\n", "\n").replace("\\t", "\t")
+
+
+@given("the text normalizer of the {rules}")
+def step_impl(context, rules):  # noqa: F811 # pylint: disable=function-redefined
+    """the text normalizer of the {rules}."""
+    _rules = rules.replace(" and ", ", ").split(", ")
+    context.normalizer = TextNormalizer.get(*_rules)
+
+
+@then('the text "{text}" is normalized to "{expected}"')
+def step_impl(context, text, expected):  # noqa: F811 # pylint: disable=function-redefined
+    """the text "{text}" is normalized to "{expected}"."""
+    _text = get_text(text)
+    _result = context.normalizer.normalize(_text)
+    assert _result == expected, _result
+    _result = context.normalizer.normalize(_text.encode("utf-8"))
+    assert _result == expected.encode("utf-8"), _result
+
+
+@given("a page with the classes {classes}")
+def step_impl(context, classes):  # noqa: F811 # pylint: disable=function-redefined
+    """a page with the classes {classes}."""
+    _classes = [_class.strip('"') for _class in classes.replace(" and ", ", ").split(", ")]
+    context.soup = BeautifulSoup(
+        "".join(f'<div class="{_class}">text</div>' for _class in _classes),
+        "html.parser",
+    )
+
+
+@when("the classes {classes} are removed from the page")
+def step_impl(context, classes):  # noqa: F811 # pylint: disable=function-redefined
+    """the classes {classes} are removed from the page."""
+    remove_classes(context.soup, classes.replace(" and ", ", ").split(", "))
+
+
+@then("the page tags hold the classes {classes}")
+def step_impl(context, classes):  # noqa: F811 # pylint: disable=function-redefined
+    """the page tags hold the classes {classes}."""
+    _expected = [
+        None if _class == "none" else _class.strip('"').split()
+        for _class in classes.replace(" and ", ", ").split(", ")
+    ]
+    _classes = [_tag.get("class") for _tag in context.soup.find_all("div")]
+    assert _classes == _expected, _classes
@@ -0,0 +1,84 @@
+"""Test URL State Steps."""
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from webcrawler.urlstate import BloomFilter, UrlState
+
+
+def values(text):
+    """Values of 'a, b and c'."""
+    return [_value.strip() for _value in text.replace(" and ", ",").split(",")]
+
+
+@given("a URL state")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """a URL state."""
+    context.url_state = UrlState()
+
+
+@given("a URL state over a Bloom filter of {capacity:d} URLs")
+def step_impl(context, capacity):  # noqa: F811 # pylint: disable=function-redefined
+    """a URL state over a Bloom filter of {capacity:d} URLs."""
+    context.url_state = UrlState(bloom_filter=BloomFilter(capacity=capacity))
+
+
+@when("the URLs {urls} are added to the URL state")
+def step_impl(context, urls):  # noqa: F811 # pylint: disable=function-redefined
+    """the URLs {urls} are added to the URL state."""
+    context.added = [context.url_state.add(_url) for _url in values(urls)]
+
+
+@then("the URL state adds {count:d} of them and lists {urls}")
+def step_impl(context, count, urls):  # noqa: F811 # pylint: disable=function-redefined
+    """the URL state adds {count:d} of them and lists {urls}."""
+    assert context.added.count(True) == count, context.added
+    assert len(context.url_state) == count
+    _urls = [] if urls == "nothing" else values(urls)
+    assert context.url_state.to_list() == _urls, context.url_state.to_list()
+
+
+@then("the URL state holds {url} but not {other_url}")
+def step_impl(context, url, other_url):  # noqa: F811 # pylint: disable=function-redefined
+    """the URL state holds {url} but not {other_url}."""
+    assert url in context.url_state
+    assert other_url not in context.url_state
+
+
+@given("a Bloom filter of {capacity:d} URLs with a false positive rate of {rate:g}")
+def step_impl(context, capacity, rate):  # noqa: F811 # pylint: disable=function-redefined
+    """a Bloom filter of {capacity:d} URLs with a false positive rate of {rate:g}."""
+    context.bloom_filter = BloomFilter(capacity=capacity, error_rate=rate)
+
+
+@when("{count:d} URLs are added to the Bloom filter")
+def step_impl(context, count):  # noqa: F811 # pylint: disable=function-redefined
+    """{count:d} URLs are added to the Bloom filter."""
+    context.urls = [f"https://site/{_index}.html" for _index in range(count)]
+    for _url in context.urls:
+        context.bloom_filter.add(_url)
+
+
+@then("the Bloom filter holds all of them")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the Bloom filter holds all of them."""
+    assert all(_url in context.bloom_filter for _url in context.urls)
+
+
+@then("less than {percent:d} percent of {count:d} other URLs are in the Bloom filter")
+def step_impl(context, percent, count):  # noqa: F811 # pylint: disable=function-redefined
+    """less than {percent:d} percent of {count:d} other URLs are in the Bloom filter."""
+    _false_positives = sum(
+        f"https://other/{_index}.html" in context.bloom_filter
+        for _index in range(count)
+    )
+    assert _false_positives < count * percent / 100, _false_positives
+
+
+@then("a Bloom filter with a false positive rate of {rate:g} is refused")
+def step_impl(context, rate):  # noqa: F811 # pylint: disable=function-redefined
+    """a Bloom filter with a false positive rate of {rate:g} is refused."""
+    try:
+        BloomFilter(error_rate=rate)
+    except ValueError:
+        return
+    raise AssertionError(f"False positive rate {rate} was accepted")
@@ -0,0 +1,63 @@
+"""Test Validators Steps."""
+
+import os
+import tempfile
+
+from behave import given, when, then  # pylint: disable=no-name-in-module
+
+from webcrawler.validators import ValidatorStore
+
+
+@given("a validator store of a previous crawl")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """a validator store of a previous crawl."""
+    _folder = tempfile.TemporaryDirectory()
+    context.add_cleanup(_folder.cleanup)
+    context.validators_path = os.path.join(_folder.name, "validators.sqlite")
+    context.validator_store = ValidatorStore(
+        config_name="config",
+        path=context.validators_path,
+    )
+    context.validator_store.load()
+
+
+@when("the validators of {url} are recorded")
+def step_impl(context, url):  # noqa: F811 # pylint: disable=function-redefined
+    """the validators of {url} are recorded."""
+    context.validator_store.set(
+        url,
+        etag='"etag"',
+        last_modified="Wed, 21 Oct 2015 07:28:00 GMT",
+        checksum="checksum",
+        links=["https://site/b.html"],
+    )
+    assert context.validator_store.get(url)["links"] == ["https://site/b.html"]
+
+
+@when("the validator store is saved")
+def step_impl(context):  # noqa: F811 # pylint: disable=function-redefined
+    """the validator store is saved."""
+    context.validator_store.save()
+
+
+@then("the next crawl sends the conditional headers of {url}")
+def step_impl(context, url):  # noqa: F811 # pylint: disable=function-redefined
+    """the next crawl sends the conditional headers of {url}."""
+    _validator_store = ValidatorStore(
+        config_name="config",
+        path=context.validators_path,
+    )
+    _validator_store.load()
+    context.add_cleanup(_validator_store.save)
+    context.next_validator_store = _validator_store
+    assert _validator_store.get_headers(url) == {
+        "If-None-Match": '"etag"',
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }, _validator_store.get_headers(url)
+    assert _validator_store.get(url)["links"] == ["https://site/b.html"]
+
+
+@then("the next crawl sends no conditional header for {url}")
+def step_impl(context, url):  # noqa: F811 # pylint: disable=function-redefined
+    """the next crawl sends no conditional header for {url}."""
+    assert context.next_validator_store.get_headers(url) == {}
@@ -0,0 +1,21 @@
+Feature: Test Stored Checksums
+
+  Scenario: Skip the chunks whose prefetched checksum is unchanged
+    Given a crawler manager whose site.com chunks were stored before
+    When the crawler manager stores the same page of site.com
+    Then no chunk is uploaded
+    And no chunk properties are read
+
+  Scenario: Upload the chunks whose prefetched checksum changed
+    Given a crawler manager whose site.com chunks were stored before
+    When the crawler manager stores a changed page of site.com
+    Then 1 chunk is uploaded
+    And no chunk properties are read
+    And the page is recorded as updated
+
+  Scenario: Read the checksum of a chunk missing from the listing once
+    Given a crawler manager whose site.com chunks were stored before
+    When the crawler manager stores a new page of site.com twice
+    Then 1 chunk is uploaded
+    And the chunk properties are read once
+    And the page is recorded as new
@@ -0,0 +1,35 @@
+Feature: Test Chunk Store
+
+  Scenario: Hash the chunks by their normalized text alone
+    Given the chunk text "Hello  world"
+    Then it has the key of the chunk text "Hello world"
+    And it has another key than the chunk text "Hello world!"
+
+  Scenario: Write a chunk shared by two files once
+    Given a chunk store over a manifest without chunks
+    When file a claims the chunks 1 and 2
+    And file b claims the chunks 2 and 3
+    Then file a writes the chunks 1 and 2
+    And file b writes the chunk 3 and waits for 1 chunk
+    When the chunk 2 is written
+    Then file b stops waiting
+    When the chunk 1 is written
+    Then file c claims nothing for the chunks 1 and 2
+
+  Scenario: Collect the chunks no file references
+    Given a chunk store over a manifest where file a has the chunks 1 and 2
+    When file a is stored again with the chunks 2 and 3
+    Then the chunk store collects the chunk 1
+
+  Scenario: Write again the chunks of an older key version
+    Given a chunk store over a manifest where file a has the outdated chunks 1 and 2
+    Then another file writes the chunks 1 and 2 again
+
+  Scenario: Store a section shared by two pages once
+    Given an ingester storing deduplicated chunks
+    When the ingester stores page-a.aspx with the sections intro and prices
+    And the ingester stores page-b.aspx with the sections intro and contact
+    Then 3 chunk blobs are written
+    And the chunk blob of intro has no metadata
+    And the record of page-b lists intro and contact with the metadata of page-b.aspx
+    And the summary reports 1 duplicate chunk of 4 across files
@@ -0,0 +1,26 @@
+Feature: Test Config Cache
+
+  Scenario: Share the download of a configuration between its readers
+    Given a configuration blob "pages.yaml"
+    When the configuration is read as YAML
+    And the configuration is read as its names
+    Then the configuration was downloaded 1 time
+    And the cache served 1 hit
+
+  Scenario: Keep the configuration while its blob does not change
+    Given a configuration blob "pages.yaml"
+    And configurations are checked on every read
+    When the configuration is read as YAML
+    And the configuration is read as YAML again
+    Then the configuration was downloaded 1 time
+    And the blob was not modified 1 time
+    And the same configuration was returned
+
+  Scenario: Read the configuration again once its blob changed
+    Given a configuration blob "pages.yaml"
+    And configurations are checked on every read
+    When the configuration is read as YAML
+    And the configuration blob changes
+    And the configuration is read as YAML again
+    Then the configuration was downloaded 2 times
+    And the configuration read last is the changed one
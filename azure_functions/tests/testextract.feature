@@ -0,0 +1,14 @@
+Feature: Test Extract
+
+  Scenario: Save the summary and go on when closing an ingestion fails
+    Given the configs a, b and c where closing the ingestion of a fails
+    When the super agent extracts the configs
+    Then the configs a, b and c were closed
+    And the summary of the configs a, b and c was saved
+    And the summary of a was closed by an error
+
+  Scenario: Go on with the next config when one cannot start
+    Given the configs a, b and c where the manager of b cannot start
+    When the super agent extracts the configs
+    Then the configs a and c were closed
+    And the summary of the configs a and c was saved
@@ -0,0 +1,19 @@
+Feature: Test Index Writer
+
+  Scenario: Retry only the documents that failed with a transient status
+    Given a search index answering 503 for the documents 2 and 5 once
+    When the index writer uploads 6 documents
+    Then the search index received the requests 1-6 then 2 and 5
+    And the index writer uploaded 6 documents and failed 0
+
+  Scenario: Give up the documents that failed with another status
+    Given a search index answering 400 for the documents 3 once
+    When the index writer uploads 4 documents
+    Then the search index received the requests 1-4
+    And the index writer uploaded 3 documents and failed 1
+
+  Scenario: Split the batches too large for one request
+    Given a search index refusing requests of more than 2 documents
+    When the index writer uploads 5 documents
+    Then the search index received the requests 1-5 then 1-2 then 3-5 then 3 then 4-5
+    And the index writer uploaded 5 documents and failed 0
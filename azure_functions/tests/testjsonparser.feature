@@ -0,0 +1,28 @@
+Feature: Test JSON Parser
+
+  Scenario: Stream the index data a window at a time
+    Given the JSON parser reads windows of 64 characters in blocks of 16 bytes
+    And a JSON export whose index data has 40 lines
+    When the JSON parser reads the export
+    Then the index data is read in more than 10 pieces of at most 80 characters
+    And the pieces join into the index data
+    And the fields of the export are kept
+
+  Scenario: Fall back to the serialized export without index data
+    Given the JSON parser reads windows of 64 characters in blocks of 16 bytes
+    And a JSON export without index data
+    When the JSON parser reads the export
+    Then no index data is read
+    And the dump holds the serialized export
+
+  Scenario: Read the values split across blocks
+    Given the JSON parser reads windows of 64 characters in blocks of 1 bytes
+    And a JSON export without index data
+    When the JSON parser reads the export
+    Then the dump holds the serialized export
+
+  Scenario: Report the size of the export parsed in the calling process
+    Given a JSON export whose index data has 40 lines
+    When the export is parsed
+    Then the result holds the chunks of the export and its size
+    And the peak memory is not measured
@@ -0,0 +1,28 @@
+Feature: Test Listing
+
+  Scenario: Resume the listing of an interrupted run from its checkpoint
+    Given the documents a, b, c, d, e and f listed 2 per page
+    When a run hands out 5 files and stops
+    Then the listing checkpoint resumes from the page of c
+    When the next run lists the documents
+    Then the run hands out the files c, d, e and f
+
+  Scenario: List only the documents changed since the last complete listing
+    Given the documents a, b, c, d, e and f listed 2 per page with a watermark
+    When a run lists the documents and completes
+    And the document d changes
+    And the next run lists the documents
+    Then the run hands out the files d
+
+  Scenario: Keep the watermark when files of a complete listing failed
+    Given the documents a, b, c, d, e and f listed 2 per page with a watermark
+    When a run lists the documents and the file b fails
+    And the next run lists the documents
+    Then the run hands out the files a, b, c, d, e and f
+
+  Scenario: Hand out the pending files first after the time budget ran out
+    Given the documents a, b, c, d, e and f listed 2 per page
+    When a run hands out 3 files, the file b fails and the time budget runs out
+    Then the run was stopped by the time budget
+    When the next run lists the documents
+    Then the run hands out the files b, d, e and f
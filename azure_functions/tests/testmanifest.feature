@@ -0,0 +1,29 @@
+Feature: Test Manifest
+
+  Scenario: Replay the flushed changes of the manifest
+    Given a manifest over an empty index storage
+    When the manifest records a, b and c then removes a and flushes
+    Then a new manifest loads b and c from 1 delta segment
+
+  Scenario: Compact the delta segments of the manifest
+    Given a manifest over an empty index storage
+    When the manifest records a, b and c then removes a and flushes
+    And the manifest flushes after recording d
+    And the manifest is compacted
+    Then the manifest snapshot holds b, c and d
+    And no delta segment is left
+    And a new manifest loads b, c and d from 0 delta segment
+
+  Scenario: Keep the changes made while the manifest is compacted
+    Given a manifest over an empty index storage
+    When the manifest records a, b and c then removes a and flushes
+    And the manifest records d while the snapshot is uploaded
+    And the manifest is closed
+    Then a new manifest loads b, c and d from 1 delta segment
+
+  Scenario: Migrate the yaml index to the manifest
+    Given a manifest over a yaml index with a and b
+    When the manifest is loaded and closed
+    Then the manifest snapshot holds a and b
+    And the migrated entry of a holds its checksum
+    And the migrated entry of b is kept as is
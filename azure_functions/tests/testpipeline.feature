@@ -0,0 +1,15 @@
+Feature: Test Pipeline
+
+  Scenario: Collect the items a stage failed for
+    Given a pipeline whose parse stage fails for odd items
+    When the pipeline runs 10 items
+    Then the failed items are 1, 3, 5, 7 and 9
+    And the parse stage processed 5 items and failed 5
+    And the store stage received the even items
+
+  Scenario: Drop the items a stage has nothing left to do for
+    Given a pipeline whose parse stage drops even items
+    When the pipeline runs 10 items
+    Then no item failed
+    And the parse stage processed 5 items and dropped 5
+    And the store stage received the odd items
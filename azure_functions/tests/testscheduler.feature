@@ -0,0 +1,13 @@
+Feature: Test Crawl Scheduler
+
+  Scenario: Never crawl a domain from two crawls at once
+    Given a crawl scheduler of 3 crawls at once
+    When the crawls a on x.com, b on x.com and c on y.com are scheduled
+    Then the crawls a and b did not run at the same time
+    And the crawls a and c ran at the same time
+    And every crawl got 21 concurrent requests
+
+  Scenario: Report the crawls that failed
+    Given a crawl scheduler of 3 crawls at once
+    When the crawls a on x.com and fail on y.com are scheduled
+    Then the summary of the crawl fail holds its error
@@ -0,0 +1,23 @@
+Feature: Test Summary Flush
+
+  Scenario: Append the records once the flush size is reached
+    Given a super agent manager flushing its summary every 2 records
+    When the files a are recorded and the summary is flushed
+    Then the summary log holds no record
+    When the files b and c are recorded and the summary is flushed
+    Then the summary log holds the files a, b and c in 1 append
+
+  Scenario: Keep the records for the next flush when appending fails
+    Given a super agent manager flushing its summary every 2 records
+    And the summary log cannot be appended to once
+    When the files a and b are recorded and the summary is flushed
+    Then the summary log holds no record
+    And the summary keeps the files a and b
+    When the files c are recorded and the summary is flushed
+    Then the summary log holds the files a, b and c in 1 append
+
+  Scenario: Raise when the last flush fails
+    Given a super agent manager flushing its summary every 2 records
+    And the summary log cannot be appended to once
+    When the files a are recorded and the last flush fails
+    Then the summary keeps the files a
@@ -0,0 +1,18 @@
+Feature: Test Text Normalizer
+
+  Scenario: Remove the line breaks and tabs before the dates and times
+    Given the text normalizer of the controls, dates and times
+    Then the text "Version\t2023-01-01 ok" is normalized to "Version2023-01-01 ok"
+    And the text "2023-09-\n29 x" is normalized to "x"
+    And the text "a\n12:34 x" is normalized to "a12:34 x"
+    And the text "at 12:34 2023-09-29 ok" is normalized to "at   ok"
+
+  Scenario: Collapse the whitespace left by the removed dates
+    Given the text normalizer of the tags, controls, dates and whitespace
+    Then the text "<b>a</b> \n 2023-01-01  b" is normalized to "a b"
+    And the text "<p>2023<br>-01-01</p> b" is normalized to "b"
+
+  Scenario: Remove the boilerplate classes of a page
+    Given a page with the classes "nav body", "nav" and "body"
+    When the classes nav and footer are removed from the page
+    Then the page tags hold the classes "body", none and "body"
@@ -0,0 +1,22 @@
+Feature: Test URL State
+
+  Scenario: Keep the URLs of a crawl once and in order
+    Given a URL state
+    When the URLs b, a, b and c are added to the URL state
+    Then the URL state adds 3 of them and lists b, a and c
+    And the URL state holds a but not d
+
+  Scenario: Keep the URLs of a crawl in a Bloom filter
+    Given a URL state over a Bloom filter of 1000 URLs
+    When the URLs b, a, b and c are added to the URL state
+    Then the URL state adds 3 of them and lists nothing
+    And the URL state holds a but not d
+
+  Scenario: Bound the false positives of the Bloom filter
+    Given a Bloom filter of 5000 URLs with a false positive rate of 0.01
+    When 5000 URLs are added to the Bloom filter
+    Then the Bloom filter holds all of them
+    And less than 2 percent of 5000 other URLs are in the Bloom filter
+
+  Scenario: Refuse a Bloom filter false positive rate out of range
+    Then a Bloom filter with a false positive rate of 1.5 is refused
@@ -0,0 +1,8 @@
+Feature: Test Validators
+
+  Scenario: Keep the validators of a crawl for the next one
+    Given a validator store of a previous crawl
+    When the validators of https://site/a.html are recorded
+    And the validator store is saved
+    Then the next crawl sends the conditional headers of https://site/a.html
+    And the next crawl sends no conditional header for https://site/b.html
@@ -4,13 +4,13 @@
 import os
 import json
 import logging
-import multiprocessing
 from datetime import datetime
 
 from azure.core.exceptions import ResourceNotFoundError
 
-from webcrawler.config import ConfigurationHandler
+from webcrawler.config import ConfigurationHandler, get_domains
 from webcrawler.manager import WebCrawlerManager
+from webcrawler.scheduler import CrawlScheduler
 
 
 class WebCrawler:
@@ -25,57 +25,89 @@ class WebCrawler:
     def crawl(self):
         _config_names = ConfigurationHandler().get_config_names()
         _run_start_time = datetime.utcnow()
-        for _config in _config_names:
-            _name = _config["name"]
-            _schedule = _config["schedule"]
-            # Update the environment variable CRAWLER_RUN_SCHEDULE
-            os.environ["CRAWLER_RUN_SCHEDULE"] = _schedule            
-            self._process(config_name=_name, run_start_time=_run_start_time)
-                
+        self._process(
+            configs=_config_names,
+            run_start_time=_run_start_time,
+        )
+
     def prioritycrawl(self):
         _priority_config, _priority_config_name = ConfigurationHandler().get_priority_config()
         _run_start_time = datetime.utcnow()
         if _priority_config and _priority_config.documents.urls:
-            self._process(config_name=_priority_config_name, run_start_time=_run_start_time)
+            self._process(
+                configs=[{"name": _priority_config_name, "schedule": None}],
+                run_start_time=_run_start_time,
+            )
             ConfigurationHandler().delete_urls(_priority_config_name)
-              
 
-    def _process(
+    def _get_domains(
         self,
         config_name: str,
+    ):
+        try:
+            return get_domains(ConfigurationHandler().load(config_name))
+        except Exception as e:  # pylint: disable=broad-except
+            # the crawl reports the error, it shares no domain meanwhile
+            self._logger.warning(
+                "Could not read the domains of %s: %s",
+                config_name,
+                e,
+            )
+            return set()
+
+    def _process(
+        self,
+        configs: list,
         run_start_time: datetime,
     ):
-        """Run the web crawler in a separate process"""
+        """Run the web crawler of each configuration in a separate process,
+        several at once"""
         _build_id = os.getenv("BUILD_ID", "Local Build")
-        _config_name = config_name
+        _scheduler = CrawlScheduler(logger=self._logger)
+        _concurrent_requests = _scheduler.get_concurrent_requests(len(configs))
 
-        _manager = multiprocessing.Manager()
-        _return_dict = _manager.dict()
+        def _on_done(config_name, crawl_summary):
+            self._logger.info(
+                json.dumps(crawl_summary),
+            )
+            self._logger.info(
+                "Crawl completed for build id %s for %s",
+                _build_id,
+                config_name,
+            )
 
-        p = multiprocessing.Process(
+        _scheduler.run(
             target=self._run_crawler_process,
-            args=(_config_name, run_start_time, _return_dict),
-        )
-        p.start()
-        p.join()  # the script will block here until the crawling is finished
-        p.close()
-
-        _crawl_summary = _return_dict["crawler_summary"]
-        self._logger.info(
-            json.dumps(_crawl_summary),
-        )
-        self._logger.info(
-            "Crawl completed for build id %s for %s",
-            _build_id,
-            config_name,
+            crawls=[
+                {
+                    "name": _config["name"],
+                    "domains": self._get_domains(_config["name"]),
+                    "kwargs": {
+                        "config_name": _config["name"],
+                        "run_start_time": run_start_time,
+                        "schedule": _config["schedule"],
+                        "concurrent_requests": _concurrent_requests,
+                    },
+                }
+                for _config in configs
+            ],
+            on_done=_on_done,
         )
 
     def _run_crawler_process(
         self,
         config_name: str,
         run_start_time: datetime,
-        return_dict: dict,
+        schedule: str = None,
+        concurrent_requests: int = None,
     ):
+        """Crawl a configuration in the current process
+
+        Returns:
+            dict: crawl summary
+        """
+        if schedule:
+            os.environ["CRAWLER_RUN_SCHEDULE"] = schedule
 
         from scrapy.crawler import (
             CrawlerProcess,
@@ -98,6 +130,14 @@ class WebCrawler:
         if _configuration.crawl:
             _scrapy_settings["DEPTH_LIMIT"] = _configuration.crawl.depth
 
+        if concurrent_requests:
+            # share of the global request budget of the scheduler
+            _scrapy_settings["CONCURRENT_REQUESTS"] = concurrent_requests
+            _scrapy_settings["CONCURRENT_REQUESTS_PER_DOMAIN"] = min(
+                concurrent_requests,
+                _scrapy_settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"),
+            )
+
         _scrapy_settings["LOG_LEVEL"] = os.getenv("CRAWLER_LOG_LEVEL", "INFO")
         _install_root_handler = False
         if _scrapy_settings["LOG_LEVEL"] == "DEBUG":
@@ -114,9 +154,11 @@ class WebCrawler:
             install_signal_handlers=False,
         )
         _process.stop()
-        return_dict["crawler_summary"] = _web_crawler_manager.save_summary(
+        _crawler_summary = _web_crawler_manager.save_summary(
             run_start_time=run_start_time,
         )
+        _web_crawler_manager.save_validators()
+        return _crawler_summary
 
     def delete(self):
         try:
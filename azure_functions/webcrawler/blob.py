@@ -1,6 +1,7 @@
-from azure.identity import DefaultAzureCredential
 from azure.storage.blob import BlobServiceClient
 
+from common.credential import CredentialProvider
+
 
 class BlobHandler:
 
@@ -31,7 +32,7 @@ class BlobHandler:
         Returns:
             None
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
         if credential:
             _credential = credential
         _blob_service_client = BlobServiceClient(
@@ -70,7 +71,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
         if credential:
             _credential = credential
 
@@ -104,7 +105,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
         if credential:
             _credential = credential
         _blob_service_client = BlobServiceClient(
@@ -137,7 +138,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
 
         _blob_service_client = BlobServiceClient(
             account_url=storage_account_url,
@@ -168,7 +169,7 @@ class BlobHandler:
         Returns:
             _type_: response
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
 
         _blob_service_client = BlobServiceClient(
             account_url=storage_account_url,
@@ -180,6 +181,40 @@ class BlobHandler:
         _blobs = _container_client.list_blobs(name_starts_with=blob_path)
         return _blobs
 
+    @classmethod
+    def list_metadata(
+        cls,
+        storage_account_url: str,
+        container_name: str,
+        blob_path: str,
+    ):
+        """List blobs with their metadata
+
+        Args:
+            storage_account_url (_type_): storage account url
+            container_name (_type_): container name
+            blob_path (_type_): prefix of the blobs
+
+        Returns:
+            dict: metadata by blob name
+        """
+        _credential = CredentialProvider.get_credential()
+
+        _blob_service_client = BlobServiceClient(
+            account_url=storage_account_url,
+            credential=_credential,
+        )
+        _container_client = _blob_service_client.get_container_client(
+            container=container_name
+        )
+        return {
+            _blob.name: _blob.metadata or {}
+            for _blob in _container_client.list_blobs(
+                name_starts_with=blob_path,
+                include=["metadata"],
+            )
+        }
+
     @classmethod
     def delete(
         cls,
@@ -200,7 +235,7 @@ class BlobHandler:
         Returns:
             None
         """
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
 
         _blob_service_client = BlobServiceClient(
             account_url=storage_account_url,
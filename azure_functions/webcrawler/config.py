@@ -6,10 +6,12 @@ import argparse
 import yaml
 
 from typing import List, Optional
+from urllib.parse import urlparse
 from pydantic import BaseModel
 
 from azure.identity import AzureCliCredential
 
+from common.configcache import ConfigCache
 from webcrawler.blob import BlobHandler
 
 
@@ -30,6 +32,10 @@ class Crawl(BaseModel):
     blacklist: List[str]
     deny_extensions: Optional[List[str]] = None
     invalid_link_prefixes: List[str]
+    # keep the visited URLs in a Bloom filter for very large crawls
+    bloomfilter: Optional[bool] = None
+    expectedurls: Optional[int] = None
+    falsepositiverate: Optional[float] = None
 
 
 class Storage(BaseModel):
@@ -40,7 +46,10 @@ class Storage(BaseModel):
 class Document(BaseModel):
     storage: Optional[Storage]= None
     urls: List[str]
-    
+    # send the validators of the previous crawl and skip unchanged pages
+    conditional: Optional[bool] = None
+
+
 class Logs(BaseModel):
     storage: Storage
 
@@ -60,7 +69,26 @@ class CrawlerConfig(BaseModel):
     logs: Optional[Logs] = None
 
 
+def get_domains(configuration: CrawlerConfig) -> set:
+    """Domains a configuration sends requests to
+
+    Args:
+        configuration (CrawlerConfig): configuration
+
+    Returns:
+        set: domains of the start URLs and the allowed domains of the crawl
+    """
+    _domains = {urlparse(_url).netloc for _url in configuration.documents.urls}
+    if configuration.crawl:
+        _domains.update(configuration.crawl.domains)
+    return _domains
+
+
 # Configuration used within the solution
+def _parse_configuration(content: bytes) -> CrawlerConfig:
+    return CrawlerConfig.model_validate(yaml.safe_load(content)["crawler"])
+
+
 class ConfigurationHandler:
     """Configuration used within the solution"""
 
@@ -99,12 +127,35 @@ class ConfigurationHandler:
         self.configuration_storage_account_url = _storage_account_url
         self.configuration_container_name = _container_name
 
-        BlobHandler.ensure_container_exists(
+        ConfigCache.ensure_container_exists(
             storage_account_url=self.configuration_storage_account_url,
             container_name=self.configuration_container_name,
             credential=self.credential,
         )
-        
+
+    def _get(
+        self,
+        name: str,
+        parse,
+    ):
+        return ConfigCache.get(
+            storage_account_url=self.configuration_storage_account_url,
+            container_name=self.configuration_container_name,
+            blob_path=name,
+            parse=parse,
+            credential=self.credential,
+        )
+
+    def _invalidate(
+        self,
+        name: str,
+    ):
+        ConfigCache.invalidate(
+            storage_account_url=self.configuration_storage_account_url,
+            container_name=self.configuration_container_name,
+            blob_path=name,
+        )
+
     def preprocess_crawlers(self, raw_crawlers: dict) -> CrawlerYamlConfig:
         """Preprocess the raw crawlers input into a CrawlerYamlConfig instance."""
         parsed_crawlers = []
@@ -126,12 +177,7 @@ class ConfigurationHandler:
             "CRAWLER_CONFIG_NAME",
             "crawlers.yaml",
         )
-        _configuration = BlobHandler.download(
-            storage_account_url=self.configuration_storage_account_url,
-            container_name=self.configuration_container_name,
-            blob_path=_crawler_config_name,
-        )
-        _configuration = yaml.safe_load(_configuration)
+        _configuration = self._get(_crawler_config_name, yaml.safe_load)
         # Preprocess raw crawlers into the expected dictionary format
         raw_crawlers = _configuration.get("crawlers", [])
         processed_crawlers = self.preprocess_crawlers(raw_crawlers)
@@ -168,6 +214,7 @@ class ConfigurationHandler:
             content=yaml.dump(_configuration),  # Convert the dict back to
             overwrite=True,
         )
+        self._invalidate(file_name)
 
     def get_priority_config(self):
         """Load the priority configuration file.
@@ -180,15 +227,7 @@ class ConfigurationHandler:
             "priority.yaml",
         )
         
-        _configuration = BlobHandler.download(
-            storage_account_url=self.configuration_storage_account_url,
-            container_name=self.configuration_container_name,
-            blob_path=_priority_config_name,
-        )
-        _configuration = yaml.safe_load(_configuration)
-        validated_priority_config = CrawlerConfig.model_validate(_configuration["crawler"])       
-        
-        
+        validated_priority_config = self._get(_priority_config_name, _parse_configuration)
         return validated_priority_config, _priority_config_name
 
     def get_delete_config(self):
@@ -201,13 +240,7 @@ class ConfigurationHandler:
             "CRAWLER_DELETE_NAME",
             "delete.yaml",
         )
-        _configuration = BlobHandler.download(
-            storage_account_url=self.configuration_storage_account_url,
-            container_name=self.configuration_container_name,
-            blob_path=_delete_config_name,
-        )
-        _configuration = yaml.safe_load(_configuration)
-        return _configuration
+        return self._get(_delete_config_name, yaml.safe_load)
 
     def delete_config(self):
         """Delete configuration
@@ -224,6 +257,7 @@ class ConfigurationHandler:
             container_name=self.configuration_container_name,
             blob_path=_delete_config_name,
         )
+        self._invalidate(_delete_config_name)
 
     def load(
         self,
@@ -237,15 +271,7 @@ class ConfigurationHandler:
         Returns:
             object: configuration
         """
-        _configuration = BlobHandler.download(
-            storage_account_url=self.configuration_storage_account_url,
-            container_name=self.configuration_container_name,
-            blob_path=name,
-        )
-        _configuration = yaml.safe_load(_configuration)
-        _validated_configuration = CrawlerConfig.model_validate(
-                _configuration["crawler"]
-        return _validated_configuration
+        return self._get(name, _parse_configuration)
 
     def save(
         self,
@@ -276,6 +302,7 @@ class ConfigurationHandler:
             overwrite=True,
             credential=self.credential,
         )
+        self._invalidate(name)
 
     def _load_local(self, name: str):
         """Load configuration from local file
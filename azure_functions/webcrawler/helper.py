@@ -36,11 +36,8 @@ class WebCrawlerHelper:
             ):
                 _parsed_url = self._parse_url(full_url)
 
-                # Check if the link belongs to the same domain
-                if _parsed_url not in self.crawler_summary.visited_urls:
-                    self.crawler_summary.visited_urls.append(
-                        _parsed_url
-                    )  # Mark as visited:
+                # Mark as visited, follow it only the first time
+                if self.crawler_summary.visited_urls.add(_parsed_url):
                     _return_list.append(Link(url=_parsed_url))
         return _return_list
 
@@ -101,6 +98,5 @@ class WebCrawlerHelper:
         if urlparse(value).netloc not in self.configuration.crawl.domains:
             return None
         _value = self._parse_url(_value)
-        if _value not in self.crawler_summary.visited_urls:
-            self.crawler_summary.visited_urls.append(_value)
+        self.crawler_summary.visited_urls.add(_value)
         return _value
@@ -11,11 +11,11 @@ from urllib.parse import urlparse
 
 from azure.core.exceptions import ResourceNotFoundError
 
-from azure.identity import DefaultAzureCredential
-
-from webcrawler.config import ConfigurationHandler, CrawlerConfig
+from common.credential import CredentialProvider
+from webcrawler.config import ConfigurationHandler, CrawlerConfig, get_domains
 from webcrawler.blob import BlobHandler
 from webcrawler.summary import CrawlerSummary
+from webcrawler.validators import ValidatorStore
 
 
 class WebCrawlerManager:
@@ -36,10 +36,33 @@ class WebCrawlerManager:
 
         self._initalize_documents_store()
 
+        # checksum metadata of the stored chunks by blob path
+        self.checksums: dict[str, str] = {}
+
         self.crawler_summary: CrawlerSummary = CrawlerSummary(
-            config_name=self.config_name
+            config_name=self.config_name,
+            crawl=self.configuration.crawl,
         )
 
+        # validators of the previous crawl for conditional requests
+        self.validator_store = None
+        if self.configuration.documents.conditional:
+            self.validator_store = ValidatorStore(
+                config_name=self.config_name,
+                storage_account_url=(
+                    self.configuration.logs.storage.account
+                    if self.configuration.logs
+                    else None
+                ),
+                container_name=(
+                    self.configuration.logs.storage.container
+                    if self.configuration.logs
+                    else None
+                ),
+                logger=self._logger,
+            )
+            self.validator_store.load()
+
     def _initalize_documents_store(
         self,
     ):
@@ -53,6 +76,29 @@ class WebCrawlerManager:
             container_name=self.documents_container_name,
         )
 
+    def prefetch_checksums(
+        self,
+    ):
+        """List the checksums of the stored chunks of every crawled domain
+        once, so that unchanged chunks cost no request"""
+        for _domain in sorted(get_domains(self.configuration)):
+            _prefix = f"{_domain}/"
+            try:
+                _metadata = BlobHandler.list_metadata(
+                    storage_account_url=self.documents_storage_account_url,
+                    container_name=self.documents_container_name,
+                    blob_path=_prefix,
+                )
+            except ResourceNotFoundError:
+                continue
+            for _name, _blob_metadata in _metadata.items():
+                self.checksums[_name] = _blob_metadata.get("checksum")
+        self._logger.debug(
+            "Prefetched %d checksums for %s",
+            len(self.checksums),
+            self.config_name,
+        )
+
     def store_in_blob(
         self,
         url: str,
@@ -118,6 +164,7 @@ class WebCrawlerManager:
                 metadata=_metadata,
                 overwrite=True,
             )
+            self.checksums[_blob_path] = _checksum
         else:
             self._logger.debug("Content is unchanged for %s.", _blob_path)
 
@@ -144,39 +191,37 @@ class WebCrawlerManager:
         return _blob_path
 
     def _is_same_content(self, checksum: str, blob_path: str):
-        """check if the content is same
+        """check if the content is same from the checksum metadata of the
+        stored blob, prefetched or read from its properties
 
         Args:
             checksum (_type_): checksum
-            content (_type_): content
+            blob_path (_type_): blob path
 
         Raises:
             Exception: exception in case of failure
 
         Returns:
-            bool: response
+            bool: response, None when the blob does not exist
         """
+        if blob_path in self.checksums:
+            _blob_checksum = self.checksums[blob_path]
+        else:
+            try:
+                _properties = BlobHandler.get_properties(
+                    storage_account_url=self.documents_storage_account_url,
+                    container_name=self.documents_container_name,
+                    blob_path=blob_path,
+                )
+            except ResourceNotFoundError:
+                return None
+            _blob_checksum = (_properties.metadata or {}).get("checksum")
+            self.checksums[blob_path] = _blob_checksum
 
-        try:
-            _blob_data = BlobHandler.download(
-                storage_account_url=self.documents_storage_account_url,
-                container_name=self.documents_container_name,
-                blob_path=blob_path,
-            )
-            _blob_checksum = hashlib.md5(
-                _blob_data,
-                usedforsecurity=False,
-            ).hexdigest()
-
-            self._logger.debug("Incoming chunk checksum is  %s", checksum)
-            self._logger.debug("Stored chunk checksum is  %s", _blob_checksum)
+        self._logger.debug("Incoming chunk checksum is  %s", checksum)
+        self._logger.debug("Stored chunk checksum is  %s", _blob_checksum)
 
-            if checksum == _blob_checksum:
-                return True
-            else:
-                return False
-        except ResourceNotFoundError:
-            return None
+        return checksum == _blob_checksum
 
     def delete_files(self, urls: list):
         """Delete files
@@ -249,7 +294,7 @@ class WebCrawlerManager:
         """
         from azure.storage.blob import BlobServiceClient
 
-        _credential = DefaultAzureCredential()
+        _credential = CredentialProvider.get_credential()
 
         _blob_service_client = BlobServiceClient(
             account_url=storage_account_url,
@@ -265,6 +310,11 @@ class WebCrawlerManager:
         _blob_metadata.update(_more_blob_metadata)
         _blob_client.set_blob_metadata(metadata=_blob_metadata)
 
+    def save_validators(self):
+        """Keep the validators of this crawl for the next one"""
+        if self.validator_store is not None:
+            self.validator_store.save()
+
     def tidy_up(self, download_folder: str):
         """Tidy up the resources"""
         shutil.rmtree(download_folder, ignore_errors=True)
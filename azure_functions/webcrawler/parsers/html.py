@@ -1,11 +1,21 @@
 """HTML Parser for crawler."""
 
-import re
+import logging
 
 import base64
 from bs4 import BeautifulSoup
 from langchain.text_splitter import MarkdownTextSplitter
-from webcrawler.config import CrawlerConfig
+from common.parseexecutor import ParseExecutor
+from common.textnormalizer import TextNormalizer, remove_classes
+from webcrawler.config import CrawlerConfig, Html
+
+_PAGE_TEXT = TextNormalizer.get("controls", "dates", "times")
+
+
+def parse_html(content, html: Html):
+    """Parse an HTML page into chunks and metadata, run by the parse executor"""
+    _html_parser = HtmlParser(html=html, logger=logging.getLogger(__name__))
+    return _html_parser.clean_html(content)
 
 
 class HtmlParser:
@@ -15,6 +25,7 @@ class HtmlParser:
 
     def __init__(self, *args, **kwargs):
         self.configuration: CrawlerConfig = kwargs.get("configuration")
+        self.html: Html = kwargs.get("html") or self.configuration.html
         self._logger = kwargs.get("logger")
 
     @classmethod
@@ -25,16 +36,22 @@ class HtmlParser:
         # Store the content in Azure Blob Storage
         _web_crawler_manager = kwargs.get("web_crawler_manager")
         _response = kwargs.get("response")
-        _logger = kwargs.get("logger")
-        _html_parser = HtmlParser(
-            configuration=_web_crawler_manager.configuration,
-            logger=_logger,
+        _url = kwargs.get("url")
+        _text = kwargs.get("text")
+        _content_type = kwargs.get("content_type")
+        if _response is not None:
+            _url = _response.url
+            _text = _response.text
+            _content_type = _response.headers.get("Content-Type").decode("utf-8")
+        _contents = ParseExecutor.get().parse(
+            "webcrawler.parsers.html.parse_html",
+            _text,
+            html=_web_crawler_manager.configuration.html,
         )
-        _contents = _html_parser.clean_html(_response.text)
         _web_crawler_manager.store_in_blob(
-            url=_response.url,
+            url=_url,
             contents=_contents,
-            content_type=_response.headers.get("Content-Type").decode("utf-8"),
+            content_type=_content_type,
         )
 
     def clean_html(self, content: str):
@@ -54,7 +71,7 @@ class HtmlParser:
         _page_title = soup.title.string if soup.title else "No Title"
 
         # Extract text content from the page
-        if self.configuration.html.striptags:
+        if self.html.striptags:
             _page_text = self._clean_text(soup)
         else:
             _page_text = content
@@ -86,35 +103,12 @@ class HtmlParser:
         Returns:
             str: The cleaned text.
         """
-        # Get the list of CSS classes to remove from the config
-        classes_to_remove = self.configuration.html.parser.ignored_classes
-
-        # Iterate over all tags and remove specific classes
-        for tag in soup.find_all(True):  # finds all HTML tags
-            if "class" in tag.attrs:
-                # Filter out the specific classes from the class list
-                tag["class"] = [
-                    cls for cls in tag["class"] if cls not in classes_to_remove
-                ]
-
-                # If the class attribute is now empty, remove it completely
-                if not tag["class"]:
-                    tag.attrs.pop("class")
-
-        # Serialize the modified HTML back to a string
-        page_text = re.sub(r"[\n\r\t]", "", soup.get_text()).strip()
-
-        # Remove common date formats (e.g., YYYY-MM-DD, MM/DD/YYYY, etc.)
-        content = re.sub(
-            r"\b\d{4}[-/]\d{2}[-/]\d{2}\b", "", page_text
-        )  # e.g., '2023-09-29' or '09/29/2023'
-
-        # Remove common time formats (e.g., HH:MM:SS, HH:MM AM/PM, etc.)
-        content = re.sub(
-            r"\b\d{1,2}:\d{2}(?::\d{2})?\s?(AM|PM|am|pm)?\b", "", page_text
-        )  # e.g., 12:34 PM or 12:34:56
-
-        return content
+        # Remove the CSS classes listed in the config from the tags
+        remove_classes(soup, self.html.parser.ignored_classes)
+
+        # Remove the line breaks and tabs, then the dates (e.g. 2023-09-29)
+        # and the times (e.g. 12:34 PM or 12:34:56)
+        return _PAGE_TEXT.normalize(soup.get_text())
 
     def custom_markdown_chunking(self, content):
         """
@@ -1,16 +1,82 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 from scrapy.pipelines.files import FilesPipeline
 from scrapy.exceptions import DropItem
 
+from common.parseexecutor import ParseExecutor
+
+from webcrawler.parsers.html import HtmlParser
 from webcrawler.parsers.pdf import PdfParser
 from webcrawler.parsers.text import TextParser
-from webcrawler.parsers.html import HtmlParser
+
+PAGE_STORE_CONCURRENCY = 16
+
+
+class PageStorePipeline:
+    """Parses and stores the HTML pages of the spider on a bounded thread
+    pool, so the reactor keeps downloading while the pages are stored.
+
+    Scrapy only releases a response once its items went through the
+    pipelines, so slow storage holds back new downloads instead of
+    queueing pages without limit.
+    """
+
+    def open_spider(self, spider):
+        self._executor = ThreadPoolExecutor(
+            max_workers=spider.settings.getint(
+                "PAGE_STORE_CONCURRENCY",
+                PAGE_STORE_CONCURRENCY,
+            ),
+            thread_name_prefix="crawler-store",
+        )
+
+    def close_spider(self, spider):
+        self._executor.shutdown(wait=True)
+
+    async def process_item(self, item, spider):
+        if "page_url" not in item:
+            return item
+        await asyncio.wrap_future(self._executor.submit(self._store, item))
+        return item
+
+    def _store(self, item):
+        _web_crawler_manager = item["web_crawler_manager"]
+        _crawler_summary = _web_crawler_manager.crawler_summary
+        _url = item["page_url"]
+        try:
+            HtmlParser.store_html(
+                web_crawler_manager=_web_crawler_manager,
+                url=_url,
+                text=item.pop("text"),
+                content_type=item["content_type"],
+            )
+        except Exception as e:
+            item["logger"].error("Failed to store %s: %s", _url, e)
+            _crawler_summary.failure_pages.add(
+                _url,
+                {
+                    "url": _url,
+                    "code": "StoreFailed",
+                },
+            )
+            return
+        _crawler_summary.success_pages.add(_url)
+        if item.get("validators"):
+            _web_crawler_manager.validator_store.set(
+                _url,
+                links=item["links"],
+                **item["validators"],
+            )
 
 
 class CrawlerFilePipeline(FilesPipeline):
 
     def process_item(self, item, spider):
+        if "file_urls" not in item:
+            # pages are stored by the page store pipeline
+            return item
         if os.getenv("STORE_DOWNLOADS_LOCALLY", "True") == "True":
             # this is the default behaviour unless overridden
             return super().process_item(item, spider)
@@ -18,8 +84,7 @@ class CrawlerFilePipeline(FilesPipeline):
             # when testing locally we don't want to download the files
             # so we capture the URLs and return the item
             _url = item["file_urls"][0]
-            if _url not in spider.crawler_summary.success_pages:
-                spider.crawler_summary.success_pages.append(_url)
+            spider.crawler_summary.success_pages.add(_url)
             return item
 
     def item_completed(self, results, item, info):
@@ -52,11 +117,11 @@ class CrawlerFilePipeline(FilesPipeline):
                     )
                 elif "text/html" in _content_type:
                     # if the file is a HTML file, use the HTML parser
-                    _html_parser = HtmlParser(
-                        configuration=_configuration,
-                        logger=_logger,
+                    _contents = ParseExecutor.get().parse(
+                        "webcrawler.parsers.html.parse_html",
+                        _content,
+                        html=_configuration.html,
                     )
-                    _contents = _html_parser.clean_html(_content)
                     _web_crawler_manager.store_in_blob(
                         url=file_info["url"],
                         contents=_contents,
@@ -82,17 +147,17 @@ class CrawlerFilePipeline(FilesPipeline):
                             "content": _content,
                         }
                     ]
-            if (
+            if not _web_crawler_manager.crawler_summary.success_pages.add(
                 file_info["url"]
-                not in _web_crawler_manager.crawler_summary.success_pages
             ):
-                _web_crawler_manager.crawler_summary.success_pages.append(
-                    file_info["url"]
-                )
-            else:
                 _logger.error("File download failed: %s", file_info)
-                _web_crawler_manager.crawler_summary.failure_pages.append(
+                _web_crawler_manager.crawler_summary.failure_pages.add(
                     file_info["url"]
                 )
                 raise DropItem("File download failed")
+            if success and item.get("validators"):
+                _web_crawler_manager.validator_store.set(
+                    file_info["url"],
+                    **item["validators"],
+                )
         return item
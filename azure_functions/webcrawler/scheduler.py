@@ -0,0 +1,155 @@
+"""Scheduler running the crawls of several configurations at once.
+
+Each crawl still runs in a process of its own, since the Twisted reactor
+of Scrapy cannot be restarted, but up to CRAWLER_MAX_CONCURRENT_CRAWLS of
+them run at the same time instead of one after the other. The scheduler
+keeps the crawls polite:
+
+    - two crawls that send requests to a common domain never run at the
+      same time, so the per domain limits of Scrapy hold across processes
+    - the global budget CRAWLER_CONCURRENT_REQUESTS is split between the
+      crawls running at once, whatever the number of configurations
+
+The summary of a crawl comes back through a one way pipe from its process.
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+import traceback
+from multiprocessing.connection import wait
+
+# defaults of the scheduler
+MAX_CONCURRENT_CRAWLS = 4
+CONCURRENT_REQUESTS = 64
+
+
+def _run(
+    target,
+    connection,
+    kwargs: dict,
+):
+    """Run a crawl in its process and send its summary back"""
+    try:
+        _summary = target(**kwargs)
+    except Exception as e:  # pylint: disable=broad-except
+        _summary = {
+            "config_name": kwargs.get("config_name"),
+            "error": str(e),
+            "traceback": traceback.format_exc(),
+        }
+    try:
+        connection.send(_summary)
+    finally:
+        connection.close()
+
+
+class CrawlScheduler:
+    """Bounded pool of crawl processes with per domain exclusion"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
+        self.max_concurrent_crawls = max(
+            1,
+            kwargs.get("max_concurrent_crawls")
+            or int(os.getenv("CRAWLER_MAX_CONCURRENT_CRAWLS", MAX_CONCURRENT_CRAWLS)),
+        )
+        self.concurrent_requests = max(
+            1,
+            kwargs.get("concurrent_requests")
+            or int(os.getenv("CRAWLER_CONCURRENT_REQUESTS", CONCURRENT_REQUESTS)),
+        )
+
+    def get_concurrent_requests(
+        self,
+        crawls: int,
+    ):
+        """Share of the global request budget of each crawl
+
+        Args:
+            crawls (int): number of crawls to run
+
+        Returns:
+            int: concurrent requests of a crawl
+        """
+        _running = max(1, min(crawls, self.max_concurrent_crawls))
+        return max(1, self.concurrent_requests // _running)
+
+    def run(
+        self,
+        target,
+        crawls: list,
+        on_done=None,
+    ):
+        """Run crawls, at most max_concurrent_crawls and one per domain at once
+
+        Args:
+            target (callable): function running a crawl from the kwargs of a
+                crawl and returning its summary
+            crawls (list): crawls in order of priority, dicts with name, the
+                set of domains and the kwargs of the target
+            on_done (callable): called with the name and the summary of each
+                crawl as it completes
+
+        Returns:
+            dict: summary of each crawl by name, None when its process died
+        """
+        _pending = list(crawls)
+        # pipe of each running crawl to its name, process and domains
+        _running = {}
+        _busy_domains = set()
+        _summaries = {}
+        _start_time = time.monotonic()
+
+        while _pending or _running:
+            for _crawl in list(_pending):
+                if len(_running) >= self.max_concurrent_crawls:
+                    break
+                if _crawl["domains"] & _busy_domains:
+                    continue
+                _pending.remove(_crawl)
+                _reader, _writer = multiprocessing.Pipe(duplex=False)
+                _process = multiprocessing.Process(
+                    target=_run,
+                    args=(target, _writer, _crawl["kwargs"]),
+                )
+                _process.start()
+                # the pipe reports the end of the process once only the
+                # child holds the writing end
+                _writer.close()
+                _running[_reader] = (_crawl["name"], _process, _crawl["domains"])
+                _busy_domains.update(_crawl["domains"])
+                self._logger.info(
+                    "Started crawl %s, %d running, %d pending",
+                    _crawl["name"],
+                    len(_running),
+                    len(_pending),
+                )
+
+            for _reader in wait(list(_running)):
+                _name, _process, _domains = _running.pop(_reader)
+                try:
+                    _summary = _reader.recv()
+                except EOFError:
+                    _summary = None
+                _reader.close()
+                _process.join()
+                if _summary is None:
+                    self._logger.error(
+                        "Crawl %s exited with code %s without a summary",
+                        _name,
+                        _process.exitcode,
+                    )
+                _process.close()
+                _busy_domains.difference_update(_domains)
+                _summaries[_name] = _summary
+                if on_done:
+                    on_done(_name, _summary)
+
+        self._logger.info(
+            "Completed %d crawls in %.1f seconds",
+            len(_summaries),
+            time.monotonic() - _start_time,
+        )
+        return _summaries
@@ -32,7 +32,9 @@ CONCURRENT_REQUESTS = 16
 DOWNLOAD_TIMEOUT = 30
 
 # The download delay setting will honor only one of:
-# CONCURRENT_REQUESTS_PER_DOMAIN = 16
+# the crawl scheduler never runs two crawls of a domain at once, so the
+# limit holds across the crawls of all configurations
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
 # CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
@@ -69,8 +71,11 @@ DOWNLOADER_MIDDLEWARES = {
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
     # "scrapy.pipelines.files.FilesPipeline": 1,
+    "webcrawler.pipelines.PageStorePipeline": 200,
     "webcrawler.pipelines.CrawlerFilePipeline": 300,
 }
+# HTML pages parsed and stored at the same time, off the reactor thread
+PAGE_STORE_CONCURRENCY = 16
 # Folder to store the downloaded files
 FILES_STORE = "./temp/downloads"
 
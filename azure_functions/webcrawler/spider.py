@@ -1,6 +1,7 @@
 """Web crawler for project."""
 
 import os
+import hashlib
 import logging
 from datetime import datetime
 
@@ -52,34 +53,98 @@ class SpiderFone(scrapy.Spider):
             )
 
         self.start_urls = self.configuration.documents.urls
+        self.validator_store = self.web_crawler_manager.validator_store
+        self.web_crawler_manager.prefetch_checksums()
+        # pages handed to the page store pipeline
+        self._queued_pages = set()
+        # codes let through to parse on conditional requests
+        self._allowed_statuses = None
+
+    async def start(self):
+        """Generates initial requests on Scrapy 2.13 and later, which no
+        longer read them from start_requests"""
+        for _request in self.start_requests():
+            yield _request
 
     def start_requests(self):
         """Generates initial requests"""
         for url in self.start_urls:
-            # Explicitly set the errback handler
-            yield scrapy.Request(
-                url,
-                dont_filter=True,
-                callback=self.parse,
-                errback=self.errback,
+            yield self._get_request(url)
+
+    def _get_request(self, url):
+        """Request for a URL, conditional when the previous crawl stored it"""
+        _headers = {}
+        _meta = {}
+        if self.validator_store is not None:
+            _headers = self.validator_store.get_headers(url)
+            # let 304 through to parse, a list in meta replaces the allowed
+            # codes of the settings and of the spider
+            if not self.settings.getbool("HTTPERROR_ALLOW_ALL"):
+                _meta["handle_httpstatus_list"] = self._get_allowed_statuses()
+        # Explicitly set the errback handler
+        return scrapy.Request(
+            url,
+            dont_filter=True,
+            callback=self.parse,
+            errback=self.errback,
+            headers=_headers,
+            meta=_meta,
+        )
+
+    def _get_allowed_statuses(self):
+        """Allowed HTTP error codes of the settings and of the spider, and 304"""
+        if self._allowed_statuses is None:
+            self._allowed_statuses = sorted(
+                set(self.settings.getlist("HTTPERROR_ALLOWED_CODES"))
+                | set(getattr(self, "handle_httpstatus_list", []))
+                | {304}
             )
+        return self._allowed_statuses
+
+    def _get_validators(self, response):
+        return {
+            "etag": self._get_header(response, "ETag"),
+            "last_modified": self._get_header(response, "Last-Modified"),
+            "checksum": hashlib.md5(response.body, usedforsecurity=False).hexdigest(),
+        }
+
+    def _get_header(self, response, name):
+        _value = response.headers.get(name)
+        return _value.decode("latin-1") if _value else None
+
+    def _not_modified(self, response):
+        """The page did not change since the previous crawl, follow the
+        links recorded then without parsing or storing the page"""
+        self._logger.debug("Not modified %s", response.url)
+        self.crawler_summary.not_modified_pages.append(response.url)
+        if not self.follow_links:
+            return
+        _validators = self.validator_store.get(response.url) or {}
+        for _url in _validators.get("links", []):
+            if self.crawler_summary.visited_urls.add(_url):
+                yield self._get_request(_url)
 
     def parse(self, response):
         """
         Parse the HTML content of the page, extract useful information,
         store in Azure Blob, and follow same-domain links.
         """
+        if response.status == 304:
+            yield from self._not_modified(response)
+            return None
+
         if response.status >= 400 and response.status <= 599:
             self._logger.error(
                 "Failed to download %s with status %s",
                 response.url,
                 response.status,
             )
-            self.crawler_summary.failure_pages.append(
+            self.crawler_summary.failure_pages.add(
+                response.url,
                 {
                     "url": response.url,
                     "code": response.status,
-                }
+                },
             )
             return None
 
@@ -87,18 +152,11 @@ class SpiderFone(scrapy.Spider):
         # if its an HTML page, then follow links
         if "text/html" in _content_type:
 
-            from webcrawler.parsers.html import HtmlParser
-
             # prevent duplicate run on the same page.
-            if response.url not in self.crawler_summary.success_pages:
-                HtmlParser.store_html(
-                    web_crawler_manager=self.web_crawler_manager,
-                    response=response,
-                    logger=self._logger,
-                )
-                self.crawler_summary.success_pages.append(response.url)
+            if response.url not in self._queued_pages:
+                self._queued_pages.add(response.url)
+                _extractor = []
                 if self.follow_links:
-                    _extractor = None
                     if os.getenv("USE_SCRAPY_LINK_EXTRACTOR", "False") == "True":
                         _extractor = self.link_extractor.extract_links(
                             response,
@@ -108,22 +166,41 @@ class SpiderFone(scrapy.Spider):
                             response=response,
                         )
                     for _link in _extractor:
-                        yield scrapy.Request(
-                            _link.url,
-                            callback=self.parse,
-                            dont_filter=True,
-                            errback=self.errback,
-                        )
+                        yield self._get_request(_link.url)
+                # parsed and stored by the page store pipeline
+                yield self._get_page_item(response, _extractor)
         else:
             # Let the pipeline handle the file
             yield self._get_item(response)
 
+    def _get_page_item(self, response, links):
+        return {
+            "page_url": response.url,
+            "text": response.text,
+            "content_type": response.headers.get("Content-Type").decode("utf-8"),
+            "web_crawler_manager": self.web_crawler_manager,
+            "logger": self._logger,
+            # recorded by the pipeline once the page is stored
+            "links": [_link.url for _link in links],
+            "validators": (
+                self._get_validators(response)
+                if self.validator_store is not None
+                else None
+            ),
+        }
+
     def _get_item(self, response):
         return {
             "file_urls": [response.url],
             "web_crawler_manager": self.web_crawler_manager,
             "content_type": response.headers.get("Content-Type").decode("utf-8"),
             "logger": self._logger,
+            # recorded by the pipeline once the file is stored
+            "validators": (
+                self._get_validators(response)
+                if self.validator_store is not None
+                else None
+            ),
         }
 
     def closed(self, _reason):
@@ -143,11 +220,12 @@ class SpiderFone(scrapy.Spider):
             _code = "TimeoutError"
         else:
             _code = err.value.response.status
-        self.crawler_summary.failure_pages.append(
+        self.crawler_summary.failure_pages.add(
+            err.request.url,
             {
                 "url": err.request.url,
                 "code": _code,
-            }
+            },
         )
         self._logger.debug(
             "Error downloading %s",
@@ -1,6 +1,14 @@
 import os
 from datetime import datetime
 
+from webcrawler.config import Crawl
+from webcrawler.urlstate import (
+    EXPECTED_URLS,
+    FALSE_POSITIVE_RATE,
+    BloomFilter,
+    UrlState,
+)
+
 
 DATEIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
@@ -10,6 +18,7 @@ class CrawlerSummary:
     def __init__(
         self,
         config_name,
+        crawl: Crawl = None,
     ):
 
         self.activity: str = "crawl"
@@ -21,11 +30,18 @@ class CrawlerSummary:
         self.start_time: datetime = datetime.utcnow()
         self.end_time: datetime = None
 
-        self.success_pages: list[str] = []
-        self.failure_pages: list[str] = []
-        self.visited_urls: list[str] = []
+        self.success_pages: UrlState = UrlState()
+        self.failure_pages: UrlState = UrlState()
+        _bloom_filter = None
+        if crawl and crawl.bloomfilter:
+            _bloom_filter = BloomFilter(
+                capacity=crawl.expectedurls or EXPECTED_URLS,
+                error_rate=crawl.falsepositiverate or FALSE_POSITIVE_RATE,
+            )
+        self.visited_urls: UrlState = UrlState(bloom_filter=_bloom_filter)
         self.new_pages: list[str] = []
         self.updated_pages: list[str] = []
+        self.not_modified_pages: list[str] = []
 
         self.closed_reason: str = None
         self.log: str = None
@@ -45,6 +61,7 @@ class CrawlerSummary:
             "processed": len(self.visited_urls),
             "new": len(self.new_pages),
             "updated": len(self.updated_pages),
+            "not_modified": len(self.not_modified_pages),
             "log": self.log,
         }
 
@@ -55,11 +72,12 @@ class CrawlerSummary:
         _full_log.update(self.get_metrics())
         _full_log.update(
             {
-                "success_pages": self.success_pages,
-                "failure_pages": self.failure_pages,
+                "success_pages": self.success_pages.to_list(),
+                "failure_pages": self.failure_pages.to_list(),
                 "new_pages": self.new_pages,
                 "updated_pages": self.updated_pages,
-                "processed_urls": self.visited_urls,
+                "not_modified_pages": self.not_modified_pages,
+                "processed_urls": self.visited_urls.to_list(),
             }
         )
         return _full_log
@@ -0,0 +1,149 @@
+"""URL state of a crawl.
+
+The visited, succeeded and failed URLs are checked for every link and
+every page, so they are kept in insertion ordered dictionaries with O(1)
+membership instead of lists. For very large crawls the visited URLs can
+be kept in a Bloom filter sized for the expected number of URLs and a
+false positive rate: membership stays O(1) in a fixed amount of memory,
+a false positive skips a link that was not visited, and the URLs
+themselves are no longer listed in the summary log.
+"""
+
+import hashlib
+import math
+from array import array
+
+# defaults of the Bloom filter mode
+EXPECTED_URLS = 1_000_000
+FALSE_POSITIVE_RATE = 0.001
+
+
+class BloomFilter:
+    """Fixed size probabilistic set of strings"""
+
+    def __init__(
+        self,
+        capacity: int = EXPECTED_URLS,
+        error_rate: float = FALSE_POSITIVE_RATE,
+    ) -> None:
+        if not 0 < error_rate < 1:
+            raise ValueError(f"False positive rate {error_rate} is not between 0 and 1")
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(
+            8,
+            math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)),
+        )
+        # at most 16 hashes, the size of a single blake2b digest
+        self.hash_count = min(
+            16, max(1, round(self.size / self.capacity * math.log(2)))
+        )
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(
+        self,
+        value: str,
+    ):
+        # one digest holds a 32 bit position for each of the k hashes
+        _digest = hashlib.blake2b(
+            value.encode("utf-8"), digest_size=4 * self.hash_count
+        ).digest()
+        return [_position % self.size for _position in array("I", _digest)]
+
+    def add(
+        self,
+        value: str,
+    ):
+        """Add a value
+
+        Args:
+            value (str): value
+
+        Returns:
+            bool: True when the value was not in the filter yet
+        """
+        _new = False
+        _bits = self._bits
+        for _position in self._positions(value):
+            _mask = 1 << (_position & 7)
+            if not _bits[_position >> 3] & _mask:
+                _bits[_position >> 3] |= _mask
+                _new = True
+        return _new
+
+    def __contains__(
+        self,
+        value: str,
+    ):
+        _bits = self._bits
+        for _position in self._positions(value):
+            if not _bits[_position >> 3] & (1 << (_position & 7)):
+                return False
+        return True
+
+
+class UrlState:
+    """URLs of a crawl in insertion order with O(1) membership"""
+
+    def __init__(
+        self,
+        bloom_filter: BloomFilter = None,
+    ) -> None:
+        # the logged value of each URL, the URL itself unless given
+        self._urls: dict[str, object] = {}
+        self._filter = bloom_filter
+        self._count = 0
+
+    def add(
+        self,
+        url: str,
+        value=None,
+    ):
+        """Add a URL
+
+        Args:
+            url (str): URL
+            value (object): logged value of the URL, the URL by default
+
+        Returns:
+            bool: True when the URL was not in the state yet
+        """
+        if self._filter is not None:
+            if not self._filter.add(url):
+                return False
+            self._count += 1
+            return True
+        if url in self._urls:
+            return False
+        self._urls[url] = url if value is None else value
+        return True
+
+    def __contains__(
+        self,
+        url: str,
+    ):
+        if self._filter is not None:
+            return url in self._filter
+        return url in self._urls
+
+    def __len__(
+        self,
+    ):
+        if self._filter is not None:
+            return self._count
+        return len(self._urls)
+
+    def __iter__(
+        self,
+    ):
+        return iter(self._urls.values())
+
+    def to_list(
+        self,
+    ):
+        """Logged values in insertion order, empty in the Bloom filter mode
+
+        Returns:
+            list: logged values
+        """
+        return list(self._urls.values())
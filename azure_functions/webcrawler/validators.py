@@ -0,0 +1,185 @@
+"""HTTP validators of the crawled URLs, kept between crawls.
+
+For every page stored by a crawl the ETag and Last-Modified response
+headers, the checksum of the body and the links followed from the page
+are recorded in a SQLite file per configuration. The next crawl sends
+them back as If-None-Match and If-Modified-Since, and a 304 response
+only follows the recorded links, without parsing or blob storage I/O.
+The rows are read into memory when the store is loaded, so the lookups of
+the requests made on the reactor thread do not query SQLite, and the rows
+recorded during the crawl are written to SQLite when it is saved. The
+SQLite file is written to the logs storage at the end of a crawl and
+downloaded again at the start of the next one.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from webcrawler.blob import BlobHandler
+
+
+class ValidatorStore:
+    """ETag, Last-Modified, checksum and links of each crawled URL"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._logger = kwargs.get("logger") or logging.getLogger(__name__)
+        self.config_name = kwargs.get("config_name")
+        # the storage the SQLite file is kept in between crawls, the
+        # validators only last as long as the instance without it
+        self.storage_account_url = kwargs.get("storage_account_url")
+        self.container_name = kwargs.get("container_name")
+        self.blob_path = f"state/{self.config_name}/validators.sqlite"
+        self.path = kwargs.get("path") or os.path.join(
+            tempfile.gettempdir(), f"crawler-{self.config_name}-validators.sqlite"
+        )
+        self._lock = threading.Lock()
+        self._connection = None
+        # validators of each URL, and the rows recorded since the load
+        self._validators = {}
+        self._changed = {}
+
+    def load(
+        self,
+    ):
+        """Download the validators of the previous crawl and open them"""
+        if self.storage_account_url:
+            try:
+                _content = BlobHandler.download(
+                    storage_account_url=self.storage_account_url,
+                    container_name=self.container_name,
+                    blob_path=self.blob_path,
+                )
+                with open(self.path, "wb") as _file:
+                    _file.write(_content)
+            except ResourceNotFoundError:
+                self._logger.info("No validators stored for %s", self.config_name)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+            "checksum TEXT, links TEXT, updated REAL)"
+        )
+        self._connection.commit()
+        self._validators = {
+            _row[0]: {
+                "etag": _row[1],
+                "last_modified": _row[2],
+                "checksum": _row[3],
+                "links": json.loads(_row[4]) if _row[4] else [],
+            }
+            for _row in self._connection.execute(
+                "SELECT url, etag, last_modified, checksum, links FROM validators"
+            )
+        }
+        self._logger.info(
+            "Loaded validators of %d URLs for %s",
+            len(self._validators),
+            self.config_name,
+        )
+
+    def get(
+        self,
+        url: str,
+    ):
+        """Validators of a URL
+
+        Args:
+            url (str): URL
+
+        Returns:
+            dict: etag, last_modified, checksum and links, None when unknown
+        """
+        return self._validators.get(url)
+
+    def get_headers(
+        self,
+        url: str,
+    ):
+        """Conditional request headers of a URL
+
+        Args:
+            url (str): URL
+
+        Returns:
+            dict: If-None-Match and If-Modified-Since when known
+        """
+        _validators = self.get(url)
+        _headers = {}
+        if _validators:
+            if _validators["etag"]:
+                _headers["If-None-Match"] = _validators["etag"]
+            if _validators["last_modified"]:
+                _headers["If-Modified-Since"] = _validators["last_modified"]
+        return _headers
+
+    def set(
+        self,
+        url: str,
+        etag: str = None,
+        last_modified: str = None,
+        checksum: str = None,
+        links: list = None,
+    ):
+        """Record the validators of a stored URL
+
+        Args:
+            url (str): URL
+            etag (str): ETag response header
+            last_modified (str): Last-Modified response header
+            checksum (str): checksum of the response body
+            links (list): URLs followed from the page
+        """
+        _validators = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "checksum": checksum,
+            "links": links or [],
+        }
+        with self._lock:
+            self._validators[url] = _validators
+            self._changed[url] = (
+                url,
+                etag,
+                last_modified,
+                checksum,
+                json.dumps(_validators["links"]),
+                time.time(),
+            )
+
+    def save(
+        self,
+    ):
+        """Write the validators back for the next crawl"""
+        if self._connection is None:
+            return
+        with self._lock:
+            _changed = self._changed
+            self._changed = {}
+            if _changed:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO validators "
+                    "(url, etag, last_modified, checksum, links, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    list(_changed.values()),
+                )
+                self._connection.commit()
+            self._connection.close()
+            self._connection = None
+        if not _changed or not self.storage_account_url:
+            return
+        with open(self.path, "rb") as _file:
+            _content = _file.read()
+        BlobHandler.upload(
+            storage_account_url=self.storage_account_url,
+            container_name=self.container_name,
+            blob_path=self.blob_path,
+            content=_content,
+            overwrite=True,
+        )
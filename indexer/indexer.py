@@ -26,6 +26,7 @@ class AISearchIndexer:
         _search_endpoint = _args.search_endpoint
         _index_name = _args.index_name
         _use_ocr = _args.use_ocr
+        _parsing_mode = _args.parsing_mode
 
         _indexer_name = f"{_index_name}-indexer"
         _skillset_name = f"{_index_name}-skillset"
@@ -36,6 +37,9 @@ class AISearchIndexer:
                 query_timeout=None,
             )
         )
+        if _parsing_mode != "default":
+            # jsonLines reads every line of a blob as its own document
+            _indexer_parameters.configuration.parsing_mode = _parsing_mode
         if _args.use_private_endpoint:
             _indexer_parameters.configuration.execution_environment = (
                 IndexerExecutionEnvironment.PRIVATE
@@ -115,6 +119,14 @@ def main():
         required=False,
         default="2024-10-01T00:00:00Z",
     )
+    parser.add_argument(
+        "--parsing-mode",
+        type=str,
+        choices=["default", "json", "jsonLines"],
+        help="Blob parsing mode, jsonLines for the .jsonl chunk output",
+        required=False,
+        default="default",
+    )
     parser.add_argument(
         "--use-private-endpoint",
         action="store_true",
@@ -140,6 +152,7 @@ def main():
     logging.debug("Index name %s", args.index_name)
     logging.debug("Use OCR %s", args.use_ocr)
     logging.debug("Interval %s", args.interval)
+    logging.debug("Parsing mode %s", args.parsing_mode)
 
     _ai_search_indexer = AISearchIndexer(args)
     _ai_search_indexer.create_indexer()